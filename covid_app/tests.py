@@ -1,3 +1,52 @@
+from datetime import date
+
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from data_app.models import Country, CovidData
+
+
+class CovidKeysetPaginationTests(TestCase):
+    """
+    Walking the cursor pages must return the same groups as page-number pagination.
+    """
+
+    def setUp(self):
+        self.client = APIClient(HTTP_HOST="localhost")
+        afghanistan = Country.objects.create(name="Afghanistan")
+        canada = Country.objects.create(name="Canada")
+        for country, province, confirmed in (
+            (afghanistan, None, 1), (afghanistan, "", 2), (afghanistan, "Kabul", 3),
+            (canada, None, 4), (canada, "Ontario", 5), (canada, "Quebec", 6),
+        ):
+            CovidData.objects.create(country=country, province_state=province, file_date=date(2021, 1, 1), confirmed=confirmed)
+
+    def groups(self, results):
+        return [(row["country__name"], row["province_state"], row["confirmed"]) for row in results]
+
+    def test_cursor_pages_match_page_numbers(self):
+        url = reverse("covid-filtered")
+        expected = self.groups(self.client.get(url, {"page_size": 100}).json()["results"])
+        self.assertEqual(len(expected), 6)
+
+        walked = []
+        response = self.client.get(url, {"pagination": "cursor", "page_size": 1}).json()
+        walked += self.groups(response["results"])
+        while response["next"]:
+            response = self.client.get(response["next"]).json()
+            walked += self.groups(response["results"])
+        self.assertEqual(sorted(walked, key=str), sorted(expected, key=str))
+        self.assertEqual(len(walked), len(set(walked)))
+
+        # Walking back from the last page visits the same groups in reverse
+        back = []
+        while response["previous"]:
+            response = self.client.get(response["previous"]).json()
+            back = self.groups(response["results"]) + back
+        self.assertEqual(back, walked[:-1])
 
-# Create your tests here.
+    def test_invalid_page_size_falls_back(self):
+        url = reverse("covid-filtered")
+        for page_size, expected in (("0", 6), ("abc", 6), ("2", 2), ("1000", 6)):
+            response = self.client.get(url, {"pagination": "cursor", "page_size": page_size})
+            self.assertEqual(len(response.json()["results"]), expected, page_size)
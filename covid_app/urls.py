@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import CovidDataFilteredView
+from .views import CovidDataExportView, CovidDataFilteredView
 
 urlpatterns = [
     path('covid/filter/', CovidDataFilteredView.as_view(), name='covid-filtered'),
+    path('covid/export/', CovidDataExportView.as_view(), name='covid-export'),
 ]
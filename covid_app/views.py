@@ -4,9 +4,16 @@ from rest_framework.exceptions import ValidationError
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework.pagination import PageNumberPagination
-from data_app.models import CovidData
-from django.db.models import Sum
+from rest_framework.utils.urls import replace_query_param
+from data_app.choices import ChoiceParameter, registry
+from data_app.export import EXPORT_FORMATS, export_response, get_export_options
+from data_app.models import CovidData, CovidSeries
+from data_app.rollups import range_totals, rollups_ready
+from django.db.models import Case, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
 from datetime import datetime
+import base64
+import json
 
 
 class CustomPagination(PageNumberPagination):
@@ -18,13 +25,182 @@ class CustomPagination(PageNumberPagination):
     max_page_size = 100  # Limit the maximum records per page
 
 
+class CovidKeysetPagination:
+    """
+    Keyset (cursor) pagination over COVID-19 data grouped by (country name, province/state).
+
+    Each page continues after the last group of the previous one with a WHERE clause on
+    the group key, so deep pages cost the same as the first one: no OFFSET rescans and,
+    unless `include_count=true` is passed, no COUNT over the whole GROUP BY.
+    Missing provinces sort as an empty string, right after the empty-string group of the
+    same country; the cursor records which of the two it stopped at.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size < 1:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    @staticmethod
+    def encode_cursor(row, direction):
+        province_state = row['province_state']
+        payload = json.dumps([row['country__name'], province_state or '', int(province_state is None), direction])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            country_name, province_key, province_null, direction = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError):
+            raise ValidationError({"error": "Invalid cursor."})
+        if direction not in ('next', 'prev') or province_null not in (0, 1):
+            raise ValidationError({"error": "Invalid cursor."})
+        return country_name, province_key, province_null, direction
+
+    def paginate(self, queryset, aggregate, request):
+        """
+        Returns one page of `aggregate(queryset)` rows, ordered by the group key.
+
+        `aggregate` turns the filtered row queryset into grouped `values()` rows; the
+        keyset condition is applied to the rows before grouping.
+        """
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        queryset = queryset.annotate(
+            province_sort_key=Coalesce('province_state', Value('')),
+            province_null=Case(When(province_state__isnull=True, then=Value(1)), default=Value(0), output_field=IntegerField()),
+        )
+        cursor = request.query_params.get(self.cursor_query_param)
+        self.count = None
+        if request.query_params.get('include_count', '').lower() == 'true':
+            self.count = aggregate(queryset).count()
+
+        direction = 'next'
+        if cursor:
+            country_name, province_key, province_null, direction = self.decode_cursor(cursor)
+            if direction == 'next':
+                queryset = queryset.filter(
+                    Q(country__name__gt=country_name)
+                    | Q(country__name=country_name, province_sort_key__gt=province_key)
+                    | Q(country__name=country_name, province_sort_key=province_key, province_null__gt=province_null)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(country__name__lt=country_name)
+                    | Q(country__name=country_name, province_sort_key__lt=province_key)
+                    | Q(country__name=country_name, province_sort_key=province_key, province_null__lt=province_null)
+                )
+
+        ordering = ('country__name', 'province_sort_key', 'province_null')
+        if direction == 'prev':
+            ordering = ('-country__name', '-province_sort_key', '-province_null')
+        rows = list(aggregate(queryset).order_by(*ordering)[:self.page_size_value + 1])
+        has_more = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        if direction == 'prev':
+            rows.reverse()
+
+        # Pages exist on the side we came from whenever a cursor was followed
+        self.has_next = has_more if direction == 'next' else bool(cursor)
+        self.has_previous = has_more if direction == 'prev' else bool(cursor)
+        self.rows = rows
+        return rows
+
+    def get_link(self, row, direction):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(row, direction))
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.count,
+            "next": self.get_link(self.rows[-1], 'next') if self.has_next and self.rows else None,
+            "previous": self.get_link(self.rows[0], 'prev') if self.has_previous and self.rows else None,
+            "results": data,
+        })
+
+
 # Helper functions for dropdown options
 def get_country_choices():
-    return sorted(list(CovidData.objects.values_list('country__name', flat=True).distinct()))
+    return registry.sorted('covid_countries')
 
 
 def get_province_choices():
-    return sorted(list(CovidData.objects.values_list('province_state', flat=True).distinct()))
+    return registry.sorted('covid_provinces')
+
+
+def get_covid_filters(request):
+    """
+    Reads and validates the COVID-19 filter query parameters shared by the filter and
+    export endpoints. Returns (country_name, province_state, start_date, end_date).
+    """
+    country_name = request.query_params.get('country_name', None)
+    province_state = request.query_params.get('province_state', None)
+    start_date = request.query_params.get('start_date', None)
+    end_date = request.query_params.get('end_date', None)
+
+    # Validate date format
+    if start_date:
+        try:
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValidationError({"error": "Invalid start_date format. Use YYYY-MM-DD."})
+
+    if end_date:
+        try:
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValidationError({"error": "Invalid end_date format. Use YYYY-MM-DD."})
+
+    if start_date and end_date and start_date > end_date:
+        raise ValidationError({"error": "start_date cannot be after end_date."})
+
+    return country_name, province_state, start_date, end_date
+
+
+def filter_covid_data(country_name=None, province_state=None, start_date=None, end_date=None):
+    """
+    Returns the CovidData rows matching the filters.
+    """
+    # Initial queryset
+    queryset = CovidData.objects.all()
+
+    # Filter by country name if provided
+    if country_name:
+        queryset = queryset.filter(country__name__exact=country_name)
+
+    # Filter by province/state if provided
+    if province_state:
+        queryset = queryset.filter(province_state__exact=province_state)
+
+    # Filter by date range if provided
+    if start_date and end_date:
+        queryset = queryset.filter(file_date__range=[start_date, end_date])
+    elif start_date:
+        queryset = queryset.filter(file_date__gte=start_date)
+    elif end_date:
+        queryset = queryset.filter(file_date__lte=end_date)
+
+    return queryset
+
+
+def aggregate_covid_data(queryset):
+    """
+    Groups COVID-19 rows by country name and province/state and sums their metrics.
+    """
+    return queryset.values('country__name', 'province_state').annotate(
+        confirmed=Sum('confirmed'),
+        deaths=Sum('deaths'),
+        recovered=Sum('recovered'),
+        active=Sum('active')
+    )
 
 
 class CovidDataFilteredView(APIView):
@@ -36,17 +212,13 @@ class CovidDataFilteredView(APIView):
     @swagger_auto_schema(
         operation_description="Filter and paginate COVID-19 data by country name, province/state, date range, or any combination.",
         manual_parameters=[
-            openapi.Parameter(
-                'country_name', openapi.IN_QUERY,
+            ChoiceParameter(
+                'country_name', 'covid_countries',  # Dropdown for country names
                 description="Name of the country to filter by",
-                type=openapi.TYPE_STRING,
-                enum=get_country_choices()  # Dropdown for country names
             ),
-            openapi.Parameter(
-                'province_state', openapi.IN_QUERY,
+            ChoiceParameter(
+                'province_state', 'covid_provinces',  # Dropdown for province names
                 description="Name of the province/state to filter by (if applicable)",
-                type=openapi.TYPE_STRING,
-                enum=get_province_choices()  # Dropdown for province names
             ),
             openapi.Parameter(
                 'start_date', openapi.IN_QUERY,
@@ -67,13 +239,30 @@ class CovidDataFilteredView(APIView):
                 'page_size', openapi.IN_QUERY,
                 description="Number of records per page (default: 20, max: 100)",
                 type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'pagination', openapi.IN_QUERY,
+                description="Pagination mode: 'page' (default) or 'cursor'. Cursor mode returns opaque "
+                            "next/previous cursors and stays fast on deep pages.",
+                type=openapi.TYPE_STRING,
+                enum=['page', 'cursor']
+            ),
+            openapi.Parameter(
+                'cursor', openapi.IN_QUERY,
+                description="Opaque cursor from a previous cursor-mode response (implies pagination=cursor)",
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'include_count', openapi.IN_QUERY,
+                description="In cursor mode, also compute the total number of records (default: false)",
+                type=openapi.TYPE_BOOLEAN
             )
         ],
         responses={
             200: openapi.Schema(
                 type=openapi.TYPE_OBJECT,
                 properties={
-                    "count": openapi.Schema(type=openapi.TYPE_INTEGER, description="Total number of records"),
+                    "count": openapi.Schema(type=openapi.TYPE_INTEGER, description="Total number of records (null in cursor mode unless include_count=true)"),
                     "next": openapi.Schema(type=openapi.TYPE_STRING, description="URL of the next page"),
                     "previous": openapi.Schema(type=openapi.TYPE_STRING, description="URL of the previous page"),
                     "results": openapi.Schema(
@@ -107,63 +296,103 @@ class CovidDataFilteredView(APIView):
         }
     )
     def get(self, request, *args, **kwargs):
-        country_name = request.query_params.get('country_name', None)
-        province_state = request.query_params.get('province_state', None)
-        start_date = request.query_params.get('start_date', None)
-        end_date = request.query_params.get('end_date', None)
-
-        # Validate date format
-        if start_date:
-            try:
-                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            except ValueError:
-                raise ValidationError({"error": "Invalid start_date format. Use YYYY-MM-DD."})
-
-        if end_date:
-            try:
-                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-            except ValueError:
-                raise ValidationError({"error": "Invalid end_date format. Use YYYY-MM-DD."})
-
-        if start_date and end_date and start_date > end_date:
-            raise ValidationError({"error": "start_date cannot be after end_date."})
-
-        # Initial queryset
-        queryset = CovidData.objects.all()
-
-        # Filter by country name if provided
-        if country_name:
-            queryset = queryset.filter(country__name__exact=country_name)
-
-        # Filter by province/state if provided
-        if province_state:
-            queryset = queryset.filter(province_state__exact=province_state)
-
-        # Filter by date range if provided
-        if start_date and end_date:
-            queryset = queryset.filter(file_date__range=[start_date, end_date])
-        elif start_date:
-            queryset = queryset.filter(file_date__gte=start_date)
-        elif end_date:
-            queryset = queryset.filter(file_date__lte=end_date)
+        country_name, province_state, start_date, end_date = get_covid_filters(request)
+        queryset = filter_covid_data(country_name, province_state, start_date, end_date)
 
         # Check if no records are found
         if not queryset.exists():
             return Response({"error": "No COVID-19 data found for the given filters."}, status=404)
 
+        # Date ranges are answered from the daily prefix sums, two lookups per group
+        aggregate = aggregate_covid_data
+        if (start_date or end_date) and rollups_ready():
+            queryset = CovidSeries.objects.all()
+            if country_name:
+                queryset = queryset.filter(country__name__exact=country_name)
+            if province_state:
+                queryset = queryset.filter(province_state__exact=province_state)
+
+            def aggregate(series):
+                return range_totals(series, start_date, end_date)
+
+        # Keyset pagination over the grouped rows
+        if request.query_params.get('pagination') == 'cursor' or 'cursor' in request.query_params:
+            paginator = CovidKeysetPagination()
+            paginated_data = paginator.paginate(queryset, aggregate, request)
+            return paginator.get_paginated_response(paginated_data)
+
         # Aggregate data
-        aggregated_data = (
-            queryset.values('country__name', 'province_state')
-            .annotate(
-                confirmed=Sum('confirmed'),
-                deaths=Sum('deaths'),
-                recovered=Sum('recovered'),
-                active=Sum('active')
-            )
-            .order_by('country__name', 'province_state')
-        )
+        aggregated_data = aggregate(queryset).order_by('country__name', 'province_state')
 
         # Paginate the results
         paginator = CustomPagination()
         paginated_data = paginator.paginate_queryset(aggregated_data, request)
         return paginator.get_paginated_response(paginated_data)
+
+
+# Columns of the COVID-19 export, in order
+COVID_EXPORT_COLUMNS = (
+    'country_name', 'province_state', 'file_date', 'confirmed', 'deaths', 'recovered', 'active',
+    'incident_rate', 'case_fatality_ratio',
+)
+
+
+class CovidDataExportView(APIView):
+    """
+    Stream all COVID-19 records matching the filters as NDJSON or CSV, in one response.
+    """
+
+    @swagger_auto_schema(
+        operation_description="Stream COVID-19 records (one per report row, not aggregated) matching the filters as NDJSON or CSV, "
+                              "optionally gzip-compressed. Rows are read with a server-side cursor, so any export runs in bounded memory.",
+        manual_parameters=[
+            ChoiceParameter(
+                'country_name', 'covid_countries',  # Dropdown for country names
+                description="Name of the country to filter by",
+            ),
+            ChoiceParameter(
+                'province_state', 'covid_provinces',  # Dropdown for province names
+                description="Name of the province/state to filter by (if applicable)",
+            ),
+            openapi.Parameter(
+                'start_date', openapi.IN_QUERY,
+                description="Start date (YYYY-MM-DD)",
+                type=openapi.FORMAT_DATE
+            ),
+            openapi.Parameter(
+                'end_date', openapi.IN_QUERY,
+                description="End date (YYYY-MM-DD)",
+                type=openapi.FORMAT_DATE
+            ),
+            openapi.Parameter(
+                'export_format', openapi.IN_QUERY,
+                description="Output format (default: ndjson)",
+                type=openapi.TYPE_STRING,
+                enum=list(EXPORT_FORMATS)
+            ),
+            openapi.Parameter(
+                'gzip', openapi.IN_QUERY,
+                description="Compress the output with gzip (default: false)",
+                type=openapi.TYPE_BOOLEAN
+            )
+        ],
+        responses={
+            200: openapi.Response(description="Streamed NDJSON or CSV file"),
+            400: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "error": openapi.Schema(type=openapi.TYPE_STRING, description="Error message")
+                }
+            ),
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        export_format, compress = get_export_options(request)
+        queryset = filter_covid_data(*get_covid_filters(request))
+        rows = queryset.order_by('id').values_list(
+            'country__name', 'province_state', 'file_date', 'confirmed', 'deaths', 'recovered', 'active',
+            'incident_rate', 'case_fatality_ratio',
+        )
+        return export_response(
+            rows.iterator(chunk_size=5000), COVID_EXPORT_COLUMNS, 'covid_data', export_format, compress
+        )
@@ -156,3 +156,28 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+
+# Directory holding the columnar CovidData snapshots written by `manage.py export_snapshot`
+COVID_SNAPSHOT_DIR = BASE_DIR / 'snapshots'
+
+# Fill dropdown enums of the Swagger docs from the shared choice registry (data_app/choices.py)
+SWAGGER_SETTINGS = {
+    'DEFAULT_AUTO_SCHEMA_CLASS': 'data_app.choices.ChoicesAutoSchema',
+}
+
+# Seconds between checks of the data version by process-wide caches
+DATA_VERSION_CHECK_INTERVAL = 30
+
+# Seconds the global statistics endpoints cache a result for the same filters and data version
+STATISTICS_CACHE_TIMEOUT = 60 * 60
+
+# Number of parsed forecast files each worker keeps in memory (forecasting_app/cache.py)
+FORECAST_CACHE_SIZE = 64
+
+# Binary file holding every country's forecast (forecasting_app/store.py)
+FORECAST_STORE_PATH = BASE_DIR / 'forecasting_app' / 'forecasts' / 'forecasts.bin'
+
+# Threads per worker process running forecast jobs (forecasting_app/jobs.py), and seconds
+# after which a job still pending or running is considered lost (e.g., its process died)
+FORECAST_JOB_WORKERS = 2
+FORECAST_JOB_TIMEOUT = 30 * 60
@@ -0,0 +1,38 @@
+# File: data_app/caching.py
+
+import hashlib
+import json
+
+from django.core.cache import cache
+from data_app.versions import known_version
+
+
+def cache_key(namespace, **filters):
+    """
+    Builds a cache key from a namespace, the normalized filters and the data version, so
+    entries go stale as soon as ingest or precompute bump the version.
+
+    Empty filters are dropped and values are stripped, so `?country_name=` and no filter
+    share an entry.
+    """
+    normalized = sorted(
+        (name, str(value).strip()) for name, value in filters.items()
+        if value is not None and str(value).strip()
+    )
+    digest = hashlib.md5(json.dumps(normalized).encode()).hexdigest()
+    return f"{namespace}:v{known_version()}:{digest}"
+
+
+def cached_response(key, compute, timeout):
+    """
+    Returns the (data, status) pair cached under `key`, calling `compute` on a miss.
+
+    Only successful and 404 results are stored: an error such as "not built yet" (503)
+    may clear without a version bump, so it is computed again on the next request.
+    """
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        if 200 <= result[1] < 300 or result[1] == 404:
+            cache.set(key, result, timeout)
+    return result
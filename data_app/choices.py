@@ -0,0 +1,109 @@
+# File: data_app/choices.py
+
+import threading
+
+from django.db.models import Exists, OuterRef
+from drf_yasg import openapi
+from drf_yasg.inspectors import SwaggerAutoSchema
+from rest_framework.exceptions import ValidationError
+from data_app.models import Country, CovidData, VaccinationData
+from data_app.versions import known_version
+
+
+class ChoiceRegistry:
+    """
+    Process-wide registry of dropdown choices (e.g., country names) used for Swagger enums
+    and query parameter validation.
+
+    Each named list is loaded on first use and kept as a set for lookups plus a sorted
+    list for display. Cached lists are dropped when the data version changes (see
+    `known_version`).
+    """
+
+    def __init__(self):
+        self.loaders = {}
+        self.cache = {}
+        self.version = None
+        self.lock = threading.Lock()
+
+    def register(self, name, loader):
+        """
+        Registers a callable returning the values of a choice list; None values are dropped.
+        """
+        self.loaders[name] = loader
+        self.cache.pop(name, None)
+
+    def _entry(self, name):
+        version = known_version()
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.cache = {}
+                    self.version = version
+        entry = self.cache.get(name)
+        if entry is None:
+            values = {value for value in self.loaders[name]() if value is not None}
+            entry = self.cache[name] = (frozenset(values), sorted(values))
+        return entry
+
+    def get(self, name):
+        """
+        Returns the choices as a frozenset.
+        """
+        return self._entry(name)[0]
+
+    def sorted(self, name):
+        """
+        Returns the choices as a sorted list.
+        """
+        return self._entry(name)[1]
+
+    def clear(self):
+        with self.lock:
+            self.cache = {}
+
+
+registry = ChoiceRegistry()
+
+# Countries are looked up through an EXISTS probe on the country index instead of a
+# DISTINCT over the whole fact table
+registry.register("covid_countries", lambda: Country.objects.filter(
+    Exists(CovidData.objects.filter(country=OuterRef("pk")))
+).values_list("name", flat=True))
+registry.register("covid_provinces", lambda: CovidData.objects.values_list("province_state", flat=True).distinct())
+registry.register("vaccination_countries", lambda: Country.objects.filter(
+    Exists(VaccinationData.objects.filter(country=OuterRef("pk")))
+).values_list("name", flat=True))
+
+
+def validate_choice(name, value, param):
+    """
+    Raises a ValidationError if `value` is given and not one of the `name` choices.
+    """
+    if value and value not in registry.get(name):
+        raise ValidationError({"error": f"Invalid {param}. Available choices: {', '.join(registry.sorted(name))}"})
+
+
+class ChoiceParameter(openapi.Parameter):
+    """
+    A Swagger query parameter whose enum is read from the choice registry when the schema
+    is generated, instead of when the view module is imported.
+    """
+
+    def __init__(self, name, choices, **kwargs):
+        super().__init__(name, openapi.IN_QUERY, type=openapi.TYPE_STRING, **kwargs)
+        self._choices = choices
+
+
+class ChoicesAutoSchema(SwaggerAutoSchema):
+    """
+    Fills the enums of `ChoiceParameter`s from the registry (DEFAULT_AUTO_SCHEMA_CLASS).
+    """
+
+    def add_manual_parameters(self, parameters):
+        parameters = super().add_manual_parameters(parameters)
+        for parameter in parameters:
+            choices = getattr(parameter, "_choices", None)
+            if choices:
+                parameter.enum = registry.sorted(choices)
+        return parameters
@@ -0,0 +1,86 @@
+# File: data_app/export.py
+
+import csv
+import io
+import json
+import zlib
+
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Bytes buffered before a chunk is sent (and compressed)
+CHUNK_SIZE = 64 * 1024
+
+
+def get_export_options(request):
+    """
+    Reads and validates the `export_format` and `gzip` query parameters of an export endpoint.
+    """
+    export_format = request.query_params.get("export_format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        raise ValidationError({"error": f"Invalid export_format. Use one of: {', '.join(EXPORT_FORMATS)}."})
+    compress = request.query_params.get("gzip", "").lower() in ("true", "1")
+    return export_format, compress
+
+
+def _encode_ndjson(rows, columns):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), default=str, separators=(",", ":")) + "\n"
+
+
+def _encode_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        # Hand over what the writer produced and reuse the buffer
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_export(rows, columns, export_format="ndjson", compress=False):
+    """
+    Encodes an iterable of row tuples as NDJSON or CSV and yields the result in chunks of
+    about `CHUNK_SIZE` bytes, gzip-compressed if requested. Memory stays bounded by the
+    chunk size whatever the number of rows.
+    """
+    encode = _encode_ndjson if export_format == "ndjson" else _encode_csv
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 writes a gzip container
+    pending = []
+    size = 0
+    for text in encode(rows, columns):
+        pending.append(text)
+        size += len(text)
+        if size >= CHUNK_SIZE:
+            data = "".join(pending).encode()
+            pending.clear()
+            size = 0
+            data = compressor.compress(data) if compressor else data
+            if data:
+                yield data
+    data = "".join(pending).encode()
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
+
+
+def export_response(rows, columns, filename, export_format="ndjson", compress=False):
+    """
+    Returns a StreamingHttpResponse that downloads the rows as `filename.<format>[.gz]`.
+    """
+    filename = f"{filename}.{export_format}" + (".gz" if compress else "")
+    response = StreamingHttpResponse(
+        iter_export(rows, columns, export_format, compress),
+        content_type="application/gzip" if compress else EXPORT_FORMATS[export_format],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,212 @@
+# File: data_app/ingest.py
+
+import csv
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_app.reporting import MISSING_COUNTRY, PARSE_ERROR, UNKNOWN_COUNTRY
+
+# Order of the values in each cleaned COVID-19 record produced by the parsers below
+COVID_FIELDS = (
+    "country_id",
+    "province_state",
+    "confirmed",
+    "deaths",
+    "recovered",
+    "active",
+    "incident_rate",
+    "case_fatality_ratio",
+    "file_date",
+)
+
+# Order of the values in each cleaned vaccination record
+VACCINATION_FIELDS = (
+    "country_id",
+    "total_vaccinations",
+    "persons_vaccinated_first_dose",
+    "persons_last_dose",
+    "persons_booster_add_dose",
+    "first_vaccine_date",
+)
+
+# Column names used by older JHU daily reports, mapped to the names used here
+COLUMN_ALIASES = {
+    "Province/State": "Province_State",
+    "Country/Region": "Country_Region",
+    "Long": "Long_",
+    "Latitude": "Lat",
+    "Longitude": "Long_",
+    "Incidence_Rate": "Incident_Rate",
+    "Case-Fatality_Ratio": "Case_Fatality_Ratio",
+}
+
+# Set once per worker process by `init_worker`, so the lookups are not pickled with every chunk
+_country_ids = None
+_country_names = None
+
+
+def init_worker(country_ids, country_names):
+    global _country_ids, _country_names
+    _country_ids = country_ids
+    _country_names = country_names
+
+
+def normalize_header(header):
+    return [COLUMN_ALIASES.get(name.strip(), name.strip()) for name in header]
+
+
+def parse_header_line(line):
+    return normalize_header(next(csv.reader([line.decode("utf-8-sig")])))
+
+
+def read_header(file_path):
+    """
+    Returns the normalized column names of a CSV file and the byte offset of its first data row.
+    """
+    with open(file_path, "rb") as f:
+        header_line = f.readline()
+        offset = f.tell()
+    return parse_header_line(header_line), offset
+
+
+def split_byte_ranges(file_path, data_start, chunk_count):
+    """
+    Splits the data section of a CSV file into roughly equal (start, end) byte ranges.
+
+    Every boundary is moved forward to the start of the next line, so each range
+    holds whole rows only. Rows must not contain quoted line breaks.
+    """
+    file_size = os.path.getsize(file_path)
+    chunk_size = max((file_size - data_start) // max(chunk_count, 1), 1)
+    boundaries = [data_start]
+    with open(file_path, "rb") as f:
+        position = data_start + chunk_size
+        while position < file_size:
+            f.seek(position)
+            f.readline()
+            position = f.tell()
+            if position >= file_size:
+                break
+            if position > boundaries[-1]:
+                boundaries.append(position)
+            position += chunk_size
+    boundaries.append(file_size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _to_number(column):
+    """
+    Converts a column of strings to floats. Returns the values and a mask of
+    non-empty cells that could not be parsed.
+    """
+    values = pd.to_numeric(column.str.strip(), errors="coerce")
+    return values, values.isna() & (column != "")
+
+
+def parse_covid_chunk(file_path, start, end, header, default_date=None):
+    """
+    Parses and converts the rows of a plain COVID-19 CSV file between two byte offsets.
+    """
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        raw = f.read(end - start)
+    return parse_covid_block(raw, header, default_date)
+
+
+def _resolve_countries(frame):
+    """
+    Maps each row to a country ID, either from a `country_id` column or, for JHU daily
+    reports, from the `Country_Region` name.
+
+    Returns the IDs (NaN where unresolved), the country labels used in reject reports,
+    a mask of resolved rows and a mask of rows with an unparseable ID.
+    """
+    if "country_id" in frame.columns:
+        country_id, bad = _to_number(frame["country_id"])
+        country_id = np.trunc(country_id)
+        known = country_id.isin(_country_ids)
+        return country_id, country_id.astype("Int64"), known, bad
+    names = frame["Country_Region"].str.strip()
+    country_id = names.map(_country_names)
+    return country_id, names, country_id.notna(), pd.Series(False, index=frame.index)
+
+
+def parse_covid_block(raw, header, default_date=None):
+    """
+    Parses and converts a block of COVID-19 CSV rows (without the header line).
+
+    Runs in a worker process and does not touch the database; countries are resolved
+    against the lookups passed to `init_worker`. `default_date` is used as the file date
+    when the file has no `File_Date` column, e.g. one taken from a JHU report file name.
+
+    Returns:
+        tuple: (records, rejected, elapsed) where `records` is a list of tuples ordered
+        like COVID_FIELDS and `rejected` is a list of (reason, detail, row) tuples for
+        the quarantine file.
+    """
+    started = time.perf_counter()
+    if not raw.strip():
+        return [], [], time.perf_counter() - started
+    frame = pd.read_csv(
+        io.BytesIO(raw), names=header, header=None, dtype=str,
+        keep_default_na=False, na_filter=False,
+    )
+    country_column = "country_id" if "country_id" in frame.columns else "Country_Region"
+    if country_column not in frame.columns:
+        # Without a country column every row is quarantined, as the serial loader does
+        rejected = [(MISSING_COUNTRY, country_column, row) for row in frame.to_dict("records")]
+        return [], rejected, time.perf_counter() - started
+    missing = frame[country_column].str.strip() == ""
+    rejected = [(MISSING_COUNTRY, country_column, row) for row in frame[missing].to_dict("records")]
+    frame = frame[~missing].copy()
+    for column in ("Province_State", "Confirmed", "Deaths", "Recovered", "Active",
+                   "Incident_Rate", "Case_Fatality_Ratio"):
+        if column not in frame.columns:
+            frame[column] = ""
+
+    country_id, labels, known, bad = _resolve_countries(frame)
+    # Name of the first column that failed to parse in each row, or "" if none did
+    error_column = pd.Series("", index=frame.index).mask(bad, country_column)
+    metrics = {}
+    for column in ("Confirmed", "Deaths", "Recovered", "Active"):
+        values, bad = _to_number(frame[column])
+        metrics[column] = np.trunc(values.fillna(0))
+        error_column = error_column.mask(bad & (error_column == ""), column)
+    ratios = {}
+    for column in ("Incident_Rate", "Case_Fatality_Ratio"):
+        values, bad = _to_number(frame[column])
+        ratios[column] = values
+        error_column = error_column.mask(bad & (error_column == ""), column)
+    if "File_Date" in frame.columns:
+        file_date = pd.to_datetime(frame["File_Date"], format="%Y-%m-%d", errors="coerce")
+        bad = file_date.isna() & (frame["File_Date"] != "")
+        error_column = error_column.mask(bad & (error_column == ""), "File_Date")
+    else:
+        file_date = pd.Series(pd.Timestamp(default_date) if default_date else pd.NaT, index=frame.index)
+
+    valid = error_column == ""
+    for column, row in zip(error_column[~valid], frame[~valid].to_dict("records")):
+        rejected.append((PARSE_ERROR, f"invalid {column}", row))
+    unknown = valid & ~known
+    for label, row in zip(labels[unknown], frame[unknown].to_dict("records")):
+        rejected.append((UNKNOWN_COUNTRY, str(label), row))
+    keep = valid & known
+
+    province_state = frame["Province_State"][keep].str.strip()
+    file_date = file_date[keep]
+    records = list(zip(
+        country_id[keep].astype(np.int64).tolist(),
+        province_state.where(province_state != "", None).tolist(),
+        metrics["Confirmed"][keep].astype(np.int64).tolist(),
+        metrics["Deaths"][keep].astype(np.int64).tolist(),
+        metrics["Recovered"][keep].astype(np.int64).tolist(),
+        metrics["Active"][keep].astype(np.int64).tolist(),
+        ratios["Incident_Rate"][keep].astype(object).where(ratios["Incident_Rate"][keep].notna(), None).tolist(),
+        ratios["Case_Fatality_Ratio"][keep].astype(object).where(ratios["Case_Fatality_Ratio"][keep].notna(), None).tolist(),
+        file_date.dt.date.astype(object).where(file_date.notna(), None).tolist(),
+    ))
+    return records, rejected, time.perf_counter() - started
@@ -0,0 +1,132 @@
+# File: data_app/latest.py
+
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Sum, When
+from data_app.ingest import COVID_FIELDS
+from data_app.models import CovidData, CovidLatest
+
+METRICS = ("confirmed", "deaths", "recovered", "active")
+REPORT_FIELDS = METRICS + ("incident_rate", "case_fatality_ratio")
+
+# Positions of the fields in cleaned COVID-19 records
+_POSITIONS = {field: COVID_FIELDS.index(field) for field in ("country_id", "province_state", "file_date") + REPORT_FIELDS}
+
+
+def covid_latest_ready():
+    """
+    Returns True once the latest reports have been built, so views can rely on them.
+    """
+    return CovidLatest.objects.exists()
+
+
+def update_latest(records):
+    """
+    Moves the latest report of each region forward to the newest dated record in a batch
+    of cleaned COVID-19 records. A record dated the same day as the current report replaces
+    it, like an upsert of that report does. Runs in the caller's transaction.
+    """
+    newest = {}
+    for record in records:
+        file_date = record[_POSITIONS["file_date"]]
+        if file_date is None:
+            continue
+        key = record[_POSITIONS["country_id"]], record[_POSITIONS["province_state"]] or ""
+        current = newest.get(key)
+        if current is None or file_date >= current[_POSITIONS["file_date"]]:
+            newest[key] = record
+    if not newest:
+        return
+
+    with transaction.atomic():
+        existing = {
+            (row.country_id, row.province_key): row
+            for row in CovidLatest.objects.select_for_update().filter(
+                country_id__in={country_id for country_id, _ in newest}
+            )
+        }
+        changed, created = [], []
+        for key, record in newest.items():
+            row = existing.get(key)
+            if row is None:
+                row = CovidLatest(country_id=key[0], province_key=key[1])
+                created.append(row)
+            elif record[_POSITIONS["file_date"]] >= row.file_date:
+                changed.append(row)
+            else:
+                continue
+            row.province_state = record[_POSITIONS["province_state"]]
+            row.file_date = record[_POSITIONS["file_date"]]
+            for field in REPORT_FIELDS:
+                setattr(row, field, record[_POSITIONS[field]])
+        CovidLatest.objects.bulk_update(changed, ("province_state", "file_date") + REPORT_FIELDS, batch_size=500)
+        CovidLatest.objects.bulk_create(created, batch_size=500)
+
+
+def rebuild_covid_latest(batch_size=5000):
+    """
+    Rebuilds the latest reports from CovidData. Returns the number of regions.
+    """
+    rows = (
+        CovidData.objects.filter(file_date__isnull=False)
+        .order_by("country_id", "province_state", "file_date", "id")
+        .values_list(*COVID_FIELDS)
+    )
+    with transaction.atomic():
+        CovidLatest.objects.all().delete()
+        batch = []
+        regions = 0
+        previous = None
+        # Rows are ordered by date within a region, so its last row is its latest report
+        for record in rows.iterator(chunk_size=batch_size):
+            key = record[_POSITIONS["country_id"]], record[_POSITIONS["province_state"]]
+            if key != previous and batch and len(batch) >= batch_size:
+                update_latest(batch)
+                batch.clear()
+            if key != previous:
+                regions += 1
+                previous = key
+            batch.append(record)
+        update_latest(batch)
+    return regions
+
+
+def latest_reports(queryset, as_of=None):
+    """
+    Returns the latest report of each region of a CovidLatest queryset, or its latest
+    report on or before `as_of`, annotated with `report_date` and `report_<field>` values.
+
+    With `as_of`, the report of each region is resolved once, as the ID of its newest row
+    on the CovidData (country, province_state, file_date) index, and all its values are
+    then read from that row; regions without a report by then are left out. Missing and
+    empty provinces/states are one region, as in CovidLatest.
+    """
+    if as_of is None:
+        return queryset.annotate(
+            report_date=F("file_date"), **{f"report_{field}": F(field) for field in REPORT_FIELDS}
+        )
+    reports = CovidData.objects.filter(
+        country_id=OuterRef("country_id"), file_date__lte=as_of
+    ).order_by("-file_date", "-id").values("pk")
+    report_ids = queryset.annotate(report_id=Case(
+        When(province_key="", then=Subquery(reports.filter(Q(province_state__isnull=True) | Q(province_state=""))[:1])),
+        default=Subquery(reports.filter(province_state=OuterRef("province_state"))[:1]),
+    )).values("report_id")
+    return CovidData.objects.filter(pk__in=report_ids).annotate(
+        report_date=F("file_date"), **{f"report_{field}": F(field) for field in REPORT_FIELDS}
+    )
+
+
+def latest_totals(country_name=None, province_state=None, as_of=None):
+    """
+    Returns {'rows', 'total_confirmed', ...} summed over the latest report of each region
+    matching the filters, optionally as of a date.
+    """
+    queryset = CovidLatest.objects.all()
+    if country_name:
+        queryset = queryset.filter(country__name=country_name)
+    if province_state:
+        queryset = queryset.filter(province_state=province_state)
+    totals = latest_reports(queryset, as_of).aggregate(
+        rows=Count("id"), **{f"total_{metric}": Sum(f"report_{metric}") for metric in METRICS}
+    )
+    return {name: value or 0 for name, value in totals.items()}
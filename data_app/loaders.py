@@ -0,0 +1,159 @@
+# File: data_app/loaders.py
+
+import csv
+import io
+import time
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+
+
+class OrmLoader:
+    """
+    Buffers cleaned records and writes them with `bulk_create`. Works on every database backend.
+    """
+
+    def __init__(self, model, fields, batch_size):
+        self.model = model
+        self.fields = fields
+        self.batch_size = batch_size
+        self.buffer = []
+        # Called with (rows, seconds) after each written batch, e.g. for progress metrics
+        self.on_flush = None
+        # Called with the written records in the same transaction, e.g. to maintain summaries
+        self.after_write = None
+
+    def add(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        started = time.perf_counter()
+        with transaction.atomic():
+            self.write()
+            if self.after_write:
+                self.after_write(self.buffer)
+        if self.on_flush:
+            self.on_flush(len(self.buffer), time.perf_counter() - started)
+        self.buffer.clear()
+
+    def write(self):
+        self.model.objects.bulk_create(
+            [self.model(**dict(zip(self.fields, record))) for record in self.buffer]
+        )
+
+
+class CopyLoader(OrmLoader):
+    """
+    Streams cleaned records into the model's table with PostgreSQL `COPY FROM STDIN`.
+    """
+
+    # Marker written for None values; never produced by the cleaned data itself
+    NULL = r"\N"
+
+    def __init__(self, model, fields, batch_size):
+        super().__init__(model, fields, batch_size)
+        columns = ", ".join(
+            connection.ops.quote_name(model._meta.get_field(field).column) for field in fields
+        )
+        self.sql = (
+            f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '{self.NULL}')"
+        )
+
+    def write(self):
+        stream = io.StringIO()
+        writer = csv.writer(stream)
+        for record in self.buffer:
+            writer.writerow([self.NULL if value is None else value for value in record])
+        stream.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(self.sql, stream)
+
+
+LOADERS = {
+    "orm": OrmLoader,
+    "copy": CopyLoader,
+}
+
+
+def resolve_backend(backend):
+    """
+    Maps the `--backend` option to a loader name; `auto` picks COPY on PostgreSQL only.
+    """
+    if backend == "auto":
+        return "copy" if connection.vendor == "postgresql" else "orm"
+    if backend == "copy" and connection.vendor != "postgresql":
+        raise ValueError(f"The copy backend requires PostgreSQL, not {connection.vendor}.")
+    return backend
+
+
+def get_loader(backend, model, fields, batch_size):
+    return LOADERS[backend](model, fields, batch_size)
+
+
+@contextmanager
+def indexes_dropped(model):
+    """
+    Drops the indexes declared in `model.Meta.indexes` for the duration of a bulk load
+    and rebuilds them afterwards, even if the load fails.
+    """
+    indexes = list(model._meta.indexes)
+    with connection.schema_editor() as editor:
+        for index in indexes:
+            editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.add_index(model, index)
+
+
+class UpsertLoader:
+    """
+    Wraps another loader so each flushed batch replaces existing rows with the same
+    natural key instead of adding duplicates.
+
+    The first key field is used to look up candidate rows, so it should be indexed
+    (e.g., `file_date` for CovidData). Within a batch, the last record for a key wins.
+    """
+
+    def __init__(self, loader, key_fields):
+        self.loader = loader
+        self.model = loader.model
+        self.key_fields = key_fields
+        self.key_indexes = [loader.fields.index(field) for field in key_fields]
+        self.buffer = {}
+        self.on_flush = None
+        # Called with a queryset of the rows about to be replaced, in the same transaction
+        self.before_delete = None
+
+    def add(self, record):
+        self.buffer[tuple(record[i] for i in self.key_indexes)] = record
+        if len(self.buffer) >= self.loader.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        started = time.perf_counter()
+        lookup_values = {key[0] for key in self.buffer}
+        with transaction.atomic():
+            existing = self.model.objects.filter(
+                **{f"{self.key_fields[0]}__in": lookup_values}
+            ).values_list("pk", *self.key_fields)
+            stale_ids = [pk for pk, *key in existing.iterator() if tuple(key) in self.buffer]
+            for start in range(0, len(stale_ids), 900):
+                stale = self.model.objects.filter(pk__in=stale_ids[start:start + 900])
+                if self.before_delete:
+                    self.before_delete(stale)
+                stale.delete()
+            self.loader.buffer.extend(self.buffer.values())
+            self.loader.flush()
+        if self.on_flush:
+            self.on_flush(len(self.buffer), time.perf_counter() - started)
+        self.buffer.clear()
@@ -0,0 +1,124 @@
+# File: data_app/management/commands/export_snapshot.py
+
+import json
+import os
+import re
+import shutil
+import time
+from array import array
+from datetime import datetime
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from data_app.models import Country, CovidData
+from data_app.snapshot import COLUMNS, CURRENT_FILE, DATE_NULL, EPOCH, snapshot_dir
+from data_app.versions import current_version
+
+# Names of the snapshot directories this command writes (a %Y%m%d%H%M%S%f timestamp)
+SNAPSHOT_NAME = re.compile(r"\d{20}")
+
+
+class Command(BaseCommand):
+    help = "Export CovidData as a memory-mappable columnar snapshot of NumPy .npy files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output-dir",
+            help="Directory holding the snapshots (default: settings.COVID_SNAPSHOT_DIR)",
+        )
+        parser.add_argument(
+            "--keep", type=int, default=2,
+            help="Number of snapshots to keep, including the new one (default: 2)",
+        )
+
+    def handle(self, *args, **kwargs):
+        base_dir = kwargs["output_dir"] or snapshot_dir()
+        os.makedirs(base_dir, exist_ok=True)
+
+        self.stdout.write("Reading COVID-19 data...")
+        start_time = time.time()
+        # Read before the rows: a load running meanwhile leaves the snapshot behind the version
+        version = current_version()
+        country_names = dict(Country.objects.values_list("id", "name"))
+        province_codes = {}
+        columns = {name: array("f" if dtype == np.float32 else "i") for name, dtype in COLUMNS.items()}
+        rows = CovidData.objects.values_list(
+            "country_id", "province_state", "file_date", "confirmed", "deaths", "recovered", "active",
+            "incident_rate", "case_fatality_ratio",
+        )
+        nan = float("nan")
+        for (country_id, province, file_date, confirmed, deaths, recovered, active,
+             incident_rate, case_fatality_ratio) in rows.iterator(chunk_size=20000):
+            columns["country"].append(country_id)
+            columns["province"].append(province_codes.setdefault(province, len(province_codes)))
+            columns["date"].append((file_date - EPOCH).days if file_date else DATE_NULL)
+            columns["confirmed"].append(confirmed)
+            columns["deaths"].append(deaths)
+            columns["recovered"].append(recovered)
+            columns["active"].append(active)
+            columns["incident_rate"].append(nan if incident_rate is None else incident_rate)
+            columns["case_fatality_ratio"].append(nan if case_fatality_ratio is None else case_fatality_ratio)
+        arrays = {name: np.frombuffer(values, dtype=COLUMNS[name]) for name, values in columns.items()}
+        self.stdout.write(f"Read {len(arrays['date'])} rows in {time.time() - start_time:.2f} seconds.")
+
+        # Dictionary-encode countries and provinces so codes follow alphabetical order
+        start_time = time.time()
+        countries = sorted(country_names.values())
+        country_codes = {name: code for code, name in enumerate(countries)}
+        id_to_code = np.zeros(max(country_names, default=0) + 1, dtype=np.int32)
+        for country_id, name in country_names.items():
+            id_to_code[country_id] = country_codes[name]
+        arrays["country"] = id_to_code[arrays["country"]]
+
+        provinces = [None] + sorted(name for name in province_codes if name is not None)
+        sorted_codes = {name: code for code, name in enumerate(provinces)}
+        remap = np.zeros(max(len(province_codes), 1), dtype=np.int32)
+        for name, code in province_codes.items():
+            remap[code] = sorted_codes[name]
+        arrays["province"] = remap[arrays["province"]]
+
+        order = np.lexsort((arrays["date"], arrays["province"], arrays["country"]))
+        arrays = {name: np.ascontiguousarray(values[order]) for name, values in arrays.items()}
+        self.stdout.write(f"Encoded and sorted columns in {time.time() - start_time:.2f} seconds.")
+
+        # Write into a new directory, then switch the CURRENT pointer atomically
+        name = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        path = os.path.join(base_dir, name)
+        os.makedirs(path)
+        for column, values in arrays.items():
+            np.save(os.path.join(path, f"{column}.npy"), values)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({
+                "rows": int(len(order)),
+                "version": version,
+                "created": datetime.now().isoformat(),
+                "columns": {column: np.dtype(dtype).name for column, dtype in COLUMNS.items()},
+                "countries": countries,
+                "provinces": provinces,
+            }, f)
+        pointer = os.path.join(base_dir, f"{CURRENT_FILE}.tmp")
+        with open(pointer, "w") as f:
+            f.write(name)
+        os.replace(pointer, os.path.join(base_dir, CURRENT_FILE))
+
+        self.prune(base_dir, name, max(kwargs["keep"], 1))
+        self.stdout.write(self.style.SUCCESS(f"Snapshot of {len(order)} rows written to {path}."))
+
+    def prune(self, base_dir, current, keep):
+        """
+        Deletes all but the newest `keep` snapshots. Only directories named and laid out
+        like the ones this command writes are considered, so anything else in the output
+        directory is left alone.
+        """
+        snapshots = sorted(
+            entry for entry in os.listdir(base_dir)
+            if SNAPSHOT_NAME.fullmatch(entry) and os.path.isfile(os.path.join(base_dir, entry, "meta.json"))
+        )
+        # Readers that still map an older snapshot keep their open files on POSIX systems
+        for old in snapshots[:-keep]:
+            if old == current:
+                continue
+            try:
+                shutil.rmtree(os.path.join(base_dir, old))
+            except OSError as e:
+                self.stdout.write(self.style.WARNING(f"Could not delete the old snapshot {old}: {e}"))
@@ -1,48 +1,303 @@
 # File: data_app/management/commands/load_data.py
 
 import csv
+import json
+import os
 import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from django.core.management.base import BaseCommand
-from data_app.models import Country, CovidData, VaccinationData
+from contextlib import nullcontext
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from data_app.ingest import (
+    COVID_FIELDS, VACCINATION_FIELDS, init_worker, normalize_header, parse_covid_block, parse_covid_chunk,
+    parse_header_line, read_header, split_byte_ranges,
+)
+from data_app.latest import covid_latest_ready, rebuild_covid_latest, update_latest
+from data_app.loaders import UpsertLoader, get_loader, indexes_dropped, resolve_backend
+from data_app.models import Country, CovidData, IngestManifest, VaccinationData
+from data_app.reporting import MISSING_COUNTRY, PARSE_ERROR, UNKNOWN_COUNTRY, IngestStats, Quarantine
+from data_app.rollups import refresh_covid_rollups
+from data_app.sources import (
+    date_from_name, expand_sources, is_compressed, iter_binary_streams, iter_line_blocks, text_stream,
+)
+from data_app.totals import apply_deltas, covid_totals_ready, queryset_deltas, rebuild_covid_totals, record_deltas
+from data_app.versions import bump_version
+
+# Natural key of a CovidData row; file_date comes first because UpsertLoader looks rows up by it
+COVID_NATURAL_KEY = ("file_date", "country_id", "province_state")
 
 
 class Command(BaseCommand):
-    help = "Load data from normalized CSV files into the database"
+    help = "Load data from normalized CSV files or JHU daily reports into the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--countries", metavar="PATH",
+            help="CSV file with id, Country_Region, Lat and Long_ columns",
+        )
+        parser.add_argument(
+            "--vaccinations", metavar="PATH",
+            help="CSV file with one vaccination record per row and a country_id column",
+        )
+        parser.add_argument(
+            "--covid", nargs="+", metavar="SOURCE", default=[],
+            help="COVID-19 CSV files, glob patterns or directories of JHU-style daily reports. "
+                 ".gz, .xz and .zip files are read as streams without extracting them.",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help="Number of processes used to parse the COVID-19 CSV (default: 1, serial)",
+        )
+        parser.add_argument(
+            "--backend", choices=["auto", "orm", "copy"], default="auto",
+            help="How rows are written: ORM bulk_create, or PostgreSQL COPY FROM STDIN (default: auto)",
+        )
+        parser.add_argument(
+            "--rebuild-indexes", action="store_true",
+            help="Drop the CovidData Meta.indexes before loading and rebuild them afterwards",
+        )
+        parser.add_argument(
+            "--incremental", action="store_true",
+            help="Skip unchanged sources, load only dates newer than the ingest manifest and "
+                 "upsert COVID-19 rows on (country, province_state, file_date)",
+        )
+        parser.add_argument(
+            "--quarantine", metavar="PATH",
+            help="CSV file that receives rejected rows with a reason code (default: count them only)",
+        )
+        parser.add_argument(
+            "--progress-interval", type=float, default=10.0, metavar="SECONDS",
+            help="Seconds between progress lines (default: 10)",
+        )
+        parser.add_argument(
+            "--summary", metavar="PATH",
+            help="Also write the final JSON summary of the run to this file",
+        )
 
     def handle(self, *args, **kwargs):
-        countries_csv = "D:/YCB/Public Health Insights from COVID-19 Data/DataSet/src/countries.csv"
-        vaccination_data_csv = "D:/YCB/Public Health Insights from COVID-19 Data/DataSet/src/vaccination_data.csv"
-        covid_data_csv = "D:/YCB/Public Health Insights from COVID-19 Data/DataSet/src/covid_data.csv"
+        if not (kwargs["countries"] or kwargs["vaccinations"] or kwargs["covid"]):
+            raise CommandError("Nothing to load. Pass --countries, --vaccinations and/or --covid.")
+        workers = kwargs["workers"]
+        self.incremental = kwargs["incremental"]
+        try:
+            self.backend = resolve_backend(kwargs["backend"])
+            covid_sources = expand_sources(kwargs["covid"])
+            for path in filter(None, [kwargs["countries"], kwargs["vaccinations"]]):
+                if not os.path.isfile(path):
+                    raise FileNotFoundError(f"No such file: {path!r}.")
+        except (ValueError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+        self.quarantine = Quarantine(kwargs["quarantine"])
+        self.stats = IngestStats(self.stdout, self.quarantine, interval=kwargs["progress_interval"])
+        try:
+            self.load_all(covid_sources, workers, kwargs)
+        finally:
+            self.quarantine.close()
+        # Let running servers reload dropdown choices and other data-derived caches
+        bump_version()
+
+        summary = self.stats.summary(backend=self.backend, workers=workers, incremental=self.incremental)
+        if kwargs["summary"]:
+            with open(kwargs["summary"], "w") as f:
+                json.dump(summary, f, indent=2)
+        if self.quarantine.total():
+            self.stdout.write(self.style.WARNING(
+                f"Rejected {self.quarantine.total()} rows" +
+                (f", written to {self.quarantine.path}." if self.quarantine.path else ".")
+            ))
+        self.stdout.write(json.dumps(summary))
 
+    def load_all(self, covid_sources, workers, kwargs):
         # Load countries
-        self.stdout.write("Loading countries...")
-        start_time = time.time()
-        self.load_countries(countries_csv)
-        elapsed_time = time.time() - start_time
-        self.stdout.write(self.style.SUCCESS(f"Countries loaded in {elapsed_time:.2f} seconds."))
+        if kwargs["countries"]:
+            self.stdout.write("Loading countries...")
+            start_time = time.time()
+            self.stats.start("countries")
+            self.load_countries(kwargs["countries"])
+            self.stats.finish()
+            elapsed_time = time.time() - start_time
+            self.stdout.write(self.style.SUCCESS(f"Countries loaded in {elapsed_time:.2f} seconds."))
+        self.load_country_lookups()
 
         # Load vaccination data
-        self.stdout.write("Loading vaccination data...")
-        start_time = time.time()
-        self.load_vaccination_data(vaccination_data_csv)
-        elapsed_time = time.time() - start_time
-        self.stdout.write(self.style.SUCCESS(f"Vaccination data loaded in {elapsed_time:.2f} seconds."))
+        if kwargs["vaccinations"]:
+            self.stdout.write("Loading vaccination data...")
+            start_time = time.time()
+            self.stats.start("vaccination_data")
+            if self.incremental:
+                self.load_vaccination_data_incremental(kwargs["vaccinations"])
+            else:
+                self.load_vaccination_data(kwargs["vaccinations"])
+            self.stats.finish()
+            elapsed_time = time.time() - start_time
+            self.stdout.write(self.style.SUCCESS(f"Vaccination data loaded in {elapsed_time:.2f} seconds."))
 
         # Load COVID-19 data
-        self.stdout.write("Loading COVID-19 data...")
-        start_time = time.time()
-        self.load_covid_data(covid_data_csv)
-        elapsed_time = time.time() - start_time
-        self.stdout.write(self.style.SUCCESS(f"COVID-19 data loaded in {elapsed_time:.2f} seconds."))
+        if covid_sources:
+            self.stdout.write(f"Loading COVID-19 data from {len(covid_sources)} source(s) ({self.backend} backend)...")
+            start_time = time.time()
+            if not covid_totals_ready():
+                # Totals are maintained per batch from here on, so they must start complete
+                self.stdout.write("Building COVID-19 totals from existing data...")
+                rebuild_covid_totals()
+            if not covid_latest_ready():
+                self.stdout.write("Building latest COVID-19 reports from existing data...")
+                rebuild_covid_latest()
+            self.stats.start("covid_data")
+            self.parse_seconds = self.write_seconds = 0.0
+            self.parsed_rows = 0
+            self.changed_series = {}
+            pool = (
+                ProcessPoolExecutor(
+                    max_workers=workers, initializer=init_worker,
+                    initargs=(self.country_ids, self.country_names),
+                )
+                if workers > 1 else nullcontext()
+            )
+            with pool, indexes_dropped(CovidData) if kwargs["rebuild_indexes"] else nullcontext():
+                for path in covid_sources:
+                    self.load_covid_source(path, pool if workers > 1 else None, workers)
+            self.stats.finish()
+            if workers > 1:
+                self.report_parallel_stats(workers)
+            elapsed_time = time.time() - start_time
+            self.stdout.write(self.style.SUCCESS(f"COVID-19 data loaded in {elapsed_time:.2f} seconds."))
+
+            if self.changed_series:
+                self.stdout.write(f"Refreshing daily rollups of {len(self.changed_series)} series...")
+                start_time = time.time()
+                rollup_rows = refresh_covid_rollups(self.changed_series)
+                elapsed_time = time.time() - start_time
+                self.stdout.write(self.style.SUCCESS(f"{rollup_rows} daily rollups written in {elapsed_time:.2f} seconds."))
+
+    def load_country_lookups(self):
+        """
+        Loads valid country IDs and a name-to-ID map once, so rows can reference `country_id`
+        directly instead of fetching a Country instance per row.
+        """
+        self.country_ids = set(Country.objects.values_list("id", flat=True))
+        self.country_names = dict(Country.objects.values_list("name", "id"))
+
+    def resolve_country(self, row, table, source):
+        """
+        Returns the country ID of a row, from its `country_id` column or, for JHU daily
+        reports, its `Country_Region` name. Returns None, after quarantining the row,
+        for rows to skip.
+        """
+        if "country_id" in row:
+            if not row["country_id"]:  # Skip rows with missing country_id
+                self.quarantine.add(table, source, MISSING_COUNTRY, "country_id", row)
+                return None
+            country_id = int(float(row["country_id"]))
+            if country_id not in self.country_ids:
+                self.quarantine.add(table, source, UNKNOWN_COUNTRY, str(country_id), row)
+                return None
+            return country_id
+        name = (row.get("Country_Region") or "").strip()
+        if not name:
+            self.quarantine.add(table, source, MISSING_COUNTRY, "Country_Region", row)
+            return None
+        country_id = self.country_names.get(name)
+        if country_id is None:
+            self.quarantine.add(table, source, UNKNOWN_COUNTRY, name, row)
+        return country_id
+
+    def iter_text_sources(self, file_path):
+        """
+        Yields (name, text stream) pairs for a possibly compressed source file.
+        """
+        for name, stream in iter_binary_streams(file_path):
+            with text_stream(stream) as f:
+                yield name, f
+
+    def fingerprint(self, file_path):
+        stat = os.stat(file_path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def get_manifest(self, file_path, table):
+        return IngestManifest.objects.filter(source=os.path.abspath(file_path), table=table).first()
+
+    def save_manifest(self, file_path, table, max_file_date, row_count, replace=False):
+        """
+        Records a loaded source; `row_count` rows are added to its count, or replace it
+        for sources that are reloaded as a whole.
+        """
+        manifest, _ = IngestManifest.objects.get_or_create(
+            source=os.path.abspath(file_path), table=table,
+            defaults={"fingerprint": ""},
+        )
+        manifest.fingerprint = self.fingerprint(file_path)
+        manifest.max_file_date = max_file_date
+        manifest.row_count = row_count if replace else manifest.row_count + row_count
+        manifest.save()
+
+    def get_covid_loader(self):
+        loader = get_loader(self.backend, CovidData, COVID_FIELDS, batch_size=5000)
+        loader.after_write = self.update_summaries
+        if self.incremental:
+            loader = UpsertLoader(loader, COVID_NATURAL_KEY)
+            loader.before_delete = self.subtract_totals
+        loader.on_flush = self.record_covid_batch
+        return loader
+
+    def record_covid_batch(self, rows, seconds):
+        # Rows actually written, after the upsert has collapsed records with the same key
+        self.covid_written_rows += rows
+        self.stats.record_batch(rows, seconds)
+
+    def update_summaries(self, records):
+        # Runs in the transaction that writes the batch, so summaries never drift from the rows
+        apply_deltas(record_deltas(records))
+        update_latest(records)
+
+    def subtract_totals(self, stale):
+        deltas = queryset_deltas(stale, sign=-1)
+        self.covid_replaced_rows -= sum(delta[0] for delta in deltas.values())
+        apply_deltas(deltas)
+
+    def add_covid_record(self, loader, record):
+        """
+        Passes a cleaned record to the loader. In incremental mode, records dated on or
+        before the manifest watermark, or without a date, are skipped.
+
+        Also tracks the earliest date written per (country, province/state) series, from
+        which its daily rollups are refreshed after the load.
+        """
+        if self.incremental:
+            file_date = record[-1]
+            if file_date is None or (self.watermark and file_date <= self.watermark):
+                self.covid_stale_rows += 1
+                return
+            if self.covid_max_date is None or file_date > self.covid_max_date:
+                self.covid_max_date = file_date
+        loader.add(record)
+        file_date = record[-1]
+        if file_date is not None:
+            key = record[0], record[1]
+            since = self.changed_series.get(key)
+            if since is None or file_date < since:
+                self.changed_series[key] = file_date
+
+    def report_parallel_stats(self, workers):
+        # Parse time is summed over workers, so its rate is per worker process
+        self.stdout.write(
+            f"Parse: {self.parsed_rows} rows in {self.parse_seconds:.2f} worker-seconds "
+            f"({self.parsed_rows / max(self.parse_seconds, 1e-9):.0f} rows/s per worker, {workers} workers)"
+        )
+        self.stdout.write(
+            f"Write: {self.parsed_rows} rows in {self.write_seconds:.2f} seconds "
+            f"({self.parsed_rows / max(self.write_seconds, 1e-9):.0f} rows/s)"
+        )
 
     def load_countries(self, file_path):
         batch_size = 1000
         countries = []
-        with open(file_path, "r") as f:
+        for name, f in self.iter_text_sources(file_path):
             reader = csv.DictReader(f, delimiter=",")
             for row in reader:
                 if not row["id"] or not row["Country_Region"]:
+                    self.quarantine.add("countries", name, MISSING_COUNTRY, "id or Country_Region", row)
                     continue
                 try:
                     countries.append(
@@ -54,68 +309,153 @@ class Command(BaseCommand):
                         )
                     )
                     if len(countries) >= batch_size:
-                        Country.objects.bulk_create(countries, ignore_conflicts=True)
-                        countries.clear()
+                        self.write_countries(countries)
                 except Exception as e:
-                    self.stderr.write(f"Error processing country: {row} -> {e}")
-            if countries:
-                Country.objects.bulk_create(countries, ignore_conflicts=True)
+                    self.quarantine.add("countries", name, PARSE_ERROR, str(e), row)
+        self.write_countries(countries)
+
+    def write_countries(self, countries):
+        if not countries:
+            return
+        start_time = time.perf_counter()
+        Country.objects.bulk_create(countries, ignore_conflicts=True)
+        self.stats.record_batch(len(countries), time.perf_counter() - start_time)
+        countries.clear()
 
     def load_vaccination_data(self, file_path):
-        batch_size = 1000
-        vaccinations = []
-        with open(file_path, "r") as f:
+        loader = get_loader(self.backend, VaccinationData, VACCINATION_FIELDS, batch_size=1000)
+        loader.on_flush = self.stats.record_batch
+        for name, f in self.iter_text_sources(file_path):
             reader = csv.DictReader(f, delimiter=",")
             for row in reader:
-                if not row["country_id"]:  # Skip rows with missing country_id
-                    continue
                 try:
-                    country = Country.objects.get(id=int(float(row["country_id"])))
-                    vaccinations.append(
-                        VaccinationData(
-                            country=country,
-                            total_vaccinations=int(row["total_vaccinations"]) if row["total_vaccinations"] else 0,
-                            persons_vaccinated_first_dose=int(row["persons_vaccinated_first_dose"]) if row["persons_vaccinated_first_dose"] else 0,
-                            persons_last_dose=int(row["persons_last_dose"]) if row["persons_last_dose"] else 0,
-                            persons_booster_add_dose=int(row["persons_booster_add_dose"]) if row["persons_booster_add_dose"] else 0,
-                            first_vaccine_date=datetime.strptime(row["first_vaccine_date"], "%m/%d/%Y").date() if row["first_vaccine_date"] else None,
-                        )
-                    )
-                    if len(vaccinations) >= batch_size:
-                        VaccinationData.objects.bulk_create(vaccinations)
-                        vaccinations.clear()
+                    country_id = self.resolve_country(row, "vaccination_data", name)
+                    if country_id is None:
+                        continue
+                    loader.add((
+                        country_id,
+                        int(row["total_vaccinations"]) if row["total_vaccinations"] else 0,
+                        int(row["persons_vaccinated_first_dose"]) if row["persons_vaccinated_first_dose"] else 0,
+                        int(row["persons_last_dose"]) if row["persons_last_dose"] else 0,
+                        int(row["persons_booster_add_dose"]) if row["persons_booster_add_dose"] else 0,
+                        datetime.strptime(row["first_vaccine_date"], "%m/%d/%Y").date() if row["first_vaccine_date"] else None,
+                    ))
                 except Exception as e:
-                    self.stderr.write(f"Error processing vaccination data: {row} -> {e}")
-            if vaccinations:
-                VaccinationData.objects.bulk_create(vaccinations)
-
-    def load_covid_data(self, file_path):
-        batch_size = 5000
-        covid_records = []
-        with open(file_path, "r") as f:
-            reader = csv.DictReader(f, delimiter=",")
-            for row in reader:
-                if not row["country_id"]:  # Skip rows with missing country_id
+                    self.quarantine.add("vaccination_data", name, PARSE_ERROR, str(e), row)
+        loader.flush()
+
+    def load_vaccination_data_incremental(self, file_path):
+        """
+        The vaccination file is a per-country snapshot without a date column, so it is
+        replaced as a whole when it changes and skipped otherwise.
+        """
+        manifest = self.get_manifest(file_path, "vaccination_data")
+        if manifest and manifest.fingerprint == self.fingerprint(file_path):
+            self.stdout.write("Vaccination data unchanged since the last incremental load, skipping.")
+            return
+        with transaction.atomic():
+            VaccinationData.objects.all().delete()
+            self.load_vaccination_data(file_path)
+            self.save_manifest(file_path, "vaccination_data", None, VaccinationData.objects.count(), replace=True)
+
+    def load_covid_source(self, file_path, pool, workers):
+        """
+        Loads one COVID-19 source file, which may hold several reports (e.g., a zip archive).
+        """
+        manifest = self.get_manifest(file_path, "covid_data") if self.incremental else None
+        if manifest and manifest.fingerprint == self.fingerprint(file_path):
+            self.stdout.write(f"{file_path} unchanged since the last incremental load, skipping.")
+            return
+        self.watermark = manifest.max_file_date if manifest else None
+        self.covid_max_date = self.watermark
+        self.covid_written_rows = self.covid_replaced_rows = self.covid_stale_rows = 0
+
+        loader = self.get_covid_loader()
+        for name, stream in iter_binary_streams(file_path):
+            # JHU daily reports have no date column; their file name carries the date
+            default_date = date_from_name(name)
+            if pool:
+                self.load_covid_data_parallel(file_path, name, stream, default_date, loader, pool, workers)
+            else:
+                with text_stream(stream) as f:
+                    self.load_covid_data(f, name, default_date, loader)
+        start_time = time.time()
+        loader.flush()
+        if pool:
+            self.write_seconds += time.time() - start_time
+
+        if self.incremental:
+            new_rows = self.covid_written_rows - self.covid_replaced_rows
+            self.stdout.write(
+                f"{file_path}: loaded {new_rows} new COVID-19 rows after {self.watermark or 'the beginning'}, "
+                f"replaced {self.covid_replaced_rows} existing rows, "
+                f"skipped {self.covid_stale_rows} already ingested or undated rows."
+            )
+            self.save_manifest(file_path, "covid_data", self.covid_max_date, new_rows)
+
+    def load_covid_data(self, f, source, default_date, loader):
+        reader = csv.DictReader(f, delimiter=",")
+        reader.fieldnames = normalize_header(reader.fieldnames or [])
+        has_file_date = "File_Date" in reader.fieldnames
+        for row in reader:
+            try:
+                country_id = self.resolve_country(row, "covid_data", source)
+                if country_id is None:
                     continue
-                try:
-                    country = Country.objects.get(id=int(float(row["country_id"])))
-                    covid_records.append(
-                        CovidData(
-                            country=country,
-                            province_state=row["Province_State"].strip() if row["Province_State"] else None,
-                            confirmed=int(float(row["Confirmed"])) if row["Confirmed"] else 0,
-                            deaths=int(float(row["Deaths"])) if row["Deaths"] else 0,
-                            recovered=int(float(row["Recovered"])) if row["Recovered"] else 0,
-                            active=int(float(row["Active"])) if row["Active"] else 0,
-                            incident_rate=float(row["Incident_Rate"]) if row["Incident_Rate"] else None,
-                            case_fatality_ratio=float(row["Case_Fatality_Ratio"]) if row["Case_Fatality_Ratio"] else None,
-                            file_date=datetime.strptime(row["File_Date"], "%Y-%m-%d").date() if row["File_Date"] else None,
-                        )
-                    )
-                    if len(covid_records) >= batch_size:
-                        CovidData.objects.bulk_create(covid_records)
-                        covid_records.clear()
-                except Exception as e:
-                    self.stderr.write(f"Error processing COVID-19 data: {row} -> {e}")
-            if covid_records:
-                CovidData.objects.bulk_create(covid_records)
+                if has_file_date:
+                    file_date = datetime.strptime(row["File_Date"], "%Y-%m-%d").date() if row["File_Date"] else None
+                else:
+                    file_date = default_date
+                self.add_covid_record(loader, (
+                    country_id,
+                    row["Province_State"].strip() or None if row.get("Province_State") else None,
+                    int(float(row["Confirmed"])) if row.get("Confirmed") else 0,
+                    int(float(row["Deaths"])) if row.get("Deaths") else 0,
+                    int(float(row["Recovered"])) if row.get("Recovered") else 0,
+                    int(float(row["Active"])) if row.get("Active") else 0,
+                    float(row["Incident_Rate"]) if row.get("Incident_Rate") else None,
+                    float(row["Case_Fatality_Ratio"]) if row.get("Case_Fatality_Ratio") else None,
+                    file_date,
+                ))
+            except Exception as e:
+                self.quarantine.add("covid_data", source, PARSE_ERROR, str(e), row)
+
+    def load_covid_data_parallel(self, file_path, source, stream, default_date, loader, pool, workers):
+        """
+        Parses chunks of a COVID-19 report in the process pool and writes the converted
+        records from this process only.
+
+        Plain files are split into byte ranges that workers read themselves; compressed
+        streams are decompressed here and shipped to workers in blocks of lines.
+        """
+        if is_compressed(file_path):
+            header = parse_header_line(stream.readline())
+            tasks = ((parse_covid_block, block, header, default_date) for block in iter_line_blocks(stream))
+        else:
+            header, data_start = read_header(file_path)
+            tasks = (
+                (parse_covid_chunk, file_path, start, end, header, default_date)
+                for start, end in split_byte_ranges(file_path, data_start, workers * 4)
+            )
+
+        # Keep a bounded window of chunks in flight so parsed rows don't pile up in memory
+        pending = []
+        while True:
+            while len(pending) < workers * 2:
+                task = next(tasks, None)
+                if task is None:
+                    break
+                pending.append(pool.submit(*task))
+            if not pending:
+                break
+
+            records, rejected, elapsed = pending.pop(0).result()
+            self.parse_seconds += elapsed
+            self.parsed_rows += len(records)
+            for reason, detail, row in rejected:
+                self.quarantine.add("covid_data", source, reason, detail, row)
+
+            start_time = time.time()
+            for record in records:
+                self.add_covid_record(loader, record)
+            self.write_seconds += time.time() - start_time
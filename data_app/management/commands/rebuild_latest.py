@@ -0,0 +1,19 @@
+# File: data_app/management/commands/rebuild_latest.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from data_app.latest import rebuild_covid_latest
+from data_app.versions import bump_version
+
+
+class Command(BaseCommand):
+    help = "Rebuild the latest COVID-19 report per country and province/state from CovidData"
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write("Rebuilding latest COVID-19 reports...")
+        start_time = time.time()
+        regions = rebuild_covid_latest()
+        bump_version()
+        elapsed_time = time.time() - start_time
+        self.stdout.write(self.style.SUCCESS(f"Latest reports of {regions} regions rebuilt in {elapsed_time:.2f} seconds."))
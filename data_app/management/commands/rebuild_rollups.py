@@ -0,0 +1,25 @@
+# File: data_app/management/commands/rebuild_rollups.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from data_app.rollups import rebuild_covid_rollups
+from data_app.versions import bump_version
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily COVID-19 rollups (prefix sums per country and province/state) from CovidData"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=5000,
+            help="Number of rollup rows written per batch (default: 5000)",
+        )
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write("Rebuilding daily rollups...")
+        start_time = time.time()
+        rows = rebuild_covid_rollups(kwargs["batch_size"])
+        bump_version()
+        elapsed_time = time.time() - start_time
+        self.stdout.write(self.style.SUCCESS(f"{rows} daily rollups written in {elapsed_time:.2f} seconds."))
@@ -0,0 +1,19 @@
+# File: data_app/management/commands/rebuild_totals.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from data_app.totals import rebuild_covid_totals
+from data_app.versions import bump_version
+
+
+class Command(BaseCommand):
+    help = "Rebuild the worldwide, per-country and per-province/state COVID-19 totals from CovidData"
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write("Rebuilding COVID-19 totals...")
+        start_time = time.time()
+        rebuild_covid_totals()
+        bump_version()
+        elapsed_time = time.time() - start_time
+        self.stdout.write(self.style.SUCCESS(f"COVID-19 totals rebuilt in {elapsed_time:.2f} seconds."))
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestManifest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=1024)),
+                ('table', models.CharField(max_length=64)),
+                ('fingerprint', models.CharField(max_length=255)),
+                ('max_file_date', models.DateField(blank=True, null=True)),
+                ('row_count', models.BigIntegerField(default=0)),
+                ('ingested_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('source', 'table')},
+            },
+        ),
+    ]
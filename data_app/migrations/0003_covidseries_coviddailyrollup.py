@@ -0,0 +1,45 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_app', '0002_ingestmanifest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CovidSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('province_state', models.CharField(blank=True, max_length=255, null=True)),
+                ('province_key', models.CharField(default='', max_length=255)),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='covid_series', to='data_app.country')),
+            ],
+            options={
+                'unique_together': {('country', 'province_key')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CovidDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_date', models.DateField()),
+                ('confirmed', models.BigIntegerField(default=0)),
+                ('deaths', models.BigIntegerField(default=0)),
+                ('recovered', models.BigIntegerField(default=0)),
+                ('active', models.BigIntegerField(default=0)),
+                ('cum_confirmed', models.BigIntegerField(default=0)),
+                ('cum_deaths', models.BigIntegerField(default=0)),
+                ('cum_recovered', models.BigIntegerField(default=0)),
+                ('cum_active', models.BigIntegerField(default=0)),
+                ('series', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='data_app.covidseries')),
+            ],
+            options={
+                'unique_together': {('series', 'file_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_app', '0004_dataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CovidTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('world', 'World'), ('country', 'Country'), ('province', 'Province/State')], max_length=16)),
+                ('province_state', models.CharField(blank=True, max_length=255, null=True)),
+                ('province_key', models.CharField(default='', max_length=255)),
+                ('rows', models.BigIntegerField(default=0)),
+                ('confirmed', models.BigIntegerField(default=0)),
+                ('deaths', models.BigIntegerField(default=0)),
+                ('recovered', models.BigIntegerField(default=0)),
+                ('active', models.BigIntegerField(default=0)),
+                ('country', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='covid_totals', to='data_app.country')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['scope', 'province_key'], name='data_app_co_scope_eedd79_idx')],
+                'unique_together': {('scope', 'country', 'province_key')},
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_app', '0005_covidtotals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CovidLatest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('province_state', models.CharField(blank=True, max_length=255, null=True)),
+                ('province_key', models.CharField(default='', max_length=255)),
+                ('file_date', models.DateField()),
+                ('confirmed', models.IntegerField(default=0)),
+                ('deaths', models.IntegerField(default=0)),
+                ('recovered', models.IntegerField(default=0)),
+                ('active', models.IntegerField(default=0)),
+                ('incident_rate', models.FloatField(blank=True, null=True)),
+                ('case_fatality_ratio', models.FloatField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='coviddata',
+            name='data_app_co_country_74e480_idx',
+        ),
+        migrations.AddIndex(
+            model_name='coviddata',
+            index=models.Index(fields=['country', 'province_state', 'file_date'], name='data_app_co_country_531741_idx'),
+        ),
+        migrations.AddField(
+            model_name='covidlatest',
+            name='country',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='covid_latest', to='data_app.country'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='covidlatest',
+            unique_together={('country', 'province_key')},
+        ),
+    ]
@@ -39,6 +39,134 @@ class CovidData(models.Model):
     
     class Meta:
         indexes = [
-            models.Index(fields=['country', 'province_state']),
+            # Also serves "latest report on or before a date" lookups per region
+            models.Index(fields=['country', 'province_state', 'file_date']),
             models.Index(fields=['file_date']),
         ]
+
+
+class IngestManifest(models.Model):
+    """
+    Records each source file that `load_data --incremental` has ingested, so later runs
+    can skip unchanged files and only load dates after `max_file_date`.
+    """
+    source = models.CharField(max_length=1024)  # Absolute path of the source file
+    table = models.CharField(max_length=64)  # e.g., 'covid_data', 'vaccination_data'
+    fingerprint = models.CharField(max_length=255)  # Size and modification time of the file
+    max_file_date = models.DateField(null=True, blank=True)  # Latest file_date loaded from the source
+    row_count = models.BigIntegerField(default=0)
+    ingested_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('source', 'table')
+
+    def __str__(self):
+        return f"{self.table} <- {self.source} (up to {self.max_file_date})"
+
+
+class CovidSeries(models.Model):
+    """
+    One (country, province/state) time series of CovidData, the unit of the daily rollups.
+    """
+    country = models.ForeignKey(Country, on_delete=models.CASCADE, related_name='covid_series')
+    province_state = models.CharField(max_length=255, null=True, blank=True)
+    province_key = models.CharField(max_length=255, default='')  # province_state, or '' if missing
+
+    class Meta:
+        unique_together = ('country', 'province_key')
+
+    def __str__(self):
+        return f"{self.country.name} - {self.province_state or 'All'}"
+
+
+class CovidDailyRollup(models.Model):
+    """
+    Daily totals of a CovidSeries with running (prefix) sums, so the total over any date
+    range is the prefix sum at its end minus the prefix sum before its start.
+    """
+    series = models.ForeignKey(CovidSeries, on_delete=models.CASCADE, related_name='rollups')
+    file_date = models.DateField()
+    confirmed = models.BigIntegerField(default=0)
+    deaths = models.BigIntegerField(default=0)
+    recovered = models.BigIntegerField(default=0)
+    active = models.BigIntegerField(default=0)
+    cum_confirmed = models.BigIntegerField(default=0)  # Sum of confirmed up to and including file_date
+    cum_deaths = models.BigIntegerField(default=0)
+    cum_recovered = models.BigIntegerField(default=0)
+    cum_active = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('series', 'file_date')
+
+    def __str__(self):
+        return f"{self.series} - {self.file_date}"
+
+
+class DataVersion(models.Model):
+    """
+    Counter bumped whenever ingested or precomputed data changes, so process-wide caches
+    (e.g., dropdown choices) know when to reload. Holds a single row.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Data version {self.version}"
+
+
+class CovidTotals(models.Model):
+    """
+    Running totals of CovidData worldwide, per country and per (country, province/state),
+    kept up to date by `load_data` so statistics don't aggregate the whole table.
+    """
+    WORLD = 'world'
+    COUNTRY = 'country'
+    PROVINCE = 'province'
+    SCOPE_CHOICES = [
+        (WORLD, 'World'),
+        (COUNTRY, 'Country'),
+        (PROVINCE, 'Province/State'),
+    ]
+
+    scope = models.CharField(max_length=16, choices=SCOPE_CHOICES)
+    country = models.ForeignKey(Country, on_delete=models.CASCADE, null=True, blank=True, related_name='covid_totals')
+    province_state = models.CharField(max_length=255, null=True, blank=True)
+    province_key = models.CharField(max_length=255, default='')  # province_state, or '' above province scope
+    rows = models.BigIntegerField(default=0)
+    confirmed = models.BigIntegerField(default=0)
+    deaths = models.BigIntegerField(default=0)
+    recovered = models.BigIntegerField(default=0)
+    active = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('scope', 'country', 'province_key')
+        indexes = [
+            models.Index(fields=['scope', 'province_key']),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}: {self.country.name if self.country else 'World'} - {self.province_state or 'All'}"
+
+
+class CovidLatest(models.Model):
+    """
+    The latest report per (country, province/state). JHU metrics are cumulative per
+    `file_date`, so current totals come from these rows rather than sums over all dates.
+    Kept up to date by `load_data`.
+    """
+    country = models.ForeignKey(Country, on_delete=models.CASCADE, related_name='covid_latest')
+    province_state = models.CharField(max_length=255, null=True, blank=True)
+    province_key = models.CharField(max_length=255, default='')  # province_state, or '' if missing
+    file_date = models.DateField()
+    confirmed = models.IntegerField(default=0)
+    deaths = models.IntegerField(default=0)
+    recovered = models.IntegerField(default=0)
+    active = models.IntegerField(default=0)
+    incident_rate = models.FloatField(null=True, blank=True)
+    case_fatality_ratio = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('country', 'province_key')
+
+    def __str__(self):
+        return f"{self.country.name} - {self.province_state or 'All'} - {self.file_date}"
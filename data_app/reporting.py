@@ -0,0 +1,136 @@
+# File: data_app/reporting.py
+
+import csv
+import json
+import time
+from collections import Counter, defaultdict
+
+# Reason codes written to the quarantine file
+UNKNOWN_COUNTRY = "unknown_country"
+MISSING_COUNTRY = "missing_country"
+PARSE_ERROR = "parse_error"
+
+
+class Quarantine:
+    """
+    Collects rejected rows with a reason code and appends them to a CSV file in batches,
+    so a dirty input file doesn't turn into one console write per bad row.
+
+    Without a path, rejected rows are only counted.
+    """
+
+    FIELDS = ("table", "source", "reason", "detail", "row")
+
+    def __init__(self, path=None, batch_size=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.buffer = []
+        self.counts = Counter()
+        self.file = None
+        self.writer = None
+        if path:
+            self.file = open(path, "w", newline="", encoding="utf-8")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(self.FIELDS)
+
+    def add(self, table, source, reason, detail, row):
+        self.counts[table, reason] += 1
+        if self.writer is None:
+            return
+        if isinstance(row, dict):
+            row = json.dumps(row, default=str)
+        self.buffer.append((table, source, reason, detail, row))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.writer.writerows(self.buffer)
+            self.buffer.clear()
+
+    def close(self):
+        if self.file:
+            self.flush()
+            self.file.close()
+
+    def total(self, table=None):
+        return sum(count for (name, _), count in self.counts.items() if table in (None, name))
+
+
+class IngestStats:
+    """
+    Tracks written rows, batch latencies and rejects per table, prints periodic progress
+    lines and builds the final JSON summary of a `load_data` run.
+    """
+
+    def __init__(self, stdout, quarantine, interval=10.0):
+        self.stdout = stdout
+        self.quarantine = quarantine
+        self.interval = interval
+        self.started = time.time()
+        self.tables = defaultdict(lambda: {"rows": 0, "batches": 0, "seconds": 0.0, "latencies": []})
+        self.table = None
+        self.table_started = None
+        self.last_report = None
+
+    def start(self, table):
+        self.table = table
+        self.table_started = self.last_report = time.time()
+        self.last_rows = self.tables[table]["rows"]
+        self.last_rejects = self.quarantine.total(table)
+
+    def finish(self):
+        self.report(force=True)
+        self.tables[self.table]["seconds"] += time.time() - self.table_started
+
+    def record_batch(self, rows, seconds):
+        stats = self.tables[self.table]
+        stats["rows"] += rows
+        stats["batches"] += 1
+        stats["latencies"].append(seconds)
+        self.report()
+
+    def report(self, force=False):
+        now = time.time()
+        elapsed = now - self.last_report
+        if not force and elapsed < self.interval:
+            return
+        stats = self.tables[self.table]
+        rejects = self.quarantine.total(self.table)
+        if force and stats["rows"] == self.last_rows and rejects == self.last_rejects:
+            return
+        latency = stats["latencies"][-1] * 1000 if stats["latencies"] else 0.0
+        elapsed = max(elapsed, 1e-9)
+        self.stdout.write(
+            f"[{self.table}] {stats['rows']} rows | "
+            f"{(stats['rows'] - self.last_rows) / elapsed:.0f} rows/s | "
+            f"batch {latency:.0f} ms | "
+            f"{(rejects - self.last_rejects) / elapsed:.1f} rejects/s"
+        )
+        self.last_report = now
+        self.last_rows = stats["rows"]
+        self.last_rejects = rejects
+
+    def summary(self, **options):
+        tables = {}
+        for name, stats in self.tables.items():
+            latencies = sorted(stats["latencies"])
+            tables[name] = {
+                "rows": stats["rows"],
+                "seconds": round(stats["seconds"], 3),
+                "rows_per_second": round(stats["rows"] / stats["seconds"], 1) if stats["seconds"] else None,
+                "batches": stats["batches"],
+                "batch_ms_avg": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+                "batch_ms_p95": round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else None,
+                "batch_ms_max": round(latencies[-1] * 1000, 1) if latencies else None,
+                "rejects": {
+                    reason: count for (table, reason), count in sorted(self.quarantine.counts.items())
+                    if table == name
+                },
+            }
+        return {
+            "seconds": round(time.time() - self.started, 3),
+            "quarantine": self.quarantine.path,
+            **options,
+            "tables": tables,
+        }
@@ -0,0 +1,160 @@
+# File: data_app/rollups.py
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import BigIntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from data_app.models import CovidData, CovidDailyRollup, CovidSeries
+
+METRICS = ("confirmed", "deaths", "recovered", "active")
+
+
+def rollups_ready():
+    """
+    Returns True once the daily rollups have been built, so views can rely on them.
+    """
+    return CovidSeries.objects.exists()
+
+
+def _daily_totals(queryset):
+    """
+    Sums CovidData per (country, province key, date), ordered so each series is contiguous.
+    Missing and empty provinces/states share the key "", as they share a CovidSeries.
+    """
+    return (
+        queryset.filter(file_date__isnull=False)
+        .annotate(province_key=Coalesce("province_state", Value("")))
+        .values("country_id", "province_key", "file_date")
+        .annotate(**{metric: Sum(metric) for metric in METRICS})
+        .order_by("country_id", "province_key", "file_date")
+    )
+
+
+def _ensure_series(keys):
+    """
+    Creates the missing CovidSeries for (country_id, province_state) keys and returns
+    a map from their (country_id, province key) to series IDs.
+    """
+    CovidSeries.objects.bulk_create(
+        [CovidSeries(country_id=country_id, province_state=province, province_key=province or "")
+         for country_id, province in keys],
+        ignore_conflicts=True,
+    )
+    series = CovidSeries.objects.filter(country_id__in={country_id for country_id, _ in keys})
+    series_ids = {(s.country_id, s.province_key): s.id for s in series}
+    return {(country_id, province or ""): series_ids[country_id, province or ""] for country_id, province in keys}
+
+
+def _write_rollups(daily, series_ids, base, batch_size):
+    """
+    Turns ordered daily totals into rollup rows, continuing the prefix sums from `base`
+    (series ID -> cumulative values before the first day). Rows of other series are skipped.
+    """
+    rollups = []
+    written = 0
+    current = None
+    running = None
+    for row in daily.iterator(chunk_size=batch_size):
+        series_id = series_ids.get((row["country_id"], row["province_key"]))
+        if series_id is None:
+            continue
+        if series_id != current:
+            current = series_id
+            running = list(base.get(series_id, (0,) * len(METRICS)))
+        for i, metric in enumerate(METRICS):
+            running[i] += row[metric] or 0
+        rollups.append(CovidDailyRollup(
+            series_id=series_id,
+            file_date=row["file_date"],
+            **{metric: row[metric] or 0 for metric in METRICS},
+            **{f"cum_{metric}": running[i] for i, metric in enumerate(METRICS)},
+        ))
+        if len(rollups) >= batch_size:
+            CovidDailyRollup.objects.bulk_create(rollups)
+            written += len(rollups)
+            rollups.clear()
+    CovidDailyRollup.objects.bulk_create(rollups)
+    return written + len(rollups)
+
+
+def rebuild_covid_rollups(batch_size=5000):
+    """
+    Rebuilds every series and daily rollup from CovidData. Returns the number of rollup rows.
+    """
+    with transaction.atomic():
+        CovidDailyRollup.objects.all().delete()
+        CovidSeries.objects.all().delete()
+        keys = set(
+            CovidData.objects.filter(file_date__isnull=False)
+            .values_list("country_id", "province_state").distinct()
+        )
+        series_ids = _ensure_series(keys) if keys else {}
+        return _write_rollups(_daily_totals(CovidData.objects.all()), series_ids, {}, batch_size)
+
+
+def refresh_covid_rollups(changed, batch_size=5000):
+    """
+    Recomputes the rollups of the series that changed during an ingest.
+
+    `changed` maps (country_id, province_state) to the earliest date written for that
+    series; its rollups are rebuilt from that date on, starting from the prefix sums of
+    the day before. Falls back to a full rebuild if no rollups exist yet, since the
+    prefix sums of untouched series would otherwise be missing.
+    """
+    if not rollups_ready():
+        return rebuild_covid_rollups(batch_size)
+    # Series that changed from the same date on share one pass over CovidData
+    by_date = defaultdict(set)
+    for key, since in changed.items():
+        by_date[since].add(key)
+    written = 0
+    for since, keys in sorted(by_date.items()):
+        with transaction.atomic():
+            series_ids = _ensure_series(keys)
+            previous = CovidDailyRollup.objects.filter(
+                series=OuterRef("pk"), file_date__lt=since
+            ).order_by("-file_date")
+            base = {
+                row["id"]: tuple(row[f"cum_{metric}"] or 0 for metric in METRICS)
+                for row in CovidSeries.objects.filter(id__in=series_ids.values()).annotate(**{
+                    f"cum_{metric}": Subquery(previous.values(f"cum_{metric}")[:1]) for metric in METRICS
+                }).values("id", *(f"cum_{metric}" for metric in METRICS))
+            }
+            CovidDailyRollup.objects.filter(series_id__in=series_ids.values(), file_date__gte=since).delete()
+            daily = _daily_totals(CovidData.objects.filter(
+                file_date__gte=since, country_id__in={country_id for country_id, _ in keys},
+            ))
+            written += _write_rollups(daily, series_ids, base, batch_size)
+    return written
+
+
+def range_totals(series, start_date=None, end_date=None):
+    """
+    Annotates a CovidSeries queryset with the totals of each series between two dates
+    (inclusive, either may be None), as `values('country__name', 'province_state')` rows
+    like the raw CovidData aggregate.
+
+    Each total is the prefix sum on the last day up to `end_date` minus the prefix sum on
+    the last day before `start_date`: two index lookups per series, whatever the range.
+    Series without data in the range are left out.
+    """
+    upper = CovidDailyRollup.objects.filter(series=OuterRef("pk"))
+    if end_date:
+        upper = upper.filter(file_date__lte=end_date)
+    upper = upper.order_by("-file_date")
+    lower = None
+    if start_date:
+        lower = CovidDailyRollup.objects.filter(series=OuterRef("pk"), file_date__lt=start_date).order_by("-file_date")
+
+    series = series.annotate(last_date=Subquery(upper.values("file_date")[:1])).filter(last_date__isnull=False)
+    if start_date:
+        series = series.filter(last_date__gte=start_date)
+
+    totals = {}
+    for metric in METRICS:
+        total = Coalesce(Subquery(upper.values(f"cum_{metric}")[:1]), 0, output_field=BigIntegerField())
+        if lower is not None:
+            total = total - Coalesce(Subquery(lower.values(f"cum_{metric}")[:1]), 0, output_field=BigIntegerField())
+        totals[metric] = total
+    return series.values("country__name", "province_state").annotate(**totals)
@@ -0,0 +1,109 @@
+# File: data_app/snapshot.py
+
+import json
+import os
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+from data_app.versions import current_version
+
+# Name of the file in the snapshot directory that points at the current snapshot
+CURRENT_FILE = "CURRENT"
+
+# Columns of a snapshot and their dtypes; each one is stored as `<name>.npy`
+COLUMNS = {
+    "country": np.int32,  # Index into the `countries` dictionary
+    "province": np.int32,  # Index into the `provinces` dictionary; 0 is a missing province
+    "date": np.int32,  # Days since 1970-01-01, DATE_NULL if missing
+    "confirmed": np.int32,
+    "deaths": np.int32,
+    "recovered": np.int32,
+    "active": np.int32,
+    "incident_rate": np.float32,  # NaN if missing
+    "case_fatality_ratio": np.float32,
+}
+DATE_NULL = np.iinfo(np.int32).min
+EPOCH = date(1970, 1, 1)
+
+
+def snapshot_dir():
+    return str(getattr(settings, "COVID_SNAPSHOT_DIR", os.path.join(settings.BASE_DIR, "snapshots")))
+
+
+class CovidSnapshot:
+    """
+    Read-only, memory-mapped view of a columnar CovidData snapshot.
+
+    Rows are sorted by (country, province, date), and country and province codes follow
+    the alphabetical order of their dictionaries, so the rows of a country or region form
+    one contiguous slice found by binary search. Columns are opened with `mmap_mode='r'`,
+    so every process reading the same snapshot shares one page-cached copy.
+
+    `version` is the data version the snapshot was exported at (see data_app.versions).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.version = self.meta.get("version")
+        self.countries = self.meta["countries"]
+        self.provinces = self.meta["provinces"]
+        self._country_codes = {name: code for code, name in enumerate(self.countries)}
+        self.columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in COLUMNS
+        }
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def country_slice(self, country_name):
+        """
+        Returns the slice of rows for a country, or an empty slice if it's unknown.
+        """
+        code = self._country_codes.get(country_name)
+        if code is None:
+            return slice(0, 0)
+        countries = self.columns["country"]
+        return slice(
+            int(np.searchsorted(countries, code, side="left")),
+            int(np.searchsorted(countries, code, side="right")),
+        )
+
+
+_cache = {}
+
+
+def load_snapshot(base_dir=None):
+    """
+    Returns the current snapshot, or None if none has been exported yet.
+
+    The opened snapshot is cached per process and reopened only when `export_snapshot`
+    has switched the CURRENT pointer to a newer one.
+    """
+    base_dir = base_dir or snapshot_dir()
+    try:
+        with open(os.path.join(base_dir, CURRENT_FILE)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    path = os.path.join(base_dir, name)
+    cached = _cache.get(base_dir)
+    if cached is None or cached.path != path:
+        cached = _cache[base_dir] = CovidSnapshot(path)
+    return cached
+
+
+def load_current_snapshot(base_dir=None):
+    """
+    Returns the current snapshot if it was exported at the current data version, or None
+    if there is none or data was loaded since; callers then read CovidData instead.
+    """
+    snapshot = load_snapshot(base_dir)
+    if snapshot is None or snapshot.version != current_version():
+        return None
+    return snapshot
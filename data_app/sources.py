@@ -0,0 +1,116 @@
+# File: data_app/sources.py
+
+import glob
+import gzip
+import io
+import lzma
+import os
+import re
+import zipfile
+from contextlib import contextmanager
+from datetime import date
+
+# File name suffixes `load_data` can read, and which ones need decompression
+COMPRESSED_SUFFIXES = (".gz", ".xz", ".zip")
+SOURCE_SUFFIXES = (".csv",) + tuple(f".csv{suffix}" for suffix in (".gz", ".xz")) + (".zip",)
+
+# JHU daily reports are named MM-DD-YYYY.csv; normalized exports may use YYYY-MM-DD
+_US_DATE = re.compile(r"(?<!\d)(\d{2})-(\d{2})-(\d{4})(?!\d)")
+_ISO_DATE = re.compile(r"(?<!\d)(\d{4})-(\d{2})-(\d{2})(?!\d)")
+
+
+def expand_sources(patterns):
+    """
+    Expands file paths, glob patterns and directories into a sorted list of source files.
+
+    Directories contribute every CSV file, compressed or not, directly inside them.
+    Raises FileNotFoundError if a pattern matches nothing.
+    """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [
+                os.path.join(pattern, name) for name in os.listdir(pattern)
+                if name.lower().endswith(SOURCE_SUFFIXES)
+            ]
+        elif glob.has_magic(pattern):
+            matches = glob.glob(pattern)
+        else:
+            matches = [pattern] if os.path.exists(pattern) else []
+        if not matches:
+            raise FileNotFoundError(f"No source files found for {pattern!r}.")
+        paths.extend(sorted(matches))
+    # A file matched by several patterns is loaded once
+    return list(dict.fromkeys(paths))
+
+
+def is_compressed(path):
+    return path.lower().endswith(COMPRESSED_SUFFIXES)
+
+
+def date_from_name(name):
+    """
+    Returns the report date encoded in a file name such as `01-22-2021.csv`, or None.
+    """
+    base = os.path.basename(name)
+    match = _US_DATE.search(base)
+    try:
+        if match:
+            month, day, year = map(int, match.groups())
+            return date(year, month, day)
+        match = _ISO_DATE.search(base)
+        if match:
+            return date(*map(int, match.groups()))
+    except ValueError:
+        return None
+    return None
+
+
+def iter_binary_streams(path):
+    """
+    Yields (name, binary stream) pairs for a source file without extracting it to disk.
+
+    Plain files, `.gz` and `.xz` files yield a single stream; `.zip` archives yield one
+    stream per CSV member. Each stream is closed once the caller asks for the next one.
+    """
+    lower = path.lower()
+    if lower.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            for member in sorted(archive.namelist()):
+                if not member.lower().endswith(".csv"):
+                    continue
+                with archive.open(member) as stream:
+                    yield member, stream
+        return
+    if lower.endswith(".gz"):
+        opener = gzip.open
+    elif lower.endswith(".xz"):
+        opener = lzma.open
+    else:
+        opener = open
+    with opener(path, "rb") as stream:
+        yield path, stream
+
+
+@contextmanager
+def text_stream(stream):
+    """
+    Wraps a binary stream for `csv` readers, stripping a UTF-8 byte order mark if present.
+    """
+    wrapper = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        yield wrapper
+    finally:
+        # Leave closing the underlying stream to its owner
+        wrapper.detach()
+
+
+def iter_line_blocks(stream, block_size=8 * 1024 * 1024):
+    """
+    Reads a binary stream in blocks of whole lines of roughly `block_size` bytes.
+    """
+    while True:
+        lines = stream.readlines(block_size)
+        if not lines:
+            return
+        yield b"".join(lines)
@@ -1,3 +1,238 @@
+# File: data_app/tests.py
+
+import csv
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, Sum
 from django.test import TestCase
+from data_app.ingest import COVID_FIELDS
+from data_app.latest import METRICS, latest_totals, rebuild_covid_latest
+from data_app.loaders import CopyLoader, OrmLoader
+from data_app.models import Country, CovidData, CovidDailyRollup
+from data_app.rollups import rebuild_covid_rollups, refresh_covid_rollups
+from data_app.snapshot import CURRENT_FILE
+from data_app.totals import lookup_totals
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "The COPY backend requires PostgreSQL.")
+class CopyLoaderTests(TestCase):
+    """
+    The COPY backend must write exactly the rows the ORM backend writes.
+    """
+
+    def records(self, country_id):
+        return [
+            (country_id, None, 10, 1, 5, 4, None, None, date(2021, 1, 1)),
+            (country_id, "", 11, 2, 6, 3, 1.5, 0.25, date(2021, 1, 2)),
+            (country_id, "Ontario", 12, 3, 7, 2, 2.75, None, None),
+            (country_id, 'Quoted, "comma"', 0, 0, 0, 0, None, 0.0, date(2021, 1, 3)),
+        ]
+
+    def load(self, loader_class, country_id):
+        loader = loader_class(CovidData, COVID_FIELDS, batch_size=2)
+        for record in self.records(country_id):
+            loader.add(record)
+        loader.flush()
+        rows = sorted(
+            CovidData.objects.values_list(*COVID_FIELDS),
+            key=lambda row: (row[-1] or date.min, row[1] or ""),
+        )
+        CovidData.objects.all().delete()
+        return rows
+
+    def test_copy_matches_orm(self):
+        country = Country.objects.create(name="Canada")
+        orm_rows = self.load(OrmLoader, country.id)
+        copy_rows = self.load(CopyLoader, country.id)
+        self.assertEqual(copy_rows, orm_rows)
+        provinces = [row[1] for row in copy_rows]
+        self.assertIn(None, provinces)
+        self.assertIn("", provinces)
+
+
+class ExportSnapshotTests(TestCase):
+    """
+    `export_snapshot` must only prune the snapshot directories it wrote itself.
+    """
+
+    def export(self, output_dir, keep):
+        call_command("export_snapshot", output_dir=output_dir, keep=keep, stdout=StringIO())
+        with open(os.path.join(output_dir, CURRENT_FILE)) as f:
+            return f.read().strip()
+
+    def test_prune_keeps_foreign_entries(self):
+        country = Country.objects.create(name="Canada")
+        CovidData.objects.create(country=country, file_date=date(2021, 1, 1), confirmed=1)
+        with tempfile.TemporaryDirectory() as output_dir:
+            # A foreign directory, one that looks like a snapshot by name only, and a file
+            os.makedirs(os.path.join(output_dir, "backups"))
+            os.makedirs(os.path.join(output_dir, "20000101000000000000"))
+            with open(os.path.join(output_dir, "notes.txt"), "w") as f:
+                f.write("keep me")
+
+            first = self.export(output_dir, keep=1)
+            second = self.export(output_dir, keep=1)
+
+            entries = set(os.listdir(output_dir))
+            self.assertNotIn(first, entries)
+            self.assertIn(second, entries)
+            self.assertTrue({"backups", "20000101000000000000", "notes.txt"} <= entries)
+
+
+class RollupTests(TestCase):
+    """
+    Missing and empty provinces/states are one series; legacy tables hold both.
+    """
+
+    def setUp(self):
+        self.country = Country.objects.create(name="Afghanistan")
+        CovidData.objects.create(country=self.country, province_state=None, file_date=date(2021, 1, 1), confirmed=1)
+        CovidData.objects.create(country=self.country, province_state="", file_date=date(2021, 1, 1), confirmed=2)
+        CovidData.objects.create(country=self.country, province_state="", file_date=date(2021, 1, 2), confirmed=4)
+
+    def rollups(self):
+        return list(CovidDailyRollup.objects.order_by("file_date").values_list("file_date", "confirmed", "cum_confirmed"))
+
+    def test_rebuild_merges_missing_and_empty_provinces(self):
+        self.assertEqual(rebuild_covid_rollups(), 2)
+        self.assertEqual(self.rollups(), [(date(2021, 1, 1), 3, 3), (date(2021, 1, 2), 4, 7)])
+
+    def test_refresh_merges_missing_and_empty_provinces(self):
+        rebuild_covid_rollups()
+        CovidData.objects.create(country=self.country, province_state=None, file_date=date(2021, 1, 2), confirmed=8)
+        refresh_covid_rollups({(self.country.id, None): date(2021, 1, 2)})
+        self.assertEqual(self.rollups(), [(date(2021, 1, 1), 3, 3), (date(2021, 1, 2), 12, 15)])
+
+
+class LatestTotalsTests(TestCase):
+    """
+    Totals as of a date after the last report must equal the totals of the latest reports.
+    """
+
+    def test_as_of_matches_latest_with_legacy_empty_provinces(self):
+        country = Country.objects.create(name="Afghanistan")
+        CovidData.objects.create(country=country, province_state=None, file_date=date(2021, 1, 1), confirmed=100)
+        CovidData.objects.create(country=country, province_state="", file_date=date(2021, 1, 2), confirmed=77778)
+        CovidData.objects.create(country=country, province_state="Kabul", file_date=date(2021, 1, 1), confirmed=5)
+        rebuild_covid_latest()
+
+        latest = latest_totals("Afghanistan")
+        self.assertEqual((latest["rows"], latest["total_confirmed"]), (2, 77783))
+        self.assertEqual(latest_totals("Afghanistan", as_of=date(2021, 6, 1)), latest)
+        self.assertEqual(latest_totals("Afghanistan", as_of=date(2021, 1, 1))["total_confirmed"], 105)
+
+
+COVID_HEADER = "country_id,Province_State,Confirmed,Deaths,Recovered,Active,Incident_Rate,Case_Fatality_Ratio,File_Date\n"
+
+
+class LoadDataTests(TestCase):
+    """
+    `load_data` modes must write the same rows, and keep the totals and latest reports in
+    step with them.
+    """
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+        self.countries = self.write("countries.csv", "id,Country_Region,Lat,Long_\n1,Canada,56.1,-106.3\n2,Chile,-35.7,-71.5\n3,Peru,-9.2,-75.0\n")
+
+    def write(self, name, text):
+        path = os.path.join(self.data_dir, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def covid_file(self, name="covid.csv"):
+        lines = [
+            '1,Ontario,10,1,2,7,1.5,0.1,2021-01-01',
+            '1,"Quebec, City",20,2,3,15,,,2021-01-01',
+            '1,Ontario,12,1,3,8,1.6,0.1,2021-01-02',
+            '2,,5,0,1,4,,,2021-01-01',
+            '2,  ,6,0,1,5,,,2021-01-02',
+            '3,,7,1,1,5,,,',
+            ',,1,1,1,1,,,2021-01-01',
+            '99,,1,1,1,1,,,2021-01-01',
+            '1,Ontario,x,1,1,1,,,2021-01-03',
+        ]
+        lines += [f"2,Santiago,{day},{day % 3},1,{day},,,2021-02-{day:02d}" for day in range(1, 29)]
+        return self.write(name, COVID_HEADER + "\n".join(lines) + "\n")
+
+    def load(self, **options):
+        output = StringIO()
+        call_command("load_data", countries=self.countries, stdout=output, **options)
+        return output.getvalue()
+
+    def covid_rows(self):
+        return sorted(CovidData.objects.values_list(*COVID_FIELDS), key=repr)
+
+    def quarantined(self, path):
+        # Sources differ by file name and parse error details are the messages of different
+        # parsers, so only the reason codes and rows are compared
+        with open(path, newline="") as f:
+            return sorted((table, reason, row) for table, source, reason, detail, row in csv.reader(f))
+
+    def test_parallel_matches_serial(self):
+        covid = self.covid_file()
+        with open(covid, "rb") as f, gzip.open(covid + ".gz", "wb") as compressed:
+            compressed.write(f.read())
+
+        serial_quarantine = os.path.join(self.data_dir, "serial.csv")
+        self.load(covid=[covid], quarantine=serial_quarantine)
+        expected = self.covid_rows()
+        self.assertEqual(len(expected), 34)
+
+        for source in (covid, covid + ".gz"):
+            CovidData.objects.all().delete()
+            quarantine = os.path.join(self.data_dir, "parallel.csv")
+            self.load(covid=[source], workers=3, quarantine=quarantine)
+            self.assertEqual(self.covid_rows(), expected, source)
+            self.assertEqual(self.quarantined(quarantine), self.quarantined(serial_quarantine), source)
+
+    def test_incremental_reload_is_idempotent(self):
+        covid = self.covid_file()
+        # The undated row is skipped by incremental loads
+        self.assertIn("loaded 33 new COVID-19 rows", self.load(covid=[covid], incremental=True))
+        rows = self.covid_rows()
+
+        self.assertIn("unchanged since the last incremental load", self.load(covid=[covid], incremental=True))
+        # A touched file is read again, but rows up to its watermark are skipped
+        os.utime(covid, ns=(os.stat(covid).st_atime_ns, os.stat(covid).st_mtime_ns + 10 ** 9))
+        self.assertIn("loaded 0 new COVID-19 rows", self.load(covid=[covid], incremental=True))
+        self.assertEqual(self.covid_rows(), rows)
+
+    def test_incremental_correction_replaces_row(self):
+        self.load(covid=[self.covid_file()], incremental=True)
+        correction = self.write("correction.csv", COVID_HEADER + "1,Ontario,15,2,3,10,1.7,0.1,2021-01-02\n3,,9,1,1,7,,,2021-01-05\n")
+        output = self.load(covid=[correction], incremental=True)
+        self.assertIn("loaded 1 new COVID-19 rows", output)
+        self.assertIn("replaced 1 existing rows", output)
+
+        ontario = CovidData.objects.filter(country_id=1, province_state="Ontario", file_date=date(2021, 1, 2))
+        self.assertEqual(list(ontario.values_list("confirmed", flat=True)), [15])
+        self.assertEqual(CovidData.objects.count(), 34)
+        self.assert_summaries_match_rows()
+
+    def assert_summaries_match_rows(self):
+        """
+        Compares the maintained totals and latest reports with aggregates of the raw rows.
+        """
+        for country_name in (None, "Canada", "Chile", "Peru"):
+            rows = CovidData.objects.filter(country__name=country_name) if country_name else CovidData.objects.all()
+            raw = rows.aggregate(rows=Count("id"), **{f"total_{metric}": Sum(metric) for metric in METRICS})
+            self.assertEqual(lookup_totals(country_name), {name: value or 0 for name, value in raw.items()}, country_name)
 
-# Create your tests here.
+            latest = {}
+            for row in rows.filter(file_date__isnull=False).order_by("file_date", "id").values(
+                "country_id", "province_state", "file_date", *METRICS
+            ):
+                latest[row["country_id"], row["province_state"] or ""] = row
+            expected = {f"total_{metric}": sum(row[metric] for row in latest.values()) for metric in METRICS}
+            self.assertEqual(latest_totals(country_name), {"rows": len(latest), **expected}, country_name)
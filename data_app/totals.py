@@ -0,0 +1,127 @@
+# File: data_app/totals.py
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from data_app.ingest import COVID_FIELDS
+from data_app.models import CovidData, CovidTotals
+
+METRICS = ("confirmed", "deaths", "recovered", "active")
+TOTAL_FIELDS = ("rows",) + METRICS
+
+# Positions of the grouping and metric fields in cleaned COVID-19 records
+_COUNTRY = COVID_FIELDS.index("country_id")
+_PROVINCE = COVID_FIELDS.index("province_state")
+_METRICS = tuple(COVID_FIELDS.index(metric) for metric in METRICS)
+
+
+def covid_totals_ready():
+    """
+    Returns True once the totals have been built, so views can rely on them.
+    """
+    return CovidTotals.objects.filter(scope=CovidTotals.WORLD).exists()
+
+
+def record_deltas(records, deltas=None):
+    """
+    Adds cleaned COVID-19 records to a {(country_id, province_state): [rows, *metrics]} map.
+    """
+    deltas = defaultdict(lambda: [0] * len(TOTAL_FIELDS)) if deltas is None else deltas
+    for record in records:
+        delta = deltas[record[_COUNTRY], record[_PROVINCE]]
+        delta[0] += 1
+        for i, position in enumerate(_METRICS, 1):
+            delta[i] += record[position] or 0
+    return deltas
+
+
+def queryset_deltas(queryset, sign=1, deltas=None):
+    """
+    Adds the CovidData rows of a queryset to a deltas map, aggregated in the database;
+    `sign=-1` subtracts them (e.g., for rows about to be deleted).
+    """
+    deltas = defaultdict(lambda: [0] * len(TOTAL_FIELDS)) if deltas is None else deltas
+    grouped = queryset.order_by().values("country_id", "province_state").annotate(
+        rows=Count("id"), **{metric: Sum(metric) for metric in METRICS}
+    )
+    for row in grouped:
+        delta = deltas[row["country_id"], row["province_state"]]
+        for i, field in enumerate(TOTAL_FIELDS):
+            delta[i] += sign * (row[field] or 0)
+    return deltas
+
+
+def apply_deltas(deltas):
+    """
+    Adds per-(country, province/state) deltas to the province, country and world totals
+    with one read and one write per scope level. Runs in the caller's transaction.
+    """
+    scoped = defaultdict(lambda: [0] * len(TOTAL_FIELDS))
+    provinces = {}
+    for (country_id, province), delta in deltas.items():
+        keys = [(CovidTotals.WORLD, None, ""), (CovidTotals.COUNTRY, country_id, "")]
+        if province is not None:
+            keys.append((CovidTotals.PROVINCE, country_id, province))
+            provinces[CovidTotals.PROVINCE, country_id, province] = province
+        for key in keys:
+            total = scoped[key]
+            for i, value in enumerate(delta):
+                total[i] += value
+    if not scoped:
+        return
+
+    with transaction.atomic():
+        country_ids = {country_id for _, country_id, _ in scoped if country_id is not None}
+        existing = {
+            (row.scope, row.country_id, row.province_key): row
+            for row in CovidTotals.objects.select_for_update().filter(
+                Q(scope=CovidTotals.WORLD) | Q(country_id__in=country_ids)
+            )
+        }
+        changed, created = [], []
+        for key, delta in scoped.items():
+            row = existing.get(key)
+            if row is None:
+                scope, country_id, province_key = key
+                row = CovidTotals(
+                    scope=scope, country_id=country_id,
+                    province_state=provinces.get(key), province_key=province_key,
+                )
+                created.append(row)
+            else:
+                changed.append(row)
+            for field, value in zip(TOTAL_FIELDS, delta):
+                setattr(row, field, getattr(row, field) + value)
+        CovidTotals.objects.bulk_update(changed, TOTAL_FIELDS, batch_size=500)
+        CovidTotals.objects.bulk_create(created, batch_size=500)
+
+
+def rebuild_covid_totals():
+    """
+    Rebuilds all totals from CovidData in a single pass over the table.
+    """
+    with transaction.atomic():
+        CovidTotals.objects.all().delete()
+        CovidTotals.objects.create(scope=CovidTotals.WORLD)
+        apply_deltas(queryset_deltas(CovidData.objects.all()))
+
+
+def lookup_totals(country_name=None, province_state=None):
+    """
+    Returns {'rows', 'total_confirmed', ...} for CovidData matching the filters, read from
+    a single totals row, or a handful when only a province/state name is given.
+    """
+    queryset = CovidTotals.objects.all()
+    if province_state:
+        queryset = queryset.filter(scope=CovidTotals.PROVINCE, province_key=province_state)
+        if country_name:
+            queryset = queryset.filter(country__name=country_name)
+    elif country_name:
+        queryset = queryset.filter(scope=CovidTotals.COUNTRY, country__name=country_name)
+    else:
+        queryset = queryset.filter(scope=CovidTotals.WORLD)
+    totals = queryset.aggregate(
+        rows=Sum("rows"), **{f"total_{metric}": Sum(metric) for metric in METRICS}
+    )
+    return {name: value or 0 for name, value in totals.items()}
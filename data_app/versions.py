@@ -0,0 +1,43 @@
+# File: data_app/versions.py
+
+import time
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from data_app.models import DataVersion
+
+# Primary key of the single DataVersion row
+VERSION_ID = 1
+
+# Last version read by this process, and when
+_known = {"version": None, "checked_at": None}
+
+
+def current_version():
+    """
+    Returns the current data version, 0 if data was never loaded.
+    """
+    return DataVersion.objects.filter(pk=VERSION_ID).values_list("version", flat=True).first() or 0
+
+
+def bump_version():
+    """
+    Marks the data as changed; call after ingest or precompute writes.
+    """
+    updated = DataVersion.objects.filter(pk=VERSION_ID).update(version=F("version") + 1, updated_at=timezone.now())
+    if not updated:
+        DataVersion.objects.get_or_create(pk=VERSION_ID, defaults={"version": 1})
+
+
+def known_version():
+    """
+    Returns the data version as last seen by this process, re-reading it at most every
+    `DATA_VERSION_CHECK_INTERVAL` seconds so cache lookups don't cost a query each.
+    """
+    now = time.monotonic()
+    interval = getattr(settings, "DATA_VERSION_CHECK_INTERVAL", 30)
+    if _known["checked_at"] is None or now - _known["checked_at"] >= interval:
+        _known["version"] = current_version()
+        _known["checked_at"] = now
+    return _known["version"]
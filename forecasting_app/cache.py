@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import pandas as pd
+from django.conf import settings
+from forecasting_app.store import load_store
+
+
+class ParsedForecast:
+    """
+    A forecast file parsed once: the rows of each calendar year as a slice of the file
+    (`years`) and the JSON body of each year's response (`payloads`).
+    """
+
+    def __init__(self, years, payloads):
+        self.years = years
+        self.payloads = payloads
+
+    def payload(self, year):
+        """
+        Returns the serialized records of a year, an empty list if the forecast has none.
+        """
+        return self.payloads.get(year, b'[]')
+
+
+def parse_forecast_csv(path):
+    """
+    Reads a forecast CSV and serializes the records of each year the way the REST
+    framework JSON renderer does.
+    """
+    forecast_data = pd.read_csv(path, parse_dates=['date']).sort_values('date', kind='stable')
+    dates = forecast_data['date'].dt.strftime('%Y-%m-%d').tolist()
+    years = forecast_data['date'].dt.year.tolist()
+    columns = [column for column in forecast_data.columns if column != 'date']
+    values = [forecast_data[column].tolist() for column in columns]
+
+    slices, payloads = {}, {}
+    start = 0
+    for stop in range(1, len(years) + 1):
+        if stop == len(years) or years[stop] != years[start]:
+            records = [
+                dict(date=dates[i], **{column: value[i] for column, value in zip(columns, values)})
+                for i in range(start, stop)
+            ]
+            slices[years[start]] = slice(start, stop)
+            payloads[years[start]] = json.dumps(
+                records, ensure_ascii=False, allow_nan=False, separators=(',', ':')
+            ).encode('utf-8')
+            start = stop
+    return ParsedForecast(slices, payloads)
+
+
+def parse_store_forecast(path, country_name):
+    """
+    Serializes the records of each year of a country's forecast in the binary store, or
+    returns None if the store has no forecast for the country.
+    """
+    store = load_store(path)
+    forecast = store.get(country_name) if store else None
+    if forecast is None or not len(forecast):
+        return None
+    years = range(forecast.origin.year, (forecast.origin + timedelta(days=len(forecast) - 1)).year + 1)
+    return ParsedForecast(
+        {year: forecast.year_slice(year) for year in years},
+        {year: forecast.payload(year) for year in years},
+    )
+
+
+class ForecastCache:
+    """
+    Per-process LRU of parsed forecast files (or, with `parse_store_forecast`, countries
+    of the forecast store), keyed by path and modification time, so a file rewritten by a
+    new forecast is parsed again while repeat requests skip both the disk read and the
+    serialization.
+    """
+
+    def __init__(self, maxsize=None, parser=parse_forecast_csv):
+        self.maxsize = maxsize
+        self.parser = parser
+        self.entries = OrderedDict()  # (path, *args) -> (mtime, ParsedForecast)
+        self.lock = threading.Lock()
+
+    def get(self, path, *args):
+        """
+        Returns the ParsedForecast of a file, parsed with `args` (e.g. the country of a
+        forecast store); raises FileNotFoundError if the file is missing.
+        """
+        key = (path, *args)
+        mtime = os.stat(path).st_mtime_ns
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached and cached[0] == mtime:
+                self.entries.move_to_end(key)
+                return cached[1]
+
+        # Parse outside the lock; two workers racing on the same file both get a valid entry
+        parsed = self.parser(path, *args)
+        with self.lock:
+            self.entries[key] = (mtime, parsed)
+            self.entries.move_to_end(key)
+            maxsize = self.maxsize or settings.FORECAST_CACHE_SIZE
+            while len(self.entries) > maxsize:
+                self.entries.popitem(last=False)
+        return parsed
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+forecast_cache = ForecastCache()
+store_forecast_cache = ForecastCache(parser=parse_store_forecast)
@@ -0,0 +1,36 @@
+"""
+Model fitting for the forecast process pool. This module must not import Django models
+(directly or through other forecasting_app modules): pool processes started with the
+"spawn" method, as on Windows and macOS, import it without setting Django up.
+"""
+from statsmodels.tsa.arima.model import ARIMA
+
+
+def forecast_series(series, steps=3650):
+    """
+    Fits an ARIMA model to one time series and forecasts it.
+
+    Args:
+        series (pd.Series): Values with a datetime index.
+        steps (int): Number of steps to forecast.
+
+    Returns:
+        np.ndarray: The rounded integer forecast.
+    """
+    model = ARIMA(series, order=(5, 1, 0))  # ARIMA (p, d, q)
+    model_fit = model.fit()
+
+    # Forecast for the given number of steps
+    forecast = model_fit.forecast(steps=steps)
+    return forecast.round().astype(int).to_numpy()  # Round and convert to integer
+
+
+def fit_task(country_name, variable, series, steps):
+    """
+    Fits one (country, variable) model in a pool process; returns the forecast values,
+    or the error message if the fit failed.
+    """
+    try:
+        return country_name, variable, forecast_series(series, steps), None
+    except Exception as e:
+        return country_name, variable, None, str(e)
@@ -0,0 +1,133 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pandas as pd
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from data_app.models import CovidData
+from forecasting_app.models import ForecastJob, ForecastMetadata
+from forecasting_app.utils import daily_series, generate_forecasts, save_forecasts_to_store
+
+TARGET_VARIABLES = ['deaths', 'active', 'recovered']
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns this process's pool of forecast job threads, started on first use.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.FORECAST_JOB_WORKERS, thread_name_prefix='forecast-job'
+            )
+        return _executor
+
+
+def has_forecast_data(country_name):
+    return CovidData.objects.filter(country__name__iexact=country_name, file_date__isnull=False).exists()
+
+
+def fit_country_forecast(country_name):
+    """
+    Fits the forecasts of a country, saves them to the forecast store and records their
+    metadata. Returns the store path.
+    """
+    covid_data = CovidData.objects.filter(country__name__iexact=country_name, file_date__isnull=False)
+
+    # Convert data to DataFrame
+    data = pd.DataFrame.from_records(covid_data.values('file_date', *TARGET_VARIABLES))
+    if data.empty:
+        raise ValueError(f"No data available for the country: {country_name}.")
+
+    # Ensure 'file_date' is treated as a datetime object
+    data['file_date'] = pd.to_datetime(data['file_date'])
+    data = daily_series(data.set_index('file_date'))
+
+    # Generate forecasts for the next 10 years
+    forecasts = generate_forecasts(data, TARGET_VARIABLES, steps=3650)
+    store_path = save_forecasts_to_store(forecasts, country_name)
+    record_forecast_metadata(country_name, store_path)
+    return store_path
+
+
+def record_forecast_metadata(country_name, store_path):
+    """
+    Records that a country's forecast is in the store; one metadata row per country is
+    refreshed by every new forecast.
+    """
+    ForecastMetadata.objects.update_or_create(
+        country_name__iexact=country_name,
+        defaults={
+            'country_name': country_name,
+            'forecast_type': "ARIMA",
+            'target_variable': ", ".join(TARGET_VARIABLES),
+            'forecast_csv_path': store_path,
+        },
+    )
+
+
+def expire_stale_jobs():
+    """
+    Fails jobs queued, or running, for longer than FORECAST_JOB_TIMEOUT, e.g., because the
+    process running them died, so their country can be queued again. Running jobs are
+    timed from when they started, so time spent queued doesn't count against the fit.
+    """
+    now = timezone.now()
+    deadline = now - timedelta(seconds=settings.FORECAST_JOB_TIMEOUT)
+    return ForecastJob.objects.filter(
+        Q(status=ForecastJob.PENDING, created_at__lt=deadline)
+        | Q(status=ForecastJob.RUNNING, started_at__lt=deadline)
+    ).update(status=ForecastJob.FAILED, error="Timed out.", finished_at=now)
+
+
+def submit_forecast_job(country_name):
+    """
+    Queues a forecast job for a country unless one is already pending or running.
+    Returns (job, created); concurrent callers all get the single active job.
+    """
+    expire_stale_jobs()
+    country_key = country_name.lower()
+    try:
+        with transaction.atomic():
+            job = ForecastJob.objects.create(country_name=country_name, country_key=country_key)
+    except IntegrityError:
+        # The partial unique constraint only lets one active job per country in
+        job = ForecastJob.objects.filter(country_key=country_key, status__in=ForecastJob.ACTIVE).first()
+        if job is None:
+            # The active job finished in between
+            return submit_forecast_job(country_name)
+        return job, False
+    transaction.on_commit(lambda: get_executor().submit(run_forecast_job, job.pk))
+    return job, True
+
+
+def run_forecast_job(job_id):
+    """
+    Runs a queued forecast job in a pool thread, recording its progress on the job row.
+    """
+    try:
+        started = ForecastJob.objects.filter(pk=job_id, status=ForecastJob.PENDING).update(
+            status=ForecastJob.RUNNING, started_at=timezone.now()
+        )
+        if not started:
+            return  # Expired while queued
+        job = ForecastJob.objects.get(pk=job_id)
+        # A job that expired while running keeps its "Timed out." failure, as a newer job
+        # for the country may be active by now
+        running = ForecastJob.objects.filter(pk=job_id, status=ForecastJob.RUNNING)
+        try:
+            fit_country_forecast(job.country_name)
+        except Exception as e:
+            running.update(status=ForecastJob.FAILED, error=str(e), finished_at=timezone.now())
+        else:
+            running.update(status=ForecastJob.DONE, finished_at=timezone.now())
+    finally:
+        # Pool threads don't go through the request cycle that closes connections
+        connections.close_all()
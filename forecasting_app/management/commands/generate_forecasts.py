@@ -1,53 +1,147 @@
-from django.core.management.base import BaseCommand
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from data_app.choices import registry
 from data_app.models import CovidData
-from forecasting_app.models import ForecastMetadata
-from forecasting_app.utils import generate_forecasts, save_forecasts_to_csv
+from data_app.snapshot import DATE_NULL, load_current_snapshot
+from forecasting_app.fitting import fit_task
+from forecasting_app.jobs import TARGET_VARIABLES, record_forecast_metadata
+from forecasting_app.store import update_store
+from forecasting_app.utils import daily_series
 import pandas as pd
 
+
 class Command(BaseCommand):
-    help = "Precompute forecasts for the next 10 years and save results to CSV."
+    help = "Precompute the forecasts of every country for the next 10 years and save them to the forecast store."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1,
+            help="Number of processes fitting models (default: number of CPUs)",
+        )
+        parser.add_argument(
+            "--shard", default="0/1",
+            help="Only forecast shard i of n (0 <= i < n), e.g. '0/4', to split the countries across machines",
+        )
+        parser.add_argument(
+            "--steps", type=int, default=3650,
+            help="Number of days to forecast (default: 3650)",
+        )
 
     def handle(self, *args, **kwargs):
-        # Fetch Covid data
-        covid_data = CovidData.objects.filter(file_date__isnull=False).values('file_date', 'confirmed')
-        data = pd.DataFrame.from_records(covid_data)
-        data['file_date'] = pd.to_datetime(data['file_date'])
-        data.set_index('file_date', inplace=True)
+        shard, shards = self.parse_shard(kwargs["shard"])
+        steps = kwargs["steps"]
 
-        if data.empty:
-            self.stdout.write(self.style.WARNING("No data available for forecasting."))
+        # Countries are assigned to shards by a stable hash of their name
+        countries = [
+            name for name in registry.sorted("covid_countries")
+            if zlib.crc32(name.encode()) % shards == shard
+        ]
+        if not countries:
+            self.stdout.write(self.style.WARNING("No countries to forecast in this shard."))
             return
 
-        # Generate forecast for the next 10 years starting from 2024
-        forecast_results = {}
-        try:
-            forecast_results = generate_forecasts(data, variable='confirmed', steps=3650)
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f"Error during forecast generation: {str(e)}"))
+        # Build every country's daily series from the columnar snapshot when it is up to
+        # date, otherwise from one query
+        start_time = time.time()
+        snapshot = load_current_snapshot()
+        if snapshot is not None:
+            series, source = self.snapshot_series(snapshot, countries), "the snapshot"
+        else:
+            series, source = self.database_series(countries), "the database"
+        if not series:
+            self.stdout.write(self.style.WARNING("No data available for forecasting."))
             return
+        self.stdout.write(
+            f"Built the series of {len(series)} countries (shard {shard}/{shards}) from {source} "
+            f"in {time.time() - start_time:.2f} seconds."
+        )
 
-        # Iterate over the forecasted years and save the forecast for each year
-        combined_forecast_df = pd.DataFrame()
-        for year in range(2024, 2024 + 10):
-            # Filtering forecast results for the specific year
-            start_date = pd.Timestamp(year=year, month=1, day=1)
-            end_date = pd.Timestamp(year=year + 1, month=1, day=1)
-
-            yearly_forecast = forecast_results.loc[
-                (forecast_results.index >= start_date) & (forecast_results.index < end_date)
+        # Fit the (country, variable) models in parallel; pool processes don't use the database
+        start_time = time.time()
+        connections.close_all()
+        results, errors = {}, {}
+        with ProcessPoolExecutor(max_workers=kwargs["workers"]) as executor:
+            futures = [
+                executor.submit(fit_task, country_name, variable, country_series[variable], steps)
+                for country_name, country_series in series.items() for variable in TARGET_VARIABLES
             ]
+            for done, future in enumerate(as_completed(futures), 1):
+                country_name, variable, values, error = future.result()
+                if error:
+                    errors.setdefault(country_name, []).append(f"{variable}: {error}")
+                else:
+                    results.setdefault(country_name, {})[variable] = values
+                if done % 50 == 0:
+                    self.stdout.write(f"  {done}/{len(futures)} models fitted ({time.time() - start_time:.2f} seconds)")
+        self.stdout.write(f"Fitted {len(futures)} models in {time.time() - start_time:.2f} seconds.")
 
-            # Append the yearly forecast to a combined dataframe
-            combined_forecast_df = pd.concat([combined_forecast_df, yearly_forecast])
+        # Forecasts start the day after each country's last report
+        forecasts = {
+            country_name: (
+                (series[country_name].index[-1] + pd.Timedelta(days=1)).date(),
+                {variable: values[variable] for variable in TARGET_VARIABLES},
+            )
+            for country_name, values in results.items() if country_name not in errors
+        }
+        for country_name, messages in sorted(errors.items()):
+            self.stdout.write(self.style.WARNING(f"Skipping {country_name}: {'; '.join(messages)}"))
+        if not forecasts:
+            raise CommandError("No forecast could be generated.")
 
-        # Save the combined forecast to CSV
-        csv_path = save_forecasts_to_csv(combined_forecast_df, 'global_confirmed_forecast.csv')
+        start_time = time.time()
+        store_path = update_store(forecasts)
+        for country_name in forecasts:
+            record_forecast_metadata(country_name, store_path)
+        self.stdout.write(f"Saved {len(forecasts)} forecasts in {time.time() - start_time:.2f} seconds.")
 
-        # Save metadata for the forecast
-        ForecastMetadata.objects.create(
-            forecast_type="ARIMA",
-            target_variable="confirmed cases",
-            forecast_csv_path=csv_path
+        self.stdout.write(self.style.SUCCESS("Forecasts generated and saved successfully."))
+
+    def database_series(self, countries):
+        """
+        Returns {country_name: daily series of TARGET_VARIABLES} read from CovidData.
+        """
+        data = pd.DataFrame.from_records(
+            CovidData.objects.filter(country__name__in=countries, file_date__isnull=False)
+            .values_list("country__name", "file_date", *TARGET_VARIABLES),
+            columns=["country_name", "file_date", *TARGET_VARIABLES],
         )
+        if data.empty:
+            return {}
+        data["file_date"] = pd.to_datetime(data["file_date"])
+        return {
+            country_name: daily_series(rows.drop(columns="country_name").set_index("file_date"))
+            for country_name, rows in data.groupby("country_name")
+        }
 
-        self.stdout.write(self.style.SUCCESS("Forecast generated and saved successfully."))
+    def snapshot_series(self, snapshot, countries):
+        """
+        Returns {country_name: daily series of TARGET_VARIABLES} read from the mapped columns
+        of a snapshot, whose rows of a country are one contiguous slice.
+        """
+        series = {}
+        for country_name in countries:
+            rows = snapshot.country_slice(country_name)
+            dates = snapshot["date"][rows]
+            dated = dates != DATE_NULL
+            if not dated.any():
+                continue
+            data = pd.DataFrame(
+                {variable: snapshot[variable][rows][dated].astype("int64") for variable in TARGET_VARIABLES},
+                index=pd.to_datetime(dates[dated].astype("int64"), unit="D").rename("file_date"),
+            )
+            series[country_name] = daily_series(data)
+        return series
+
+    def parse_shard(self, value):
+        try:
+            shard, shards = (int(part) for part in value.split("/"))
+        except ValueError:
+            raise CommandError("--shard must look like i/n, e.g. 0/4.")
+        if not 0 <= shard < shards:
+            raise CommandError("--shard must satisfy 0 <= i < n.")
+        return shard, shards
@@ -0,0 +1,53 @@
+import glob
+import os
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from forecasting_app.models import ForecastMetadata
+from forecasting_app.store import update_store
+from forecasting_app.utils import forecast_store_entry
+
+
+class Command(BaseCommand):
+    help = "Import per-country forecast CSV files into the binary forecast store."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dir", default="forecasting_app/forecasts",
+            help="Directory of '<country>_forecast.csv' files (default: forecasting_app/forecasts)",
+        )
+        parser.add_argument(
+            "--remove-csv", action="store_true",
+            help="Delete each CSV file once its forecast is in the store",
+        )
+
+    def handle(self, *args, **kwargs):
+        # Metadata knows the country of a CSV; other files are named after their country
+        paths = {
+            os.path.normpath(metadata.forecast_csv_path): metadata.country_name
+            for metadata in ForecastMetadata.objects.filter(
+                country_name__isnull=False, forecast_csv_path__endswith='.csv'
+            )
+        }
+        for path in glob.glob(os.path.join(kwargs["dir"], "*_forecast.csv")):
+            paths.setdefault(os.path.normpath(path), os.path.basename(path)[:-len("_forecast.csv")])
+
+        forecasts = {}
+        for path, country_name in sorted(paths.items()):
+            if not os.path.exists(path):
+                continue
+            try:
+                forecasts[country_name] = forecast_store_entry(pd.read_csv(path))
+            except (ValueError, KeyError) as e:
+                self.stdout.write(self.style.WARNING(f"Skipping {path}: {e}"))
+                continue
+            self.stdout.write(f"Read the forecast of {country_name} from {path}")
+        if not forecasts:
+            raise CommandError("No forecast CSV files found.")
+
+        store = update_store(forecasts)
+        if kwargs["remove_csv"]:
+            for path, country_name in paths.items():
+                if country_name in forecasts and os.path.exists(path):
+                    os.remove(path)
+        self.stdout.write(self.style.SUCCESS(f"Imported {len(forecasts)} forecasts into {store}."))
@@ -10,3 +10,41 @@ class ForecastMetadata(models.Model):
 
     def __str__(self):
         return f"{self.forecast_type} forecast for {self.target_variable} ({self.country_name or 'Global'})"
+
+
+class ForecastJob(models.Model):
+    """
+    A background forecast generation for one country, run by `forecasting_app.jobs`.
+    At most one job per country is pending or running, so a model is never fitted
+    twice at once.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    ACTIVE = (PENDING, RUNNING)
+
+    country_name = models.CharField(max_length=255)
+    country_key = models.CharField(max_length=255)  # Lowercased country name
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['country_key'], condition=models.Q(status__in=['pending', 'running']),
+                name='unique_active_forecast_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Forecast job #{self.pk} for {self.country_name} ({self.status})"
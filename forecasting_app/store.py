@@ -0,0 +1,248 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+from django.conf import settings
+
+# File layout (little-endian):
+#   header     HEADER_DTYPE, one record
+#   variables  VARIABLE_DTYPE x header['variables']
+#   index      INDEX_DTYPE x header['countries'], sorted by name
+#   data       int32; a country's block holds one array of `rows` values per variable,
+#              starting `offset` values into the data section
+MAGIC = b'FCSTORE1'
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'), ('variables', '<u4'), ('countries', '<u4'), ('data_offset', '<u8'),
+])
+VARIABLE_DTYPE = np.dtype('S32')
+INDEX_DTYPE = np.dtype([
+    ('name', 'S128'), ('origin', '<i4'), ('rows', '<i4'), ('offset', '<i8'),
+])
+EPOCH = date(1970, 1, 1)
+
+# Windows can't replace a file that any process has mapped, which `write_store` does on
+# every update, so there the store is read into memory instead of memory-mapped
+MAP_STORE = os.name != 'nt'
+
+_write_lock = threading.Lock()
+
+
+def store_path():
+    return str(getattr(settings, 'FORECAST_STORE_PATH', os.path.join(settings.BASE_DIR, 'forecasting_app', 'forecasts', 'forecasts.bin')))
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Holds an exclusive lock on a lock file, blocking until other processes release it:
+    flock on POSIX, a one-byte msvcrt lock on Windows.
+    """
+    with open(path, 'a+') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # Released when the file is closed
+            yield
+            return
+        lock_file.seek(0)
+        while True:
+            try:
+                # LK_LOCK gives up after 10 one-second attempts; keep waiting like flock does
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                continue
+        try:
+            yield
+        finally:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class CountryForecast:
+    """
+    The forecast of one country: daily values of each variable starting at `origin`,
+    as (memory-mapped) int32 arrays.
+    """
+
+    def __init__(self, origin, arrays):
+        self.origin = origin
+        self.arrays = arrays
+
+    def __len__(self):
+        return len(next(iter(self.arrays.values())))
+
+    def year_slice(self, year):
+        """
+        Returns the slice of days falling in a calendar year, computed from the origin.
+        """
+        start = (date(year, 1, 1) - self.origin).days
+        stop = (date(year + 1, 1, 1) - self.origin).days
+        return slice(min(max(start, 0), len(self)), min(max(stop, 0), len(self)))
+
+    def records(self, year):
+        """
+        Returns the forecast records of a year as {'date', '<variable>_forecast', ...} dicts.
+        """
+        days = self.year_slice(year)
+        columns = {f'{variable}_forecast': values[days].tolist() for variable, values in self.arrays.items()}
+        return [
+            dict(date=(self.origin + timedelta(days=day)).isoformat(), **{name: values[i] for name, values in columns.items()})
+            for i, day in enumerate(range(days.start, days.stop))
+        ]
+
+    def payload(self, year):
+        """
+        Returns the records of a year serialized the way the REST framework JSON renderer does.
+        """
+        return json.dumps(self.records(year), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class ForecastStore:
+    """
+    Read-only, memory-mapped view of the forecast store: all countries' forecasts in one
+    fixed-width binary file. Looking up a country is a dictionary probe on the offset
+    index and slicing a year is pointer arithmetic on the mapped arrays, so nothing is
+    parsed per request and every process shares one page-cached copy (on Windows, each
+    process reads its own copy; see `MAP_STORE`).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        stat = os.stat(path)
+        self.signature = (stat.st_ino, stat.st_mtime_ns)
+        if MAP_STORE:
+            self.buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        else:
+            self.buffer = np.fromfile(path, dtype=np.uint8)
+        header = np.frombuffer(self.buffer, dtype=HEADER_DTYPE, count=1)[0]
+        if header['magic'] != MAGIC:
+            raise ValueError(f"{path} is not a forecast store.")
+        offset = HEADER_DTYPE.itemsize
+        self.variables = [
+            name.decode() for name in np.frombuffer(self.buffer, dtype=VARIABLE_DTYPE, count=int(header['variables']), offset=offset)
+        ]
+        offset += VARIABLE_DTYPE.itemsize * len(self.variables)
+        self.index = np.frombuffer(self.buffer, dtype=INDEX_DTYPE, count=int(header['countries']), offset=offset)
+        self.data = np.frombuffer(self.buffer, dtype='<i4', offset=int(header['data_offset']))
+        self._positions = {name.decode().lower(): i for i, name in enumerate(self.index['name'])}
+
+    def countries(self):
+        return [name.decode() for name in self.index['name']]
+
+    def get(self, country_name):
+        """
+        Returns the CountryForecast of a country (case-insensitive), or None if the store
+        has none.
+        """
+        position = self._positions.get(country_name.lower())
+        if position is None:
+            return None
+        entry = self.index[position]
+        rows, offset = int(entry['rows']), int(entry['offset'])
+        arrays = {
+            variable: self.data[offset + i * rows:offset + (i + 1) * rows]
+            for i, variable in enumerate(self.variables)
+        }
+        return CountryForecast(EPOCH + timedelta(days=int(entry['origin'])), arrays)
+
+    def items(self):
+        for name in self.countries():
+            yield name, self.get(name)
+
+
+_cache = {}
+
+
+def load_store(path=None):
+    """
+    Returns the forecast store, or None if none has been written yet.
+
+    The opened store is cached per process and reopened when `write_store` has replaced
+    the file.
+    """
+    path = path or store_path()
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    cached = _cache.get(path)
+    if cached is None or cached.signature != (stat.st_ino, stat.st_mtime_ns):
+        cached = _cache[path] = ForecastStore(path)
+    return cached
+
+
+def write_store(forecasts, path=None):
+    """
+    Writes a forecast store from {country_name: (origin date, {variable: values})} and
+    atomically replaces the current file, so readers keep their mapping of the old one.
+    Every country must have the same variables.
+    """
+    path = path or store_path()
+    names = sorted(forecasts)
+    variables = list(next(iter(forecasts.values()))[1]) if forecasts else []
+
+    index = np.zeros(len(names), dtype=INDEX_DTYPE)
+    blocks = []
+    offset = 0
+    for i, name in enumerate(names):
+        origin, values = forecasts[name]
+        if list(values) != variables:
+            raise ValueError(f"Forecast of {name} has variables {list(values)}, expected {variables}.")
+        arrays = [np.asarray(values[variable], dtype='<i4') for variable in variables]
+        rows = len(arrays[0]) if arrays else 0
+        if any(len(array) != rows for array in arrays):
+            raise ValueError(f"Forecast variables of {name} have different lengths.")
+        index[i] = (name.encode(), (origin - EPOCH).days, rows, offset)
+        blocks.extend(arrays)
+        offset += rows * len(arrays)
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    data_offset = HEADER_DTYPE.itemsize + VARIABLE_DTYPE.itemsize * len(variables) + index.nbytes
+    header[0] = (MAGIC, len(variables), len(names), data_offset)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header.tobytes())
+            f.write(np.array([variable.encode() for variable in variables], dtype=VARIABLE_DTYPE).tobytes())
+            f.write(index.tobytes())
+            for array in blocks:
+                f.write(array.tobytes())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return path
+
+
+def update_store(forecasts, path=None):
+    """
+    Adds or replaces the forecasts of some countries, given as in `write_store`, keeping
+    the others. Writers are serialized, across processes by a lock file next to the store.
+    """
+    path = path or store_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _write_lock, file_lock(f'{path}.lock'):
+        store = load_store(path)
+        merged = {}
+        if store is not None:
+            merged = {
+                name: (forecast.origin, {variable: np.array(values) for variable, values in forecast.arrays.items()})
+                for name, forecast in store.items()
+            }
+        # Replacing a country under another spelling drops the old entry
+        replaced = {name.lower() for name in forecasts}
+        merged = {name: value for name, value in merged.items() if name.lower() not in replaced}
+        merged.update(forecasts)
+        return write_store(merged, path)
@@ -1,3 +1,196 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+import pandas as pd
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from data_app.models import Country, CovidData
+from data_app.snapshot import load_current_snapshot
+from data_app.versions import bump_version
+from forecasting_app.cache import ForecastCache, parse_forecast_csv, parse_store_forecast
+from forecasting_app.jobs import expire_stale_jobs, run_forecast_job, submit_forecast_job
+from forecasting_app.management.commands.generate_forecasts import Command as GenerateForecastsCommand
+from forecasting_app.models import ForecastJob
+from forecasting_app.store import update_store
+
+
+class ForecastSeriesTests(TestCase):
+    """
+    The series read from an up-to-date snapshot must equal the ones read from CovidData.
+    """
+
+    def setUp(self):
+        canada = Country.objects.create(name="Canada")
+        chile = Country.objects.create(name="Chile")
+        for day, confirmed in ((1, 3), (2, 5), (4, 9)):
+            CovidData.objects.create(country=canada, province_state="Ontario", file_date=date(2021, 1, day), deaths=day, active=confirmed)
+            CovidData.objects.create(country=canada, province_state="Quebec", file_date=date(2021, 1, day), deaths=1, recovered=confirmed)
+        CovidData.objects.create(country=canada, file_date=None, deaths=100)
+        CovidData.objects.create(country=chile, file_date=date(2021, 1, 2), deaths=7, active=2, recovered=1)
+        self.snapshot_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.snapshot_dir.cleanup)
+
+    def test_snapshot_series_match_database_series(self):
+        with override_settings(COVID_SNAPSHOT_DIR=self.snapshot_dir.name):
+            call_command("export_snapshot", stdout=StringIO())
+            snapshot = load_current_snapshot()
+            self.assertIsNotNone(snapshot)
+
+            command = GenerateForecastsCommand()
+            countries = ["Canada", "Chile", "Unknown"]
+            expected = command.database_series(countries)
+            actual = command.snapshot_series(snapshot, countries)
+            self.assertEqual(sorted(actual), ["Canada", "Chile"])
+            for country_name, series in expected.items():
+                pd.testing.assert_frame_equal(actual[country_name], series, check_dtype=False)
+
+            # Data loaded after the export makes the snapshot stale
+            bump_version()
+            self.assertIsNone(load_current_snapshot())
+
+
+class ForecastCacheTests(TestCase):
+    """
+    Parsed forecasts are reused until their file is rewritten, and the least recently
+    used ones are evicted.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.parsed = []
+
+    def counting_parser(self, path, *args):
+        self.parsed.append(path)
+        return parse_forecast_csv(path)
+
+    def write_csv(self, name, deaths, mtime):
+        path = os.path.join(self.directory, name)
+        pd.DataFrame({
+            'date': ['2021-12-31', '2022-01-01'], 'deaths_forecast': [deaths, deaths + 1],
+        }).to_csv(path, index=False)
+        os.utime(path, ns=(mtime, mtime))
+        return path
+
+    def test_rewritten_file_is_parsed_again(self):
+        cache = ForecastCache(maxsize=4, parser=self.counting_parser)
+        path = self.write_csv('canada.csv', 1, 10**18)
+        parsed = cache.get(path)
+        self.assertIs(cache.get(path), parsed)
+        self.assertEqual(self.parsed, [path])
+
+        self.write_csv('canada.csv', 5, 10**18 + 1)
+        reparsed = cache.get(path)
+        self.assertEqual(self.parsed, [path, path])
+        self.assertEqual(json.loads(reparsed.payload(2022)), [{'date': '2022-01-01', 'deaths_forecast': 6}])
+        self.assertIs(cache.get(path), reparsed)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ForecastCache(maxsize=2, parser=self.counting_parser)
+        canada, chile, peru = (self.write_csv(f'{name}.csv', 1, 10**18) for name in ('canada', 'chile', 'peru'))
+        cache.get(canada)
+        cache.get(chile)
+        cache.get(canada)
+        cache.get(peru)  # Evicts chile, used less recently than canada
+        cache.get(canada)
+        self.assertEqual(self.parsed, [canada, chile, peru])
+        cache.get(chile)
+        self.assertEqual(self.parsed, [canada, chile, peru, chile])
+
+    def test_store_update_is_parsed_again(self):
+        cache = ForecastCache(parser=parse_store_forecast)
+        path = os.path.join(self.directory, 'forecasts.bin')
+        update_store({'Canada': (date(2021, 12, 31), {'deaths': [1, 2]})}, path)
+        os.utime(path, ns=(10**18, 10**18))
+        self.assertEqual(json.loads(cache.get(path, 'canada').payload(2022)), [{'date': '2022-01-01', 'deaths_forecast': 2}])
+
+        update_store({'Canada': (date(2021, 12, 31), {'deaths': [1, 7]})}, path)
+        os.utime(path, ns=(10**18 + 1, 10**18 + 1))
+        self.assertEqual(json.loads(cache.get(path, 'canada').payload(2022)), [{'date': '2022-01-01', 'deaths_forecast': 7}])
+
+
+@patch('forecasting_app.jobs.connections.close_all')
+class ForecastJobTests(TestCase):
+    """
+    One job per country is active at a time, and stale jobs are expired without later
+    overwriting their failure.
+    """
+
+    def age(self, job, **fields):
+        past = timezone.now() - timedelta(seconds=settings.FORECAST_JOB_TIMEOUT + 60)
+        ForecastJob.objects.filter(pk=job.pk).update(**{field: past for field in fields})
+
+    def test_active_job_is_reused(self, close_all):
+        with self.captureOnCommitCallbacks() as callbacks:
+            job, created = submit_forecast_job("Canada")
+            again, created_again = submit_forecast_job("canada")
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.pk, job.pk)
+        self.assertEqual(len(callbacks), 1)
+
+        ForecastJob.objects.filter(pk=job.pk).update(status=ForecastJob.DONE)
+        with self.captureOnCommitCallbacks():
+            new_job, created = submit_forecast_job("Canada")
+        self.assertTrue(created)
+        self.assertNotEqual(new_job.pk, job.pk)
+
+    def test_stale_jobs_expire(self, close_all):
+        queued = ForecastJob.objects.create(country_name="Canada", country_key="canada")
+        running = ForecastJob.objects.create(
+            country_name="Chile", country_key="chile", status=ForecastJob.RUNNING, started_at=timezone.now()
+        )
+        stuck = ForecastJob.objects.create(
+            country_name="Peru", country_key="peru", status=ForecastJob.RUNNING, started_at=timezone.now()
+        )
+        self.age(queued, created_at=True)
+        # Long queued but recently started, so still within its time
+        self.age(running, created_at=True)
+        self.age(stuck, created_at=True, started_at=True)
+
+        self.assertEqual(expire_stale_jobs(), 2)
+        statuses = dict(ForecastJob.objects.values_list("country_key", "status"))
+        self.assertEqual(statuses, {"canada": ForecastJob.FAILED, "chile": ForecastJob.RUNNING, "peru": ForecastJob.FAILED})
+
+        with self.captureOnCommitCallbacks():
+            job, created = submit_forecast_job("Canada")
+        self.assertTrue(created)
+        self.assertNotEqual(job.pk, queued.pk)
+
+    @patch('forecasting_app.jobs.fit_country_forecast')
+    def test_run_records_outcome(self, fit_country_forecast, close_all):
+        job = ForecastJob.objects.create(country_name="Canada", country_key="canada")
+        run_forecast_job(job.pk)
+        fit_country_forecast.assert_called_once_with("Canada")
+        job.refresh_from_db()
+        self.assertEqual(job.status, ForecastJob.DONE)
+        self.assertIsNotNone(job.finished_at)
+
+        fit_country_forecast.side_effect = ValueError("No data available for the country: Chile.")
+        job = ForecastJob.objects.create(country_name="Chile", country_key="chile")
+        run_forecast_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (ForecastJob.FAILED, "No data available for the country: Chile."))
+
+    @patch('forecasting_app.jobs.fit_country_forecast')
+    def test_expired_job_keeps_its_failure(self, fit_country_forecast, close_all):
+        queued = ForecastJob.objects.create(country_name="Canada", country_key="canada")
+        self.age(queued, created_at=True)
+        expire_stale_jobs()
+        run_forecast_job(queued.pk)
+        fit_country_forecast.assert_not_called()
+
+        # Expired while fitting, e.g. by a request from another process
+        job = ForecastJob.objects.create(country_name="Canada", country_key="canada")
+        fit_country_forecast.side_effect = lambda country_name: (self.age(job, started_at=True), expire_stale_jobs())
+        run_forecast_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (ForecastJob.FAILED, "Timed out."))
+        self.assertEqual(close_all.call_count, 2)
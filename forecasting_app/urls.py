@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import CountryForecastView
+from .views import CountryForecastView, ForecastJobStatusView
 
 urlpatterns = [
     path('country-forecast/', CountryForecastView.as_view(), name='country-forecast'),
+    path('forecast-jobs/<int:job_id>/', ForecastJobStatusView.as_view(), name='forecast-job'),
 ]
@@ -1,6 +1,7 @@
 import pandas as pd
-from statsmodels.tsa.arima.model import ARIMA
 import os
+from forecasting_app.fitting import forecast_series
+from forecasting_app.store import update_store
 
 def generate_forecasts(data, target_variables, steps=3650):
     """
@@ -18,14 +19,9 @@ def generate_forecasts(data, target_variables, steps=3650):
     forecast_dates = pd.date_range(start=data.index[-1], periods=steps + 1, freq='D')[1:]  # Generate future dates
 
     for variable in target_variables:
-        model = ARIMA(data[variable], order=(5, 1, 0))  # ARIMA (p, d, q)
-        model_fit = model.fit()
-
-        # Forecast for the given number of steps
-        forecast = model_fit.forecast(steps=steps)
         forecast_df = pd.DataFrame({
             'date': forecast_dates,  # Include the date column
-            f'{variable}_forecast': forecast.round().astype(int)  # Round and convert to integer
+            f'{variable}_forecast': forecast_series(data[variable], steps)
         })
 
         forecasts[variable] = forecast_df
@@ -34,6 +30,21 @@ def generate_forecasts(data, target_variables, steps=3650):
 
 
 
+def daily_series(data):
+    """
+    Sums the rows of each date (e.g., the provinces/states of a country) so that each
+    series has one value per day, as ARIMA expects. Days without reports are NaN, which
+    the model treats as missing observations.
+
+    Args:
+        data (pd.DataFrame): Rows with a datetime index.
+
+    Returns:
+        pd.DataFrame: One row per day with a daily frequency, sorted by date.
+    """
+    return data.groupby(level=0).sum().sort_index().asfreq('D')
+
+
 def save_forecasts_to_csv(forecasts, filename_prefix):
     """
     Saves multiple forecast results to a single CSV file.
@@ -52,3 +63,40 @@ def save_forecasts_to_csv(forecasts, filename_prefix):
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
     combined_df.to_csv(file_path, index=False)
     return file_path
+
+
+def forecast_store_entry(frame):
+    """
+    Converts a forecast DataFrame with a daily 'date' column and '<variable>_forecast'
+    columns into a forecast store entry: (origin date, {variable: values}).
+
+    Args:
+        frame (pd.DataFrame): Forecast with one row per consecutive day.
+
+    Returns:
+        tuple: The first date and the int32-ready values of each variable.
+    """
+    dates = pd.to_datetime(frame['date'])
+    if len(dates) and (dates.diff().dropna() != pd.Timedelta(days=1)).any():
+        raise ValueError("Forecast dates must be consecutive days.")
+    values = {
+        column[:-len('_forecast')]: frame[column].round().astype('int64').to_numpy()
+        for column in frame.columns if column.endswith('_forecast')
+    }
+    return dates.iloc[0].date(), values
+
+
+def save_forecasts_to_store(forecasts, country_name):
+    """
+    Saves a country's forecast results into the binary forecast store.
+
+    Args:
+        forecasts (dict): Dictionary of forecast DataFrames.
+        country_name (str): Country the forecasts belong to.
+
+    Returns:
+        str: Path to the forecast store.
+    """
+    combined_df = pd.concat(forecasts.values(), axis=1)
+    combined_df = combined_df.loc[:, ~combined_df.columns.duplicated()]  # Remove duplicate date columns
+    return update_store({country_name: forecast_store_entry(combined_df)})
@@ -3,14 +3,38 @@ from rest_framework.response import Response
 from rest_framework.exceptions import NotFound
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from covid_app.views import get_country_choices
-from forecasting_app.models import ForecastMetadata
-from data_app.models import CovidData
-from forecasting_app.utils import generate_forecasts, save_forecasts_to_csv
-import pandas as pd
-import os
+from data_app.choices import ChoiceParameter
+from django.http import HttpResponse
+from forecasting_app.cache import forecast_cache, store_forecast_cache
+from django.urls import reverse
+from forecasting_app.jobs import has_forecast_data, submit_forecast_job
+from forecasting_app.models import ForecastJob, ForecastMetadata
+from forecasting_app.store import store_path
 from rest_framework.pagination import PageNumberPagination
 
+JOB_PROPERTIES = {
+    "job_id": openapi.Schema(type=openapi.TYPE_INTEGER, description="Forecast job ID"),
+    "country_name": openapi.Schema(type=openapi.TYPE_STRING, description="Country being forecast"),
+    "status": openapi.Schema(type=openapi.TYPE_STRING, description="pending, running, done or failed"),
+    "error": openapi.Schema(type=openapi.TYPE_STRING, description="Error message of a failed job"),
+    "created_at": openapi.Schema(type=openapi.TYPE_STRING, description="When the job was queued"),
+    "finished_at": openapi.Schema(type=openapi.TYPE_STRING, description="When the job finished"),
+    "status_url": openapi.Schema(type=openapi.TYPE_STRING, description="URL of the job status endpoint"),
+}
+
+
+def job_status(request, job):
+    return {
+        "job_id": job.pk,
+        "country_name": job.country_name,
+        "status": job.status,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+        "status_url": request.build_absolute_uri(reverse('forecast-job', args=[job.pk])),
+    }
+
+
 class YearPagination(PageNumberPagination):
     """
     Custom pagination class for year-based pagination.
@@ -25,20 +49,21 @@ class CountryForecastView(APIView):
     """
     API endpoint to generate or retrieve forecasts for deaths, active cases, and recoveries for a specific country.
     Includes pagination for forecasted years.
+
+    Missing forecasts are generated by a background job: the request returns 202 with the
+    job's status URL instead of fitting the models itself.
     """
 
     @swagger_auto_schema(
         operation_description="Retrieve a year-by-year forecast for deaths, active cases, and recoveries for a specific country.",
         manual_parameters=[
-            openapi.Parameter(
-                'country_name', openapi.IN_QUERY,
+            ChoiceParameter(
+                'country_name', 'covid_countries',  # Dropdown list of countries
                 description="Select a country for the forecast.",
-                type=openapi.TYPE_STRING,
-                enum=get_country_choices(),  # Dropdown list of countries
             ),
             openapi.Parameter(
                 'year', openapi.IN_QUERY,
-                description="Page number representing the forecast year (1 for the first year, 2 for the second year, etc.).",
+                description="Calendar year of the forecast (e.g., 2025); defaults to 2024.",
                 type=openapi.TYPE_INTEGER,
             ),
         ],
@@ -55,6 +80,11 @@ class CountryForecastView(APIView):
                     },
                 ),
             ),
+            202: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                description="The forecast is being generated; poll `status_url` and retry once the job is done.",
+                properties=JOB_PROPERTIES,
+            ),
             400: openapi.Schema(
                 type=openapi.TYPE_OBJECT,
                 properties={
@@ -71,103 +101,73 @@ class CountryForecastView(APIView):
         if year is None:
             year = 2024  # Default to the first year if not specified
         else:
-            year = int(year)
+            try:
+                year = int(year)
+            except ValueError:
+                return Response({"error": "Invalid year. Please provide a valid numeric year."}, status=400)
 
         if not country_name:
             return Response({"error": "country_name parameter is required."}, status=400)
 
-        # Check if a forecast already exists for the country
+        # Serve the forecast from the memory-mapped store when it has one for the country;
+        # its yearly bodies are serialized once per worker until the store is rewritten
+        try:
+            forecast = store_forecast_cache.get(store_path(), country_name.lower())
+        except FileNotFoundError:
+            forecast = None
+        if forecast:
+            return HttpResponse(forecast.payload(year), content_type='application/json')
+
+        # Fall back to a legacy CSV forecast not yet imported into the store
         existing_forecast = ForecastMetadata.objects.filter(country_name__iexact=country_name).first()
 
-        if existing_forecast:
+        if existing_forecast and existing_forecast.forecast_csv_path.endswith('.csv'):
             csv_path = existing_forecast.forecast_csv_path
 
-            # If the forecast file is missing, regenerate the forecast
-            if not os.path.exists(csv_path):
+            # Parsed forecasts are cached per worker until the file changes
+            try:
+                forecast = forecast_cache.get(csv_path)
+            except FileNotFoundError:
                 # Regenerate the forecast if the file is missing
-                return self._regenerate_forecast(country_name, year)
-
-            # Load forecast data from the CSV file
-            forecast_data = pd.read_csv(csv_path)
-            forecast_data['date'] = pd.to_datetime(forecast_data['date'])  # Ensure it's parsed as datetime
+                return self._queue_forecast(request, country_name)
 
-            # Construct the start and end dates for the requested year
-            start_date = pd.Timestamp(year=year, month=1, day=1)
-            end_date = pd.Timestamp(year=year + 1, month=1, day=1)
-
-            # Filter data for the requested year
-            paginated_data = forecast_data[
-                (forecast_data['date'] >= start_date) & (forecast_data['date'] < end_date)
-            ]
-
-            # Format the date column to remove time before returning the response
-            paginated_data['date'] = paginated_data['date'].dt.strftime('%Y-%m-%d')
-
-            # Return the paginated response
-            return Response(paginated_data.to_dict(orient='records'))
+            # Return the requested year's records, serialized when the file was parsed
+            return HttpResponse(forecast.payload(year), content_type='application/json')
 
         # If no forecast exists, generate a new one
-        return self._regenerate_forecast(country_name, year)
+        return self._queue_forecast(request, country_name)
 
 
-    def _regenerate_forecast(self, country_name, year):
+    def _queue_forecast(self, request, country_name):
         """
-        Regenerates a forecast for the specified country and returns the generated data for the requested year.
+        Queues the generation of a country's forecast, or joins the job already generating it.
         """
-        target_variables = ['deaths', 'active', 'recovered']
-        covid_data = CovidData.objects.filter(country__name__iexact=country_name, file_date__isnull=False)
-
-        # Convert data to DataFrame
-        data = pd.DataFrame.from_records(covid_data.values('file_date', *target_variables))
-        if data.empty:
+        if not has_forecast_data(country_name):
             return Response({"error": f"No data available for the country: {country_name}."}, status=404)
 
-        # Ensure 'file_date' is treated as a datetime object
-        data['file_date'] = pd.to_datetime(data['file_date'])
-        data.set_index('file_date', inplace=True)
-
-        try:
-            # Generate forecasts for the next 10 years
-            forecasts = generate_forecasts(data, target_variables, steps=3650)
-        except Exception as e:
-            return Response({"error": f"Error during forecast generation: {str(e)}"}, status=500)
-
-        # Save the forecasts to a CSV file
-        filename_prefix = f"{country_name}"
-        csv_path = save_forecasts_to_csv(forecasts, filename_prefix)
-
-        # Save metadata in the database
-        ForecastMetadata.objects.create(
-            forecast_type="ARIMA",
-            target_variable=", ".join(target_variables),
-            country_name=country_name,
-            forecast_csv_path=csv_path
-        )
+        job, _ = submit_forecast_job(country_name)
+        return Response(job_status(request, job), status=202)
 
-        # Combine forecast results into a single DataFrame
-        combined_df = pd.concat(forecasts.values(), axis=1)
 
-        # Ensure there is a single date column
-        if 'date' in combined_df.columns:
-            combined_df = combined_df.loc[:, ~combined_df.columns.duplicated()]
-
-        # Convert the date column to datetime if not already in datetime format
-        combined_df['date'] = pd.to_datetime(combined_df['date'], errors='coerce')
-
-        # Filter data for the requested year
-        # Set start_date with specified year, month, and day to avoid TypeError
-        start_date = pd.Timestamp(year=2024, month=1, day=1) + pd.DateOffset(years=(year - 1))
-        end_date = start_date + pd.DateOffset(years=1)
-
-
-
-        # Make sure the filtering dates are consistent with datetime
-        paginated_data = combined_df[
-            (combined_df['date'] >= start_date) & (combined_df['date'] < end_date)
-        ]
-
-        # Ensure the date column is returned without time
-        paginated_data['date'] = paginated_data['date'].dt.strftime('%Y-%m-%d')
+class ForecastJobStatusView(APIView):
+    """
+    API endpoint reporting the status of a background forecast job.
+    """
 
-        # Return the paginated response
-        return Response(paginated_data.to_dict(orient='records'))
+    @swagger_auto_schema(
+        operation_description="Retrieve the status of a forecast generation job.",
+        responses={
+            200: openapi.Schema(type=openapi.TYPE_OBJECT, properties=JOB_PROPERTIES),
+            404: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "error": openapi.Schema(type=openapi.TYPE_STRING, description="Error message"),
+                },
+            ),
+        },
+    )
+    def get(self, request, job_id):
+        job = ForecastJob.objects.filter(pk=job_id).first()
+        if job is None:
+            return Response({"error": "Forecast job not found."}, status=404)
+        return Response(job_status(request, job))
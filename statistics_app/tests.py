@@ -1,3 +1,36 @@
+from datetime import date
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from data_app.latest import rebuild_covid_latest
+from data_app.models import Country, CovidData
+
+
+class GlobalCovidStatisticsTests(TestCase):
+    """
+    Successful results are cached until the data version changes; errors are not.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient(HTTP_HOST="localhost")
+        self.country = Country.objects.create(name="Canada")
+        CovidData.objects.create(country=self.country, file_date=date(2021, 1, 1), confirmed=10)
+
+    def test_not_built_error_is_not_cached(self):
+        url = reverse("global-covid-statistics")
+        self.assertEqual(self.client.get(url, {"basis": "latest"}).status_code, 503)
+
+        # Built without bumping the data version, so a cached 503 would still be served
+        rebuild_covid_latest()
+        response = self.client.get(url, {"basis": "latest"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total_confirmed"], 10)
 
-# Create your tests here.
+    def test_success_is_cached(self):
+        url = reverse("global-covid-statistics")
+        self.assertEqual(self.client.get(url).json()["total_confirmed"], 10)
+        CovidData.objects.create(country=self.country, file_date=date(2021, 1, 2), confirmed=5)
+        self.assertEqual(self.client.get(url).json()["total_confirmed"], 10)
@@ -3,17 +3,24 @@ from rest_framework.views import APIView
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from data_app.models import CovidData, VaccinationData
-from django.db.models import Sum
+from django.conf import settings
+from django.db.models import Count, Sum
 from rest_framework.exceptions import ValidationError
+from data_app.caching import cache_key, cached_response
+from data_app.choices import ChoiceParameter, registry, validate_choice
+from data_app.latest import covid_latest_ready, latest_totals
+from data_app.totals import covid_totals_ready, lookup_totals
+from datetime import datetime
+from functools import partial
 
 
 # Helper functions for dropdown options
 def get_country_choices():
-    return sorted(list(CovidData.objects.values_list('country__name', flat=True).distinct()))
+    return registry.sorted('covid_countries')
 
 
 def get_region_choices():
-    return sorted(list(CovidData.objects.values_list('province_state', flat=True).distinct()))
+    return registry.sorted('covid_provinces')
 
 
 class GlobalCovidStatisticsView(APIView):
@@ -21,19 +28,27 @@ class GlobalCovidStatisticsView(APIView):
     Provides global summary statistics for COVID-19 data, with optional filtering.
     """
     @swagger_auto_schema(
-        operation_description="Retrieve global summary statistics for COVID-19 data, with optional filtering by country or region.",
+        operation_description="Retrieve global summary statistics for COVID-19 data, with optional filtering by country or region. "
+                              "With `basis=latest`, totals add up the latest (cumulative) report of each region instead of summing all dates.",
         manual_parameters=[
-            openapi.Parameter(
-                'country_name', openapi.IN_QUERY,
+            ChoiceParameter(
+                'country_name', 'covid_countries',  # Dropdown for country names
                 description="Filter by country name",
-                type=openapi.TYPE_STRING,
-                enum=get_country_choices()  # Dropdown for country names
             ),
-            openapi.Parameter(
-                'region_name', openapi.IN_QUERY,
+            ChoiceParameter(
+                'region_name', 'covid_provinces',  # Dropdown for region names
                 description="Filter by region name (province/state)",
+            ),
+            openapi.Parameter(
+                'basis', openapi.IN_QUERY,
+                description="`sum` (default) sums the metrics over all dates; `latest` uses each region's latest report",
                 type=openapi.TYPE_STRING,
-                enum=get_region_choices()  # Dropdown for region names
+                enum=['sum', 'latest'],
+            ),
+            openapi.Parameter(
+                'as_of', openapi.IN_QUERY,
+                description="With basis=latest, use each region's latest report on or before this date (YYYY-MM-DD)",
+                type=openapi.FORMAT_DATE
             )
         ],
         responses={
@@ -57,16 +72,58 @@ class GlobalCovidStatisticsView(APIView):
     def get(self, request):
         country_name = request.query_params.get('country_name', None)
         region_name = request.query_params.get('region_name', None)
+        as_of = request.query_params.get('as_of', None)
+        basis = request.query_params.get('basis', 'latest' if as_of else 'sum')
 
         # Validate dropdown values
-        country_choices = get_country_choices()
-        region_choices = get_region_choices()
-
-        if country_name and country_name not in country_choices:
-            raise ValidationError({"error": f"Invalid country_name. Available choices: {', '.join(country_choices)}"})
-
-        if region_name and region_name not in region_choices:
-            raise ValidationError({"error": f"Invalid region_name. Available choices: {', '.join(region_choices)}"})
+        validate_choice('covid_countries', country_name, 'country_name')
+        validate_choice('covid_provinces', region_name, 'region_name')
+
+        if basis not in ('sum', 'latest'):
+            raise ValidationError({"error": "Invalid basis. Use 'sum' or 'latest'."})
+        if as_of:
+            if basis != 'latest':
+                raise ValidationError({"error": "as_of requires basis=latest."})
+            try:
+                as_of = datetime.strptime(as_of, '%Y-%m-%d').date()
+            except ValueError:
+                raise ValidationError({"error": "Invalid as_of format. Use YYYY-MM-DD."})
+
+        if basis == 'latest':
+            compute = partial(self.compute_latest_totals, country_name, region_name, as_of)
+        else:
+            compute = partial(self.compute_totals, country_name, region_name)
+
+        # Results are cached per filters until the data changes
+        data, status = cached_response(
+            cache_key('statistics:covid', country_name=country_name, region_name=region_name, basis=basis, as_of=as_of),
+            compute,
+            settings.STATISTICS_CACHE_TIMEOUT,
+        )
+        return Response(data, status=status)
+
+    def compute_latest_totals(self, country_name, region_name, as_of):
+        """
+        Returns (data, status) summing the latest report of each matching region, optionally
+        as of a date, from the materialized latest reports (about one row per region).
+        """
+        if not covid_latest_ready():
+            return {"error": "Latest reports are not built yet. Run `manage.py rebuild_latest`."}, 503
+        totals = latest_totals(country_name, region_name, as_of)
+        if not totals.pop('rows'):
+            return {"error": "No data found for the given filters."}, 404
+        return totals, 200
+
+    def compute_totals(self, country_name, region_name):
+        """
+        Returns (data, status) for the given filters, read from the maintained totals or,
+        before they are built, computed in one query.
+        """
+        if covid_totals_ready():
+            totals = lookup_totals(country_name, region_name)
+            if not totals.pop('rows'):
+                return {"error": "No data found for the given filters."}, 404
+            return totals, 200
 
         # Initial queryset
         queryset = CovidData.objects.all()
@@ -79,22 +136,25 @@ class GlobalCovidStatisticsView(APIView):
         if region_name:
             queryset = queryset.filter(province_state__exact=region_name)
 
-        # Check if no records are found
-        if not queryset.exists():
-            return Response({"error": "No data found for the given filters."}, status=404)
+        # Aggregate data; the row count replaces a separate exists() query
+        totals = queryset.aggregate(
+            rows=Count('id'),
+            total_confirmed=Sum('confirmed'),
+            total_deaths=Sum('deaths'),
+            total_recovered=Sum('recovered'),
+            total_active=Sum('active'),
+        )
 
-        # Aggregate data
-        total_confirmed = queryset.aggregate(Sum('confirmed'))['confirmed__sum'] or 0
-        total_deaths = queryset.aggregate(Sum('deaths'))['deaths__sum'] or 0
-        total_recovered = queryset.aggregate(Sum('recovered'))['recovered__sum'] or 0
-        total_active = queryset.aggregate(Sum('active'))['active__sum'] or 0
+        # Check if no records are found
+        if not totals.pop('rows'):
+            return {"error": "No data found for the given filters."}, 404
 
-        return Response({
-            "total_confirmed": total_confirmed,
-            "total_deaths": total_deaths,
-            "total_recovered": total_recovered,
-            "total_active": total_active
-        })
+        return {
+            "total_confirmed": totals['total_confirmed'] or 0,
+            "total_deaths": totals['total_deaths'] or 0,
+            "total_recovered": totals['total_recovered'] or 0,
+            "total_active": totals['total_active'] or 0
+        }, 200
 
 
 class GlobalVaccinationStatisticsView(APIView):
@@ -104,11 +164,9 @@ class GlobalVaccinationStatisticsView(APIView):
     @swagger_auto_schema(
         operation_description="Retrieve global summary statistics for vaccination data, with optional filtering by country.",
         manual_parameters=[
-            openapi.Parameter(
-                'country_name', openapi.IN_QUERY,
+            ChoiceParameter(
+                'country_name', 'covid_countries',  # Dropdown for country names
                 description="Filter by country name",
-                type=openapi.TYPE_STRING,
-                enum=get_country_choices()  # Dropdown for country names
             )
         ],
         responses={
@@ -133,11 +191,20 @@ class GlobalVaccinationStatisticsView(APIView):
         country_name = request.query_params.get('country_name', None)
 
         # Validate dropdown values
-        country_choices = get_country_choices()
-
-        if country_name and country_name not in country_choices:
-            raise ValidationError({"error": f"Invalid country_name. Available choices: {', '.join(country_choices)}"})
-
+        validate_choice('covid_countries', country_name, 'country_name')
+
+        # Results are cached per filters until the data changes
+        data, status = cached_response(
+            cache_key('statistics:vaccination', country_name=country_name),
+            lambda: self.compute_totals(country_name),
+            settings.STATISTICS_CACHE_TIMEOUT,
+        )
+        return Response(data, status=status)
+
+    def compute_totals(self, country_name):
+        """
+        Returns (data, status) for the given filter, computing all totals in one query.
+        """
         # Initial queryset
         queryset = VaccinationData.objects.all()
 
@@ -145,19 +212,22 @@ class GlobalVaccinationStatisticsView(APIView):
         if country_name:
             queryset = queryset.filter(country__name__exact=country_name)
 
+        # Aggregate data; the row count replaces a separate exists() query
+        totals = queryset.aggregate(
+            rows=Count('id'),
+            total_vaccinations=Sum('total_vaccinations'),
+            persons_first_dose=Sum('persons_vaccinated_first_dose'),
+            persons_last_dose=Sum('persons_last_dose'),
+            persons_booster_doses=Sum('persons_booster_add_dose'),
+        )
+
         # Check if no records are found
-        if not queryset.exists():
-            return Response({"error": "No data found for the given filters."}, status=404)
-
-        # Aggregate data
-        total_vaccinations = queryset.aggregate(Sum('total_vaccinations'))['total_vaccinations__sum'] or 0
-        persons_first_dose = queryset.aggregate(Sum('persons_vaccinated_first_dose'))['persons_vaccinated_first_dose__sum'] or 0
-        persons_last_dose = queryset.aggregate(Sum('persons_last_dose'))['persons_last_dose__sum'] or 0
-        persons_booster_doses = queryset.aggregate(Sum('persons_booster_add_dose'))['persons_booster_add_dose__sum'] or 0
-
-        return Response({
-            "total_vaccinations": total_vaccinations,
-            "persons_first_dose": persons_first_dose,
-            "persons_last_dose": persons_last_dose,
-            "persons_booster_doses": persons_booster_doses
-        })
+        if not totals.pop('rows'):
+            return {"error": "No data found for the given filters."}, 404
+
+        return {
+            "total_vaccinations": totals['total_vaccinations'] or 0,
+            "persons_first_dose": totals['persons_first_dose'] or 0,
+            "persons_last_dose": totals['persons_last_dose'] or 0,
+            "persons_booster_doses": totals['persons_booster_doses'] or 0
+        }, 200
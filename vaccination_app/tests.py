@@ -1,3 +1,74 @@
+from datetime import date
+
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from data_app.models import Country, VaccinationData
+
+
+class VaccinationDataFilteredTests(TestCase):
+    """
+    The SQL de-duplication must return the records the former per-record dict did.
+    """
+
+    def setUp(self):
+        self.client = APIClient(HTTP_HOST="localhost")
+        canada = Country.objects.create(name="Canada")
+        chile = Country.objects.create(name="Chile")
+        # A second country row with the same name shares its records' keys
+        chile_again = Country.objects.create(name="Chile")
+        for country, total, first_dose, first_date in (
+            (canada, 100, 50, date(2021, 2, 1)),
+            (canada, 100, 60, date(2021, 3, 1)),
+            (canada, 200, 70, None),
+            (chile, 300, 80, date(2021, 1, 15)),
+            (chile_again, 300, 90, date(2021, 1, 20)),
+            (chile_again, 400, 95, date(2021, 4, 1)),
+            (canada, 100, 65, date(2021, 5, 1)),
+        ):
+            VaccinationData.objects.create(
+                country=country, total_vaccinations=total, persons_vaccinated_first_dose=first_dose,
+                persons_last_dose=first_dose // 2, persons_booster_add_dose=1, first_vaccine_date=first_date,
+            )
+
+    def dict_deduplicated(self, queryset):
+        """
+        The de-duplication the view did before, keeping the first record of each
+        (country name, total_vaccinations) pair.
+        """
+        unique_records = {}
+        for record in queryset.order_by("id"):
+            unique_records.setdefault((record.country.name, record.total_vaccinations), record)
+        return [
+            {
+                "country_name": record.country.name,
+                "total_vaccinations": record.total_vaccinations,
+                "persons_vaccinated_first_dose": record.persons_vaccinated_first_dose,
+                "persons_last_dose": record.persons_last_dose,
+                "persons_booster_add_dose": record.persons_booster_add_dose,
+                "first_vaccine_date": record.first_vaccine_date and record.first_vaccine_date.isoformat(),
+            }
+            for record in unique_records.values()
+        ]
+
+    def test_matches_dict_deduplication(self):
+        url = reverse("vaccination-filtered")
+        for params, queryset in (
+            ({}, VaccinationData.objects.all()),
+            ({"country_name": "Chile"}, VaccinationData.objects.filter(country__name="Chile")),
+            ({"start_date": "2021-02-01"}, VaccinationData.objects.filter(first_vaccine_date__gte=date(2021, 2, 1))),
+        ):
+            expected = self.dict_deduplicated(queryset)
+            response = self.client.get(url, params).json()
+            self.assertEqual(response["results"], expected, params)
+            self.assertEqual(response["count"], len(expected), params)
 
-# Create your tests here.
+    def test_pages_cover_the_deduplicated_records(self):
+        url = reverse("vaccination-filtered")
+        pages = []
+        response = self.client.get(url, {"page_size": 2}).json()
+        pages += response["results"]
+        while response["next"]:
+            response = self.client.get(response["next"]).json()
+            pages += response["results"]
+        self.assertEqual(pages, self.dict_deduplicated(VaccinationData.objects.all()))
@@ -1,8 +1,10 @@
 from django.urls import path
 from .views import (
+    VaccinationDataExportView,
     VaccinationDataFilteredView,
 )
 
 urlpatterns = [
     path('vaccinations/filter/', VaccinationDataFilteredView.as_view(), name='vaccination-filtered'),
+    path('vaccinations/export/', VaccinationDataExportView.as_view(), name='vaccination-export'),
 ]
@@ -4,12 +4,101 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from data_app.models import VaccinationData
 from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from datetime import datetime
+from data_app.choices import ChoiceParameter, registry, validate_choice
+from data_app.export import EXPORT_FORMATS, export_response, get_export_options
 
 
 # Helper function to generate dropdown options
 def get_country_choices():
-    return sorted(list(VaccinationData.objects.values_list('country__name', flat=True).distinct()))
+    return registry.sorted('vaccination_countries')
+
+
+class VaccinationPagination(PageNumberPagination):
+    """
+    Optional pagination for vaccination data, used when `page` or `page_size` is passed.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+def get_vaccination_filters(request):
+    """
+    Reads and validates the vaccination filter query parameters shared by the filter and
+    export endpoints. Returns (country_name, start_date, end_date).
+    """
+    country_name = request.query_params.get('country_name', None)
+    start_date = request.query_params.get('start_date', None)
+    end_date = request.query_params.get('end_date', None)
+
+    # Validate date format
+    try:
+        if start_date:
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        if end_date:
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+            if start_date and start_date > end_date:
+                raise ValidationError({"error": "start_date cannot be after end_date."})
+    except ValueError:
+        raise ValidationError({"error": "Invalid date format. Use YYYY-MM-DD."})
+
+    # Validate `country_name` against dropdown choices
+    validate_choice('vaccination_countries', country_name, 'country_name')
+
+    return country_name, start_date, end_date
+
+
+def filter_vaccination_data(country_name=None, start_date=None, end_date=None):
+    """
+    Returns the VaccinationData rows matching the filters.
+    """
+    # Initial queryset
+    queryset = VaccinationData.objects.all()
+
+    # Filter by country name if provided
+    if country_name:
+        queryset = queryset.filter(country__name__exact=country_name)
+
+    # Filter by date range if provided
+    if start_date and end_date:
+        queryset = queryset.filter(first_vaccine_date__range=[start_date, end_date])
+    elif start_date:
+        queryset = queryset.filter(first_vaccine_date__gte=start_date)
+    elif end_date:
+        queryset = queryset.filter(first_vaccine_date__lte=end_date)
+
+    return queryset
+
+
+def unique_vaccination_data(queryset):
+    """
+    Keeps the first record (by ID) of each (country name, total_vaccinations) pair, using a
+    ROW_NUMBER() window in the database, and projects the response fields with `values()`.
+    """
+    return (
+        queryset.annotate(
+            country_name=F('country__name'),
+            row_number=Window(
+                RowNumber(),
+                partition_by=[F('country__name'), F('total_vaccinations')],
+                order_by=F('id').asc(),
+            ),
+        )
+        .filter(row_number=1)
+        .order_by('id')
+        .values(
+            'country_name',
+            'total_vaccinations',
+            'persons_vaccinated_first_dose',
+            'persons_last_dose',
+            'persons_booster_add_dose',
+            'first_vaccine_date',
+        )
+    )
 
 
 class VaccinationDataFilteredView(APIView):
@@ -21,11 +110,9 @@ class VaccinationDataFilteredView(APIView):
     @swagger_auto_schema(
         operation_description="Filter vaccination data by country name, date range, or both. Display unique records based on `country_name` and `total_vaccinations`.",
         manual_parameters=[
-            openapi.Parameter(
-                'country_name', openapi.IN_QUERY,
+            ChoiceParameter(
+                'country_name', 'vaccination_countries',  # Dropdown for country names
                 description="Name of the country to filter by",
-                type=openapi.TYPE_STRING,
-                enum=get_country_choices()  # Dropdown for country names
             ),
             openapi.Parameter(
                 'start_date', openapi.IN_QUERY,
@@ -36,6 +123,16 @@ class VaccinationDataFilteredView(APIView):
                 'end_date', openapi.IN_QUERY,
                 description="End date (YYYY-MM-DD)",
                 type=openapi.FORMAT_DATE
+            ),
+            openapi.Parameter(
+                'page', openapi.IN_QUERY,
+                description="Page number; without `page` or `page_size`, all records are returned",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'page_size', openapi.IN_QUERY,
+                description="Number of records per page (max 1000)",
+                type=openapi.TYPE_INTEGER
             )
         ],
         responses={
@@ -73,63 +170,84 @@ class VaccinationDataFilteredView(APIView):
         }
     )
     def get(self, request, *args, **kwargs):
-        country_name = request.query_params.get('country_name', None)
-        start_date = request.query_params.get('start_date', None)
-        end_date = request.query_params.get('end_date', None)
-
-        # Validate date format
-        try:
-            if start_date:
-                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            if end_date:
-                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-                if start_date and start_date > end_date:
-                    raise ValidationError({"error": "start_date cannot be after end_date."})
-        except ValueError:
-            raise ValidationError({"error": "Invalid date format. Use YYYY-MM-DD."})
-
-        # Validate `country_name` against dropdown choices
-        country_choices = get_country_choices()
-        if country_name and country_name not in country_choices:
-            raise ValidationError({"error": f"Invalid country_name. Available choices: {', '.join(country_choices)}"})
-
-        # Initial queryset
-        queryset = VaccinationData.objects.all()
-
-        # Filter by country name if provided
-        if country_name:
-            queryset = queryset.filter(country__name__exact=country_name)
-
-        # Filter by date range if provided
-        if start_date and end_date:
-            queryset = queryset.filter(first_vaccine_date__range=[start_date, end_date])
-        elif start_date:
-            queryset = queryset.filter(first_vaccine_date__gte=start_date)
-        elif end_date:
-            queryset = queryset.filter(first_vaccine_date__lte=end_date)
+        queryset = filter_vaccination_data(*get_vaccination_filters(request))
 
         # Check if no records are found
         if not queryset.exists():
             return Response({"error": "No vaccination data found for the given filters."}, status=404)
 
-        # Filter unique records manually
-        unique_records = {}
-        for record in queryset:
-            key = (record.country.name, record.total_vaccinations)
-            if key not in unique_records:
-                unique_records[key] = record
-
-        # Format response
-        result = [
-            {
-                "country_name": record.country.name,
-                "total_vaccinations": record.total_vaccinations,
-                "persons_vaccinated_first_dose": record.persons_vaccinated_first_dose,
-                "persons_last_dose": record.persons_last_dose,
-                "persons_booster_add_dose": record.persons_booster_add_dose,
-                "first_vaccine_date": record.first_vaccine_date
-            }
-            for record in unique_records.values()
-        ]
+        # Filter unique records in the database
+        unique_records = unique_vaccination_data(queryset)
 
+        # Paginate the results if requested
+        if 'page' in request.query_params or 'page_size' in request.query_params:
+            paginator = VaccinationPagination()
+            paginated_data = paginator.paginate_queryset(unique_records, request)
+            return paginator.get_paginated_response(paginated_data)
+
+        result = list(unique_records.iterator(chunk_size=2000))
         return Response({"count": len(result), "results": result})
+
+
+# Columns of the vaccination export, in order
+VACCINATION_EXPORT_COLUMNS = (
+    'country_name', 'total_vaccinations', 'persons_vaccinated_first_dose', 'persons_last_dose',
+    'persons_booster_add_dose', 'first_vaccine_date',
+)
+
+
+class VaccinationDataExportView(APIView):
+    """
+    Stream all vaccination records matching the filters as NDJSON or CSV, in one response.
+    """
+
+    @swagger_auto_schema(
+        operation_description="Stream vaccination records matching the filters as NDJSON or CSV, optionally gzip-compressed. "
+                              "Unlike the filter endpoint, records are not de-duplicated.",
+        manual_parameters=[
+            ChoiceParameter(
+                'country_name', 'vaccination_countries',  # Dropdown for country names
+                description="Name of the country to filter by",
+            ),
+            openapi.Parameter(
+                'start_date', openapi.IN_QUERY,
+                description="Start date (YYYY-MM-DD)",
+                type=openapi.FORMAT_DATE
+            ),
+            openapi.Parameter(
+                'end_date', openapi.IN_QUERY,
+                description="End date (YYYY-MM-DD)",
+                type=openapi.FORMAT_DATE
+            ),
+            openapi.Parameter(
+                'export_format', openapi.IN_QUERY,
+                description="Output format (default: ndjson)",
+                type=openapi.TYPE_STRING,
+                enum=list(EXPORT_FORMATS)
+            ),
+            openapi.Parameter(
+                'gzip', openapi.IN_QUERY,
+                description="Compress the output with gzip (default: false)",
+                type=openapi.TYPE_BOOLEAN
+            )
+        ],
+        responses={
+            200: openapi.Response(description="Streamed NDJSON or CSV file"),
+            400: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "error": openapi.Schema(type=openapi.TYPE_STRING, description="Error message")
+                }
+            ),
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        export_format, compress = get_export_options(request)
+        queryset = filter_vaccination_data(*get_vaccination_filters(request))
+        rows = queryset.order_by('id').values_list(
+            'country__name', 'total_vaccinations', 'persons_vaccinated_first_dose', 'persons_last_dose',
+            'persons_booster_add_dose', 'first_vaccine_date',
+        )
+        return export_response(
+            rows.iterator(chunk_size=5000), VACCINATION_EXPORT_COLUMNS, 'vaccination_data', export_format, compress
+        )
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from visualization_app.models import CovidStaticData, HeatmapGridCell, HeatmapPayload
+
+# Fields of a heatmap entry, in response order
+FIELDS = (
+    'country_name', 'state', 'latitude', 'longitude',
+    'total_deaths', 'total_active', 'total_confirmed', 'total_recovered',
+)
+METRICS = FIELDS[4:]
+
+# Zoom levels the grid cells are precomputed for; a zoom-z grid has 2^z x 2^z cells
+GRID_MAX_ZOOM = 10
+
+# Latitude limit of the web-mercator projection
+MAX_LATITUDE = 85.0511287798
+
+
+def heatmap_rows(queryset):
+    """
+    Returns the heatmap entries of a CovidStaticData queryset, in a stable order.
+    """
+    rows = queryset.order_by('country_name', 'state', 'year').values_list(*FIELDS)
+    return [dict(zip(FIELDS, row)) for row in rows]
+
+
+def serialize(entries):
+    """
+    Serializes heatmap entries the way the REST framework JSON renderer does and returns
+    (body, strong ETag).
+    """
+    body = json.dumps(entries, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+    return body, f'"{hashlib.sha256(body).hexdigest()[:40]}"'
+
+
+def build_heatmap_payloads(partitions=None):
+    """
+    Serializes the heatmap bodies of every (year, country) filter combination, including
+    "all years" and "all countries". With `partitions`, an iterable of (country_name, year)
+    pairs, only the payloads that contain those partitions are rebuilt.
+    """
+    rows = CovidStaticData.objects.order_by('country_name', 'state', 'year').values_list('year', *FIELDS)
+    groups = defaultdict(list)
+    for year, *values in rows.iterator(chunk_size=5000):
+        entry = dict(zip(FIELDS, values))
+        country_key = entry['country_name'].lower()
+        for key in ((None, ''), (year, ''), (None, country_key), (year, country_key)):
+            groups[key].append(entry)
+
+    if partitions is not None:
+        wanted = set()
+        for country_name, year in partitions:
+            country_key = country_name.lower()
+            wanted.update(((None, ''), (year, ''), (None, country_key), (year, country_key)))
+    else:
+        wanted = set(groups)
+
+    payloads = []
+    for key in wanted:
+        entries = groups.get(key)
+        if not entries:
+            continue
+        body, etag = serialize(entries)
+        payloads.append(HeatmapPayload(year=key[0], country_key=key[1], body=body, etag=etag, rows=len(entries)))
+
+    with transaction.atomic():
+        if partitions is None:
+            HeatmapPayload.objects.all().delete()
+        else:
+            # Payloads of filters that no longer match any row go away with the others
+            for year, country_key in wanted:
+                HeatmapPayload.objects.filter(year=year, country_key=country_key).delete()
+        HeatmapPayload.objects.bulk_create(payloads, batch_size=500)
+    return len(payloads)
+
+
+def tile_x(longitude, zoom):
+    """
+    Returns the web-mercator tile column of a longitude at a zoom level.
+    """
+    size = 1 << zoom
+    return min(max(int((longitude + 180.0) / 360.0 * size), 0), size - 1)
+
+
+def tile_y(latitude, zoom):
+    """
+    Returns the web-mercator tile row of a latitude at a zoom level (row 0 is the north edge).
+    """
+    size = 1 << zoom
+    latitude = math.radians(min(max(latitude, -MAX_LATITUDE), MAX_LATITUDE))
+    y = (1.0 - math.asinh(math.tan(latitude)) / math.pi) / 2.0 * size
+    return min(max(int(y), 0), size - 1)
+
+
+def build_grid_cells(batch_size=5000):
+    """
+    Bins every CovidStaticData point with coordinates into the tile grid of each zoom level
+    up to `GRID_MAX_ZOOM`, per year and for all years, and replaces the grid cells. Returns
+    the number of cells.
+    """
+    rows = CovidStaticData.objects.filter(
+        latitude__isnull=False, longitude__isnull=False
+    ).values_list('year', 'latitude', 'longitude', *METRICS)
+    # (zoom, year, x, y) -> [points, latitude sum, longitude sum, *metric sums]
+    cells = defaultdict(lambda: [0] * (3 + len(METRICS)))
+    for year, latitude, longitude, *metrics in rows.iterator(chunk_size=batch_size):
+        for zoom in range(GRID_MAX_ZOOM + 1):
+            x, y = tile_x(longitude, zoom), tile_y(latitude, zoom)
+            for key in ((zoom, year, x, y), (zoom, None, x, y)):
+                cell = cells[key]
+                cell[0] += 1
+                cell[1] += latitude
+                cell[2] += longitude
+                for i, value in enumerate(metrics, 3):
+                    cell[i] += value or 0
+
+    objects = [
+        HeatmapGridCell(
+            zoom=zoom, year=year, x=x, y=y, points=points,
+            latitude=latitude_sum / points, longitude=longitude_sum / points,
+            **dict(zip(METRICS, metrics)),
+        )
+        for (zoom, year, x, y), (points, latitude_sum, longitude_sum, *metrics) in cells.items()
+    ]
+    with transaction.atomic():
+        HeatmapGridCell.objects.all().delete()
+        HeatmapGridCell.objects.bulk_create(objects, batch_size=batch_size)
+    return len(objects)
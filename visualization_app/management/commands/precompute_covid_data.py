@@ -1,17 +1,102 @@
+import time
+from collections import defaultdict
+from datetime import date
+
 from django.core.management.base import BaseCommand
-from data_app.models import CovidData
-from visualization_app.models import CovidStaticData
-from django.db.models import Sum
+from django.db import connection, transaction
+from data_app.models import Country, CovidData
+from data_app.versions import bump_version
+from visualization_app.heatmap import build_grid_cells, build_heatmap_payloads
+from visualization_app.models import CovidMonthlyData, CovidStaticData, CovidStaticDataStaging, PrecomputeWatermark
+from django.db.models import Max, Q, Sum
+from django.db.models.functions import TruncMonth
+
+# Columns copied from the staging table into CovidStaticData
+COLUMNS = (
+    'country_name', 'state', 'year', 'latitude', 'longitude',
+    'total_deaths', 'total_active', 'total_confirmed', 'total_recovered',
+)
+
+# Columns of CovidMonthlyData compared when checking whether a partition changed
+MONTHLY_COLUMNS = (
+    'country_name', 'state', 'month', 'latitude', 'longitude',
+    'total_deaths', 'total_active', 'total_confirmed', 'total_recovered',
+)
+
+# PrecomputeWatermark.name of this command
+WATERMARK = 'covid_static_data'
+
+# IDs below the watermark that every incremental run scans again. IDs are handed out when a
+# row is inserted, not when its transaction commits, so on PostgreSQL a load committing
+# after a run has read Max('id') can leave rows below the watermark that run never saw.
+RESCAN_MARGIN = 10000
+
 
 class Command(BaseCommand):
-    help = "Precompute COVID-19 data by country, state, and year"
+    help = "Precompute COVID-19 data by country, state, and year (and month)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=5000,
+            help="Number of rows written to the staging table per batch (default: 5000)",
+        )
+        parser.add_argument(
+            "--full", action="store_true",
+            help="Recompute every country and year instead of only the (country, year) "
+                 "partitions that received CovidData rows since the last run",
+        )
+        parser.add_argument(
+            "--rescan-margin", type=int, default=RESCAN_MARGIN,
+            help="Number of CovidData IDs below the last run's watermark scanned again, to pick "
+                 f"up rows committed late by concurrent loads (default: {RESCAN_MARGIN})",
+        )
 
     def handle(self, *args, **kwargs):
-        # Clear existing static data
-        CovidStaticData.objects.all().delete()
+        batch_size = kwargs["batch_size"]
+        watermark = PrecomputeWatermark.objects.filter(name=WATERMARK).first()
+        # Rows added while this run aggregates are picked up by the next run. Rows of a
+        # load that was still running when the watermark was read may have lower IDs, so
+        # runs that find new rows also re-scan the margin below the watermark; loads larger
+        # than the margin must not run concurrently with this command (or must be followed
+        # by --full).
+        last_id = CovidData.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+
+        if kwargs["full"] or watermark is None:
+            self.precompute_full(batch_size)
+            partitions = None
+        elif last_id > watermark.last_covid_id:
+            after_id = max(watermark.last_covid_id - max(kwargs["rescan_margin"], 0), 0)
+            partitions = self.precompute_partitions(after_id, batch_size)
+            if not partitions:
+                # Only rows without a date were added; nothing precomputed changed
+                PrecomputeWatermark.objects.filter(name=WATERMARK).update(last_covid_id=last_id)
+                self.stdout.write("No precomputed COVID-19 data changed since the last run.")
+                return
+        else:
+            self.stdout.write("No new COVID-19 data since the last run.")
+            return
 
+        # Serialize the heatmap responses once, instead of on every request
+        start_time = time.time()
+        payloads = build_heatmap_payloads(partitions)
+        self.stdout.write(f"Serialized {payloads} heatmap payloads in {time.time() - start_time:.2f} seconds.")
+
+        # The grid is binned from the (already aggregated) CovidStaticData rows, so it is
+        # cheap enough to rebuild whole on every run
+        start_time = time.time()
+        cells = build_grid_cells(batch_size)
+        self.stdout.write(f"Binned {cells} heatmap grid cells in {time.time() - start_time:.2f} seconds.")
+
+        PrecomputeWatermark.objects.update_or_create(name=WATERMARK, defaults={'last_covid_id': last_id})
+        bump_version()
+        self.stdout.write(self.style.SUCCESS("Successfully precomputed COVID-19 data"))
+
+    def aggregate(self, covid_data, batch_size):
+        """
+        Yields CovidStaticData field values per (country, state, year) of the given rows.
+        """
         # Filter out records with NULL or invalid file_date
-        covid_data = CovidData.objects.exclude(file_date__isnull=True)
+        covid_data = covid_data.exclude(file_date__isnull=True)
 
         # Aggregate COVID-19 data, ensuring unique combinations
         aggregated_data = (
@@ -27,20 +112,200 @@ class Command(BaseCommand):
 
         # Deduplicate entries before inserting
         seen_combinations = set()
-        for entry in aggregated_data:
+        for entry in aggregated_data.iterator(chunk_size=batch_size):
             key = (entry['country__name'], entry['province_state'], entry['file_date__year'])
-            if key not in seen_combinations:
-                seen_combinations.add(key)
-                CovidStaticData.objects.create(
-                    country_name=entry['country__name'],
-                    state=entry['province_state'],
-                    year=entry['file_date__year'],
-                    latitude=entry['country__latitude'],
-                    longitude=entry['country__longitude'],
-                    total_deaths=entry['total_deaths'] or 0,
-                    total_active=entry['total_active'] or 0,
-                    total_confirmed=entry['total_confirmed'] or 0,
-                    total_recovered=entry['total_recovered'] or 0,
+            if key in seen_combinations:
+                continue
+            seen_combinations.add(key)
+            yield {
+                'country_name': entry['country__name'],
+                'state': entry['province_state'],
+                'year': entry['file_date__year'],
+                'latitude': entry['country__latitude'],
+                'longitude': entry['country__longitude'],
+                'total_deaths': entry['total_deaths'] or 0,
+                'total_active': entry['total_active'] or 0,
+                'total_confirmed': entry['total_confirmed'] or 0,
+                'total_recovered': entry['total_recovered'] or 0,
+            }
+
+    def aggregate_months(self, covid_data, batch_size):
+        """
+        Yields CovidMonthlyData field values per (country, state, month) of the given rows.
+        """
+        aggregated_data = (
+            covid_data.exclude(file_date__isnull=True)
+            .annotate(month=TruncMonth('file_date'))
+            .values('country__name', 'province_state', 'country__latitude', 'country__longitude', 'month')
+            .annotate(
+                total_deaths=Sum('deaths'),
+                total_active=Sum('active'),
+                total_confirmed=Sum('confirmed'),
+                total_recovered=Sum('recovered'),
+            )
+            .order_by('country__name', 'province_state', 'month')
+        )
+        for entry in aggregated_data.iterator(chunk_size=batch_size):
+            yield {
+                'country_name': entry['country__name'],
+                'state': entry['province_state'],
+                'month': entry['month'],
+                'latitude': entry['country__latitude'],
+                'longitude': entry['country__longitude'],
+                'total_deaths': entry['total_deaths'] or 0,
+                'total_active': entry['total_active'] or 0,
+                'total_confirmed': entry['total_confirmed'] or 0,
+                'total_recovered': entry['total_recovered'] or 0,
+            }
+
+    def precompute_full(self, batch_size):
+        # Phase 1: aggregate into the staging table; readers keep seeing the current data
+        self.stdout.write("Aggregating COVID-19 data into the staging table...")
+        start_time = time.time()
+        CovidStaticDataStaging.objects.all().delete()
+        batch = []
+        staged = 0
+        for values in self.aggregate(CovidData.objects.all(), batch_size):
+            batch.append(CovidStaticDataStaging(**values))
+            if len(batch) >= batch_size:
+                CovidStaticDataStaging.objects.bulk_create(batch)
+                staged += len(batch)
+                batch.clear()
+                self.stdout.write(f"  {staged} rows staged ({time.time() - start_time:.2f} seconds)")
+        CovidStaticDataStaging.objects.bulk_create(batch)
+        staged += len(batch)
+        self.stdout.write(f"Staged {staged} rows in {time.time() - start_time:.2f} seconds.")
+
+        # Phase 2: swap the staged rows in; readers see either the old or the new data
+        start_time = time.time()
+        self.swap_in_staged_rows()
+        CovidStaticDataStaging.objects.all().delete()
+        self.stdout.write(f"Swapped staged rows in {time.time() - start_time:.2f} seconds.")
+
+        # Phase 3: rebuild the monthly cube in one transaction
+        start_time = time.time()
+        with transaction.atomic():
+            CovidMonthlyData.objects.all().delete()
+            batch = []
+            months = 0
+            for values in self.aggregate_months(CovidData.objects.all(), batch_size):
+                batch.append(CovidMonthlyData(**values))
+                if len(batch) >= batch_size:
+                    CovidMonthlyData.objects.bulk_create(batch)
+                    months += len(batch)
+                    batch.clear()
+            CovidMonthlyData.objects.bulk_create(batch)
+            months += len(batch)
+        self.stdout.write(f"Built {months} monthly rows in {time.time() - start_time:.2f} seconds.")
+
+    def swap_in_staged_rows(self):
+        """
+        Replaces the contents of CovidStaticData with the staging table in one transaction,
+        copying the rows with a single INSERT ... SELECT.
+        """
+        quote = connection.ops.quote_name
+        columns = ", ".join(quote(CovidStaticData._meta.get_field(name).column) for name in COLUMNS)
+        with transaction.atomic():
+            CovidStaticData.objects.all().delete()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {quote(CovidStaticData._meta.db_table)} ({columns}) "
+                    f"SELECT {columns} FROM {quote(CovidStaticDataStaging._meta.db_table)}"
                 )
 
-        self.stdout.write(self.style.SUCCESS("Successfully precomputed COVID-19 data"))
+    def precompute_partitions(self, after_id, batch_size):
+        """
+        Re-aggregates only the (country, year) partitions that received CovidData rows with
+        an ID above `after_id`, and replaces those whose aggregates changed (yearly and
+        monthly rows) in one transaction. Returns the replaced partitions as
+        (country_name, year) pairs.
+        """
+        # Phase 1: find the changed partitions with a range scan on the primary key
+        start_time = time.time()
+        changed = (
+            CovidData.objects.filter(id__gt=after_id, file_date__isnull=False)
+            .values_list('country_id', 'file_date__year').distinct()
+        )
+        countries_by_year = defaultdict(set)
+        for country_id, year in changed:
+            countries_by_year[year].add(country_id)
+        partitions = sum(len(countries) for countries in countries_by_year.values())
+        self.stdout.write(
+            f"{partitions} changed (country, year) partitions found in {time.time() - start_time:.2f} seconds."
+        )
+        if not partitions:
+            return []
+
+        # Phase 2: re-aggregate the changed partitions; file_date ranges keep the date index usable
+        start_time = time.time()
+        partition_filter = Q()
+        for year, country_ids in countries_by_year.items():
+            partition_filter |= Q(
+                country_id__in=country_ids, file_date__range=(date(year, 1, 1), date(year, 12, 31))
+            )
+        changed_data = CovidData.objects.filter(partition_filter)
+        yearly = list(self.aggregate(changed_data, batch_size))
+        monthly = list(self.aggregate_months(changed_data, batch_size))
+        self.stdout.write(
+            f"Aggregated {len(yearly)} rows and {len(monthly)} monthly rows in {time.time() - start_time:.2f} seconds."
+        )
+
+        # Phase 3: drop the partitions whose aggregates are unchanged, as most of those found
+        # by re-scanning the margin below the watermark are
+        country_names = dict(Country.objects.filter(
+            id__in=set().union(*countries_by_year.values())
+        ).values_list('id', 'name'))
+        stored_filter, stored_monthly_filter = Q(), Q()
+        for year, country_ids in countries_by_year.items():
+            names = [country_names[country_id] for country_id in country_ids]
+            stored_filter |= Q(year=year, country_name__in=names)
+            stored_monthly_filter |= Q(month__range=(date(year, 1, 1), date(year, 12, 1)), country_name__in=names)
+        computed = self.partition_contents(yearly, monthly)
+        stored = self.partition_contents(
+            CovidStaticData.objects.filter(stored_filter).values(*COLUMNS),
+            CovidMonthlyData.objects.filter(stored_monthly_filter).values(*MONTHLY_COLUMNS),
+        )
+        replaced = [
+            (country_names[country_id], year)
+            for year, country_ids in countries_by_year.items() for country_id in country_ids
+            if computed.get((country_names[country_id], year)) != stored.get((country_names[country_id], year))
+        ]
+        if not replaced:
+            self.stdout.write("The changed partitions hold the same aggregates as before.")
+            return []
+
+        # Phase 4: replace the partitions that changed
+        start_time = time.time()
+        replaced_keys = set(replaced)
+        with transaction.atomic():
+            for country_name, year in replaced:
+                CovidStaticData.objects.filter(year=year, country_name=country_name).delete()
+                CovidMonthlyData.objects.filter(
+                    month__range=(date(year, 1, 1), date(year, 12, 1)), country_name=country_name
+                ).delete()
+            CovidStaticData.objects.bulk_create(
+                [CovidStaticData(**values) for values in yearly
+                 if (values['country_name'], values['year']) in replaced_keys],
+                batch_size=batch_size,
+            )
+            CovidMonthlyData.objects.bulk_create(
+                [CovidMonthlyData(**values) for values in monthly
+                 if (values['country_name'], values['month'].year) in replaced_keys],
+                batch_size=batch_size,
+            )
+        self.stdout.write(f"Replaced {len(replaced)} partitions in {time.time() - start_time:.2f} seconds.")
+        return replaced
+
+    def partition_contents(self, yearly, monthly):
+        """
+        Groups yearly and monthly field values by (country_name, year) partition, in a form
+        that compares equal when two partitions hold the same rows.
+        """
+        contents = defaultdict(lambda: ([], []))
+        for values in yearly:
+            contents[(values['country_name'], values['year'])][0].append(tuple(values[name] for name in COLUMNS))
+        for values in monthly:
+            contents[(values['country_name'], values['month'].year)][1].append(
+                tuple(values[name] for name in MONTHLY_COLUMNS)
+            )
+        return {key: (sorted(rows, key=repr), sorted(months, key=repr)) for key, (rows, months) in contents.items()}
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visualization_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CovidStaticDataStaging',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country_name', models.CharField(max_length=255)),
+                ('state', models.CharField(blank=True, max_length=255, null=True)),
+                ('year', models.IntegerField(default=2021)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('total_deaths', models.BigIntegerField(default=0)),
+                ('total_active', models.BigIntegerField(default=0)),
+                ('total_confirmed', models.BigIntegerField(default=0)),
+                ('total_recovered', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visualization_app', '0003_precomputewatermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeatmapPayload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(blank=True, null=True)),
+                ('country_key', models.CharField(default='', max_length=255)),
+                ('body', models.BinaryField()),
+                ('etag', models.CharField(max_length=80)),
+                ('rows', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('year', 'country_key')},
+            },
+        ),
+    ]
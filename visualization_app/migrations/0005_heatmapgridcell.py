@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visualization_app', '0004_heatmappayload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeatmapGridCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zoom', models.PositiveSmallIntegerField()),
+                ('year', models.IntegerField(blank=True, null=True)),
+                ('x', models.IntegerField()),
+                ('y', models.IntegerField()),
+                ('points', models.IntegerField(default=0)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('total_deaths', models.BigIntegerField(default=0)),
+                ('total_active', models.BigIntegerField(default=0)),
+                ('total_confirmed', models.BigIntegerField(default=0)),
+                ('total_recovered', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('zoom', 'year', 'x', 'y')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visualization_app', '0005_heatmapgridcell'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CovidMonthlyData',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country_name', models.CharField(max_length=255)),
+                ('state', models.CharField(blank=True, max_length=255, null=True)),
+                ('month', models.DateField()),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('total_deaths', models.BigIntegerField(default=0)),
+                ('total_active', models.BigIntegerField(default=0)),
+                ('total_confirmed', models.BigIntegerField(default=0)),
+                ('total_recovered', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month'], name='visualizati_month_74ac75_idx')],
+                'unique_together': {('country_name', 'state', 'month')},
+            },
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 
-class CovidStaticData(models.Model):
+
+class CovidStaticDataBase(models.Model):
     country_name = models.CharField(max_length=255)
     state = models.CharField(max_length=255, null=True, blank=True)
     year = models.IntegerField(default=2021)
@@ -12,7 +13,98 @@ class CovidStaticData(models.Model):
     total_recovered = models.BigIntegerField(default=0)
 
     class Meta:
-        unique_together = ('country_name', 'state', 'year')
+        abstract = True
 
     def __str__(self):
         return f"{self.country_name} - {self.state or 'All'} ({self.year})"
+
+
+class CovidStaticData(CovidStaticDataBase):
+    class Meta:
+        unique_together = ('country_name', 'state', 'year')
+
+
+class CovidStaticDataStaging(CovidStaticDataBase):
+    """
+    Staging copy of CovidStaticData that `precompute_covid_data` fills before swapping
+    the rows into the live table in one transaction.
+    """
+
+
+class PrecomputeWatermark(models.Model):
+    """
+    Highest CovidData ID already folded into a precomputed table, so the next incremental
+    run only re-aggregates the partitions that rows added since then belong to.
+    """
+    name = models.CharField(max_length=64, unique=True)  # e.g., 'covid_static_data'
+    last_covid_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} up to CovidData #{self.last_covid_id}"
+
+
+class HeatmapPayload(models.Model):
+    """
+    JSON body of the heatmap endpoint for one (year, country) filter, serialized when
+    `precompute_covid_data` runs, with a strong ETag of the body.
+    """
+    year = models.IntegerField(null=True, blank=True)  # None for all years
+    country_key = models.CharField(max_length=255, default='')  # Lowercased country name, '' for all
+    body = models.BinaryField()
+    etag = models.CharField(max_length=80)
+    rows = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('year', 'country_key')
+
+    def __str__(self):
+        return f"Heatmap {self.year or 'all years'} - {self.country_key or 'all countries'}"
+
+
+class HeatmapGridCell(models.Model):
+    """
+    Heatmap points binned into the web-mercator tile grid of one zoom level, with the number
+    of points, their centroid and their metric sums. Built by `precompute_covid_data`.
+    """
+    zoom = models.PositiveSmallIntegerField()
+    year = models.IntegerField(null=True, blank=True)  # None for all years
+    x = models.IntegerField()
+    y = models.IntegerField()
+    points = models.IntegerField(default=0)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    total_deaths = models.BigIntegerField(default=0)
+    total_active = models.BigIntegerField(default=0)
+    total_confirmed = models.BigIntegerField(default=0)
+    total_recovered = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('zoom', 'year', 'x', 'y')
+
+    def __str__(self):
+        return f"Cell {self.zoom}/{self.x}/{self.y} ({self.year or 'all years'})"
+
+
+class CovidMonthlyData(models.Model):
+    """
+    Monthly totals per region (country and state), the (region x month x metric) cube
+    behind the heatmap timeline. Built by `precompute_covid_data`.
+    """
+    country_name = models.CharField(max_length=255)
+    state = models.CharField(max_length=255, null=True, blank=True)
+    month = models.DateField()  # First day of the month
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    total_deaths = models.BigIntegerField(default=0)
+    total_active = models.BigIntegerField(default=0)
+    total_confirmed = models.BigIntegerField(default=0)
+    total_recovered = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('country_name', 'state', 'month')
+        indexes = [models.Index(fields=['month'])]
+
+    def __str__(self):
+        return f"{self.country_name} - {self.state or 'All'} ({self.month:%Y-%m})"
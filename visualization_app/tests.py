@@ -1,3 +1,84 @@
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from data_app.models import Country, CovidData
+from data_app.versions import current_version
+from visualization_app.models import CovidMonthlyData, CovidStaticData, HeatmapPayload
+
+
+class PrecomputeCovidDataTests(TestCase):
+    """
+    Incremental `precompute_covid_data` runs must match a full recompute, and skip all
+    writes when no rows were added.
+    """
+
+    def setUp(self):
+        self.canada = Country.objects.create(name="Canada", latitude=56.1, longitude=-106.3)
+        self.chile = Country.objects.create(name="Chile", latitude=-35.7, longitude=-71.5)
+        for day in (1, 2):
+            CovidData.objects.create(country=self.canada, province_state="Ontario", file_date=date(2020, 12, day), confirmed=day)
+            CovidData.objects.create(country=self.chile, file_date=date(2021, 1, day), confirmed=10 * day, deaths=day)
+
+    def precompute(self, **options):
+        output = StringIO()
+        call_command("precompute_covid_data", stdout=output, **options)
+        return output.getvalue()
+
+    def snapshot(self):
+        return (
+            sorted(CovidStaticData.objects.values_list(
+                "country_name", "state", "year", "total_confirmed", "total_deaths", "total_active", "total_recovered"
+            ), key=str),
+            sorted(CovidMonthlyData.objects.values_list(
+                "country_name", "state", "month", "total_confirmed", "total_deaths"
+            ), key=str),
+            sorted(HeatmapPayload.objects.values_list("year", "country_key", "etag"), key=str),
+        )
+
+    def test_incremental_matches_full(self):
+        self.precompute()
+        CovidData.objects.create(country=self.canada, province_state="Ontario", file_date=date(2021, 1, 3), confirmed=5)
+        CovidData.objects.create(country=self.chile, file_date=date(2021, 2, 1), confirmed=7, deaths=2)
+
+        self.assertIn("changed (country, year) partitions", self.precompute())
+        incremental = self.snapshot()
+        self.precompute(full=True)
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_no_new_rows_skips_writes(self):
+        self.precompute()
+        version = current_version()
+        self.assertIn("No new COVID-19 data", self.precompute())
+        self.assertEqual(current_version(), version)
+
+        # Rows without a date don't change any precomputed partition either
+        CovidData.objects.create(country=self.chile, file_date=None, confirmed=3)
+        self.assertIn("No precomputed COVID-19 data changed", self.precompute())
+        self.assertEqual(current_version(), version)
+        self.assertIn("No new COVID-19 data", self.precompute())
+
+
+class HeatmapYearTests(TestCase):
+    """
+    The heatmap endpoints reject years that aren't positive integers.
+    """
+
+    def setUp(self):
+        self.client = APIClient(HTTP_HOST="localhost")
+        country = Country.objects.create(name="Chile", latitude=-35.7, longitude=-71.5)
+        CovidData.objects.create(country=country, file_date=date(2021, 1, 1), confirmed=10)
+        call_command("precompute_covid_data", stdout=StringIO())
 
-# Create your tests here.
+    def test_invalid_years_are_rejected(self):
+        grid = {"zoom": 2, "bbox": "-180,-85,180,85"}
+        for year in ("0", "-3", "abc"):
+            self.assertEqual(self.client.get(reverse("covid-heatmap"), {"year": year}).status_code, 400, year)
+            self.assertEqual(self.client.get(reverse("covid-heatmap-grid"), {"year": year, **grid}).status_code, 400, year)
+        self.assertEqual(self.client.get(reverse("covid-heatmap"), {"year": 2021}).status_code, 200)
+        response = self.client.get(reverse("covid-heatmap-grid"), {"year": 2021, **grid})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json())
@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import VaccinationDataAggregationView, CovidDataHeatmapView
+from .views import VaccinationDataAggregationView, CovidDataHeatmapView, CovidDataHeatmapGridView, CovidDataTimelineView
 
 urlpatterns = [
     path('vaccination-data/', VaccinationDataAggregationView.as_view(), name='vaccination-data'),
     path('covid-heatmap/', CovidDataHeatmapView.as_view(), name='covid-heatmap'),
+    path('covid-heatmap/grid/', CovidDataHeatmapGridView.as_view(), name='covid-heatmap-grid'),
+    path('covid-heatmap/timeline/', CovidDataTimelineView.as_view(), name='covid-heatmap-timeline'),
 ]
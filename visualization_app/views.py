@@ -1,35 +1,44 @@
+from datetime import date, datetime
+
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework.exceptions import ValidationError
-from visualization_app.models import CovidStaticData
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from visualization_app.heatmap import GRID_MAX_ZOOM, MAX_LATITUDE, heatmap_rows, tile_x, tile_y
+from visualization_app.models import CovidMonthlyData, CovidStaticData, HeatmapGridCell, HeatmapPayload
+from data_app.choices import ChoiceParameter, registry
 from data_app.models import VaccinationData
+from django.db.models import F, Max, Min, Q
+
+registry.register('static_countries', lambda: CovidStaticData.objects.values_list('country_name', flat=True).distinct())
+registry.register('static_states', lambda: CovidStaticData.objects.values_list('state', flat=True).distinct())
 
 
 # Helper functions to generate dropdown options
 def get_country_choices():
-    return sorted(list(CovidStaticData.objects.values_list('country_name', flat=True).distinct()))
+    return registry.sorted('static_countries')
 
 
 def get_state_choices():
-    return sorted(list(CovidStaticData.objects.values_list('state', flat=True).distinct()))
+    return registry.sorted('static_states')
 
 
 class VaccinationDataAggregationView(APIView):
     """
-    Provides aggregated vaccination data by country and state.
-    Avoid repeated records for the same country or state.
+    Provides aggregated vaccination data for every country, one row per country.
+    Vaccination figures are cumulative, so each country reports its highest values.
     """
 
     @swagger_auto_schema(
-        operation_description="Retrieve aggregated vaccination data for each country and state. Avoid repeated data.",
+        operation_description="Retrieve aggregated vaccination data for each country (one row per country, computed "
+                              "in a single grouped query), optionally filtered by country.",
         manual_parameters=[
-            openapi.Parameter(
-                'country_name', openapi.IN_QUERY,
+            ChoiceParameter(
+                'country_name', 'static_countries',
                 description="Filter by country name",
-                type=openapi.TYPE_STRING,
-                enum=get_country_choices()
             ),
         ],
         responses={
@@ -63,30 +72,46 @@ class VaccinationDataAggregationView(APIView):
         if country_name:
             queryset = queryset.filter(country__name__iexact=country_name)
 
-        if not queryset.exists():
+        # One row per country; repeated records of a country collapse into its maximum values
+        result = list(
+            queryset.values(country_name=F('country__name'))
+            .annotate(
+                total_vaccinations=Max('total_vaccinations'),
+                persons_first_dose=Max('persons_vaccinated_first_dose'),
+                persons_last_dose=Max('persons_last_dose'),
+                persons_booster_dose=Max('persons_booster_add_dose'),
+            )
+            .order_by('country_name')
+        )
+
+        if not result:
             return Response({"error": "No vaccination data found for the given filters."}, status=404)
 
-        # Use distinct to avoid repeating countries
-        unique_data = queryset.order_by('country__name').first()
+        return Response(result)
 
-        # Format the response
-        result = [
-            {
-                "country_name": unique_data.country.name,
-                "total_vaccinations": unique_data.total_vaccinations,
-                "persons_first_dose": unique_data.persons_vaccinated_first_dose,
-                "persons_last_dose": unique_data.persons_last_dose,
-                "persons_booster_dose": unique_data.persons_booster_add_dose,
-            }
-        ]
 
-        return Response(result)
+def parse_year(value):
+    """
+    Parses an optional year query parameter into a positive integer, or None if missing.
+    """
+    if not value:
+        return None
+    try:
+        year = int(value)
+    except ValueError:
+        raise ValidationError({"error": "Invalid year. Please provide a valid numeric year."})
+    if year < 1:
+        raise ValidationError({"error": "Invalid year. Please provide a valid numeric year."})
+    return year
 
 
 class CovidDataHeatmapView(APIView):
     """
     Provides precomputed COVID-19 data for a heatmap by country and state.
     Filters by year, country, or both.
+
+    Bodies are serialized by `precompute_covid_data` and served as stored bytes with a
+    strong ETag, so polling clients get a 304 Not Modified until the data changes.
     """
 
     @swagger_auto_schema(
@@ -97,11 +122,9 @@ class CovidDataHeatmapView(APIView):
                 description="Filter by specific year (e.g., 2021)",
                 type=openapi.TYPE_INTEGER
             ),
-            openapi.Parameter(
-                'country_name', openapi.IN_QUERY,
+            ChoiceParameter(
+                'country_name', 'static_countries',
                 description="Filter by specific country",
-                type=openapi.TYPE_STRING,
-                enum=get_country_choices()
             )
         ],
         responses={
@@ -137,33 +160,266 @@ class CovidDataHeatmapView(APIView):
         queryset = CovidStaticData.objects.all()
 
         # Apply filters
+        year = parse_year(year)
         if year:
-            try:
-                year = int(year)
-                queryset = queryset.filter(year=year)
-            except ValueError:
-                raise ValidationError({"error": "Invalid year. Please provide a valid numeric year."})
+            queryset = queryset.filter(year=year)
 
         if country_name:
             queryset = queryset.filter(country_name__iexact=country_name)
 
+        # Serve the pre-serialized body when precompute has built one for these filters
+        payload = HeatmapPayload.objects.filter(
+            year=year, country_key=(country_name or '').lower()
+        ).only('body', 'etag').first()
+        if payload:
+            response = HttpResponse(bytes(payload.body), content_type='application/json')
+            response['ETag'] = payload.etag
+            # Evaluates If-None-Match (lists, weak tags, *) and If-Match as RFC 9110 specifies
+            return get_conditional_response(request, etag=payload.etag, response=response)
+
         # Check for empty results
         if not queryset.exists():
             return Response({"error": "No COVID-19 data found for the given filters."}, status=404)
 
         # Format the response
-        result = [
-            {
-                "country_name": data.country_name,
-                "state": data.state,
-                "latitude": data.latitude,
-                "longitude": data.longitude,
-                "total_deaths": data.total_deaths,
-                "total_active": data.total_active,
-                "total_confirmed": data.total_confirmed,
-                "total_recovered": data.total_recovered,
-            }
-            for data in queryset
-        ]
+        return Response(heatmap_rows(queryset))
+
+
+class CovidDataHeatmapGridView(APIView):
+    """
+    Provides precomputed COVID-19 heatmap data binned into the web-mercator tile grid of a
+    zoom level, limited to the cells intersecting a bounding box, so map panning only
+    fetches the visible region.
+    """
+
+    @swagger_auto_schema(
+        operation_description="Retrieve COVID-19 heatmap grid cells (point count, centroid and metric sums) of a "
+                              "zoom level within a bounding box. Optionally filter by year.",
+        manual_parameters=[
+            openapi.Parameter(
+                'bbox', openapi.IN_QUERY,
+                description="Bounding box as min_lon,min_lat,max_lon,max_lat (e.g., -10,35,30,60); "
+                            "min_lon > max_lon crosses the antimeridian",
+                type=openapi.TYPE_STRING, required=True
+            ),
+            openapi.Parameter(
+                'zoom', openapi.IN_QUERY,
+                description=f"Zoom level (0-{GRID_MAX_ZOOM})",
+                type=openapi.TYPE_INTEGER, required=True
+            ),
+            openapi.Parameter(
+                'year', openapi.IN_QUERY,
+                description="Filter by specific year (e.g., 2021)",
+                type=openapi.TYPE_INTEGER
+            ),
+        ],
+        responses={
+            200: openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                items=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "x": openapi.Schema(type=openapi.TYPE_INTEGER, description="Tile column"),
+                        "y": openapi.Schema(type=openapi.TYPE_INTEGER, description="Tile row"),
+                        "points": openapi.Schema(type=openapi.TYPE_INTEGER, description="Number of heatmap points in the cell"),
+                        "latitude": openapi.Schema(type=openapi.TYPE_NUMBER, description="Latitude of the points' centroid"),
+                        "longitude": openapi.Schema(type=openapi.TYPE_NUMBER, description="Longitude of the points' centroid"),
+                        "total_deaths": openapi.Schema(type=openapi.TYPE_INTEGER, description="Total deaths"),
+                        "total_active": openapi.Schema(type=openapi.TYPE_INTEGER, description="Total active cases"),
+                        "total_confirmed": openapi.Schema(type=openapi.TYPE_INTEGER, description="Total confirmed cases"),
+                        "total_recovered": openapi.Schema(type=openapi.TYPE_INTEGER, description="Total recovered cases"),
+                    }
+                )
+            ),
+            400: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "error": openapi.Schema(type=openapi.TYPE_STRING, description="Invalid parameters.")
+                }
+            )
+        }
+    )
+    def get(self, request):
+        zoom = request.query_params.get('zoom', None)
+        bbox = request.query_params.get('bbox', None)
+        year = request.query_params.get('year', None)
+
+        # Validate zoom
+        try:
+            zoom = int(zoom)
+        except (TypeError, ValueError):
+            raise ValidationError({"error": f"Invalid zoom. Please provide an integer from 0 to {GRID_MAX_ZOOM}."})
+        if not 0 <= zoom <= GRID_MAX_ZOOM:
+            raise ValidationError({"error": f"Invalid zoom. Please provide an integer from 0 to {GRID_MAX_ZOOM}."})
+
+        # Validate bbox
+        try:
+            min_lon, min_lat, max_lon, max_lat = (float(value) for value in (bbox or '').split(','))
+        except ValueError:
+            raise ValidationError({"error": "Invalid bbox. Use min_lon,min_lat,max_lon,max_lat."})
+        if not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180 and -90 <= min_lat <= max_lat <= 90):
+            raise ValidationError({"error": "Invalid bbox. Longitudes must be within -180..180 and latitudes "
+                                            "within -90..90, with min_lat <= max_lat."})
 
+        queryset = HeatmapGridCell.objects.filter(zoom=zoom)
+
+        # Validate year
+        year = parse_year(year)
+        if year:
+            queryset = queryset.filter(year=year)
+        else:
+            queryset = queryset.filter(year__isnull=True)
+
+        # Rows grow southwards, so the north edge gives the first row
+        rows = (tile_y(min(max_lat, MAX_LATITUDE), zoom), tile_y(max(min_lat, -MAX_LATITUDE), zoom))
+        x_min, x_max = tile_x(min_lon, zoom), tile_x(max_lon, zoom)
+        if min_lon <= max_lon:
+            columns = Q(x__range=(x_min, x_max))
+        else:
+            columns = Q(x__gte=x_min) | Q(x__lte=x_max)
+
+        result = list(
+            queryset.filter(columns, y__range=rows)
+            .values(
+                'x', 'y', 'points', 'latitude', 'longitude',
+                'total_deaths', 'total_active', 'total_confirmed', 'total_recovered',
+            )
+            .order_by('y', 'x')
+        )
         return Response(result)
+
+
+# Metrics of the timeline cube, in response order
+TIMELINE_METRICS = ('total_deaths', 'total_active', 'total_confirmed', 'total_recovered')
+
+# Longest range of months one timeline request may cover
+TIMELINE_MAX_MONTHS = 120
+
+
+def parse_month(value, param):
+    """
+    Parses a YYYY-MM query parameter into the first day of that month.
+    """
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise ValidationError({"error": f"Invalid {param} format. Use YYYY-MM."})
+
+
+def month_range(start, end):
+    """
+    Returns the first days of every month from `start` to `end`, both included.
+    """
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(date(year, month, 1))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+class CovidDataTimelineView(APIView):
+    """
+    Provides the monthly COVID-19 totals of every region over a time range as one columnar
+    payload, so an animated heatmap loads its whole timeline in a single request.
+
+    Metric arrays are region-major: the value of region `i` in month `j` is at index
+    `i * len(months) + j`, and months without reports are 0. The range is clamped to the
+    months with data and may span at most `TIMELINE_MAX_MONTHS` months.
+    """
+
+    @swagger_auto_schema(
+        operation_description="Retrieve precomputed monthly COVID-19 totals of all regions over a time range as "
+                              "columnar arrays (one array per metric).",
+        manual_parameters=[
+            openapi.Parameter(
+                'start_month', openapi.IN_QUERY,
+                description="First month (YYYY-MM); defaults to, and is clamped to, the first month with data",
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'end_month', openapi.IN_QUERY,
+                description="Last month (YYYY-MM); defaults to, and is clamped to, the last month with data",
+                type=openapi.TYPE_STRING
+            ),
+            ChoiceParameter(
+                'country_name', 'static_countries',
+                description="Filter by specific country",
+            ),
+        ],
+        responses={
+            200: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "months": openapi.Schema(
+                        type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING),
+                        description="Months of the range (YYYY-MM)"
+                    ),
+                    "regions": openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        description="One array per region attribute: country_name, state, latitude, longitude"
+                    ),
+                    "metrics": openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        description="One region-major array per metric: total_deaths, total_active, "
+                                    "total_confirmed, total_recovered"
+                    ),
+                }
+            ),
+            404: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "error": openapi.Schema(type=openapi.TYPE_STRING, description="No data found.")
+                }
+            )
+        }
+    )
+    def get(self, request):
+        start_month = request.query_params.get('start_month', None)
+        end_month = request.query_params.get('end_month', None)
+        country_name = request.query_params.get('country_name', None)
+
+        queryset = CovidMonthlyData.objects.all()
+        if country_name:
+            queryset = queryset.filter(country_name__iexact=country_name)
+        if start_month:
+            queryset = queryset.filter(month__gte=parse_month(start_month, 'start_month'))
+        if end_month:
+            queryset = queryset.filter(month__lte=parse_month(end_month, 'end_month'))
+
+        # The filtered bounds lie within the requested range, so months without data before
+        # the first or after the last report are never materialized
+        bounds = queryset.aggregate(first=Min('month'), last=Max('month'))
+        if bounds['first'] is None:
+            return Response({"error": "No COVID-19 data found for the given filters."}, status=404)
+        span = (bounds['last'].year - bounds['first'].year) * 12 + bounds['last'].month - bounds['first'].month + 1
+        if span > TIMELINE_MAX_MONTHS:
+            raise ValidationError({
+                "error": f"The range spans {span} months; request at most {TIMELINE_MAX_MONTHS} months at a time."
+            })
+        months = month_range(bounds['first'], bounds['last'])
+        month_index = {month: j for j, month in enumerate(months)}
+
+        regions = {'country_name': [], 'state': [], 'latitude': [], 'longitude': []}
+        metrics = {metric: [] for metric in TIMELINE_METRICS}
+        previous = None
+        rows = queryset.order_by('country_name', 'state', 'month').values_list(
+            'country_name', 'state', 'latitude', 'longitude', 'month', *TIMELINE_METRICS
+        )
+        for country, state, latitude, longitude, month, *values in rows.iterator(chunk_size=5000):
+            if (country, state) != previous:
+                # Start the region's row of every metric with zeros
+                previous = (country, state)
+                for name, value in zip(regions, (country, state, latitude, longitude)):
+                    regions[name].append(value)
+                for metric in metrics.values():
+                    metric.extend([0] * len(months))
+            offset = (len(regions['country_name']) - 1) * len(months) + month_index[month]
+            for metric, value in zip(TIMELINE_METRICS, values):
+                metrics[metric][offset] = value
+
+        return Response({
+            "months": [month.strftime('%Y-%m') for month in months],
+            "regions": regions,
+            "metrics": metrics,
+        })